@@ -0,0 +1,4 @@
+"""
+Helpers used by both the student and the tutor apps: caches, the data versions used in the cache keys, and the pool of
+read-only database connections. You do not need to change these for the activities.
+"""
@@ -0,0 +1,59 @@
+"""
+Cache of DataFrames and other data read from files, used by the student and tutor Dash apps.
+
+Usage:
+    _cache = DatasetCache()
+    df = _cache.get("events", CSV_PATH, load_events)
+    print(_cache.stats())  # e.g. {'hits': 12, 'misses': 2, ...}
+
+The data is shared between callbacks so treat it as read-only, use df.copy() before changing it.
+"""
+import os
+import threading
+
+
+class DatasetCache:
+    """ Keeps DataFrames in memory and reloads them when the modification time of their file changes.
+
+    Attributes:
+        hits (int): number of requests served from memory
+        misses (int): number of requests that had to read the file
+    """
+
+    def __init__(self):
+        # RLock as a loader can request another dataset from the same cache, e.g. the card index uses the hosts
+        self._lock = threading.RLock()
+        # name: (path, modification time, DataFrame)
+        self._frames = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, path, loader):
+        """ Return the DataFrame for name, calling loader(path) if it is not loaded or the file has changed. """
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._frames.get(name)
+            if cached is not None and cached[1] == mtime:
+                self.hits += 1
+                return cached[2]
+            # Read while holding the lock so that concurrent callbacks do not all read the same file
+            self.misses += 1
+            df = loader(path)
+            self._frames[name] = (path, mtime, df)
+            return df
+
+    def stats(self):
+        """ Return the hit and miss counters and the rows held for each dataset. """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "datasets": {name: len(entry[2]) for name, entry in self._frames.items()},
+            }
+
+    def clear(self):
+        """ Remove all DataFrames and reset the counters. """
+        with self._lock:
+            self._frames.clear()
+            self.hits = 0
+            self.misses = 0
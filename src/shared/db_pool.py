@@ -0,0 +1,218 @@
+"""
+Pool of read-only SQLite connections for the chart and card functions of the student and tutor Dash apps.
+
+The charts only read from paralympics.db so rather than opening (and not closing) a new connection for every figure,
+connections are opened read-only using a URI, e.g. file:/path/paralympics.db?mode=ro&immutable=1, and reused.
+
+The connections are not tied to a thread. A connection is used by one thread at a time and when it is returned to the
+pool the next thread to ask for one may get it, so they are opened with check_same_thread=False. A connection for each
+thread was not used as the Dash development server starts a new thread for each request, so the connections of the
+threads that have finished would stay open.
+
+immutable=1 tells SQLite the file will not change so it does not need to lock it. This is only safe because the pool
+checks the modification time of the file each time a connection is handed out and reopens the connection if the
+database has been replaced, e.g. after the data has been reloaded.
+
+Usage:
+    with get_pool(DB_PATH).connection() as conn:
+        df = pd.read_sql_query(sql, conn)
+
+    configure_pool(DB_PATH, size=8)  # change the pool size
+    print(pool_stats())
+"""
+import os
+import pathlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 4
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """ Raised when no connection becomes free within the pool timeout. """
+
+
+class ReadOnlyConnectionPool:
+    """ A fixed size pool of read-only connections to one SQLite database file.
+
+    A connection is only used by one thread at a time, but is not tied to a thread: once returned it can be handed
+    to any thread. If the same thread asks for a connection again while it already holds one (e.g. a chart function
+    calling another function that queries the database) it is given the same connection rather than a second one.
+
+    Attributes:
+        path (pathlib.Path): path to the database file
+        size (int): the maximum number of open connections
+        immutable (bool): open the connections with immutable=1
+        timeout (float): seconds to wait for a free connection before raising PoolTimeoutError
+    """
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, immutable=True, timeout=5.0):
+        if size < 1:
+            raise ValueError('"size" must be at least 1')
+        self.path = pathlib.Path(path).resolve()
+        self.size = size
+        self.immutable = immutable
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        # Idle connections as (connection, modification time of the file when it was opened)
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._counts = {"created": 0, "reused": 0, "closed": 0, "failed_health_checks": 0, "waits": 0}
+
+    def _uri(self):
+        uri = f"{self.path.as_uri()}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        return uri
+
+    def _mtime(self):
+        return os.stat(self.path).st_mtime_ns
+
+    def _create(self):
+        """ Open a new read-only connection. The caller must have reserved a place in the pool. """
+        # check_same_thread=False as a connection can be used by different threads, but only one at a time
+        conn = sqlite3.connect(self._uri(), uri=True, check_same_thread=False)
+        with self._condition:
+            self._counts["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn, mtime):
+        """ Return False if the database file has changed since the connection was opened or the connection fails. """
+        if mtime != self._mtime():
+            return False
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError(f"The connection pool for {self.path.name} is closed")
+                if self._idle:
+                    conn, mtime = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    # Reserve a place in the pool then open the connection outside the lock
+                    self._open += 1
+                    conn, mtime = None, None
+                    break
+                self._counts["waits"] += 1
+                if not self._condition.wait(self.timeout):
+                    raise PoolTimeoutError(f"No free connection to {self.path.name} after {self.timeout} seconds")
+        try:
+            if conn is not None and not self._is_healthy(conn, mtime):
+                conn.close()
+                with self._condition:
+                    self._counts["failed_health_checks"] += 1
+                    self._counts["closed"] += 1
+                conn = None
+            if conn is None:
+                mtime = self._mtime()
+                conn = self._create()
+            else:
+                with self._condition:
+                    self._counts["reused"] += 1
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        return conn, mtime
+
+    def _release(self, conn, mtime):
+        with self._condition:
+            if self._closed:
+                conn.close()
+                self._open -= 1
+                self._counts["closed"] += 1
+                return
+            self._idle.append((conn, mtime))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """ Context manager that hands out a connection and returns it to the pool afterwards. """
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            # This thread already has a connection from the pool
+            yield held[0]
+            return
+        conn, mtime = self._acquire()
+        self._local.held = (conn, mtime)
+        try:
+            yield conn
+        finally:
+            self._local.held = None
+            self._release(conn, mtime)
+
+    def stats(self):
+        """ Return the pool settings and counters. """
+        with self._condition:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                **self._counts,
+            }
+
+    def close(self):
+        """ Close the idle connections. Connections in use are closed when they are returned. """
+        with self._condition:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+                self._counts["closed"] += 1
+            self._open -= len(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+
+
+# One pool per database file for the process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    """ Return the pool for the database file, creating it with the default settings if needed. """
+    key = pathlib.Path(path).resolve()
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ReadOnlyConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+def configure_pool(path, size=DEFAULT_POOL_SIZE, immutable=True, timeout=5.0):
+    """ Replace the pool for the database file with one using the given settings.
+
+    Parameters
+    path: path to the database file
+    size: the maximum number of open connections
+    immutable: open the connections with immutable=1, set to False if the file is changed in place
+    timeout: seconds to wait for a free connection
+
+    Returns
+    pool: the new ReadOnlyConnectionPool
+    """
+    key = pathlib.Path(path).resolve()
+    pool = ReadOnlyConnectionPool(key, size=size, immutable=immutable, timeout=timeout)
+    with _pools_lock:
+        old_pool = _pools.get(key)
+        _pools[key] = pool
+    if old_pool is not None:
+        old_pool.close()
+    return pool
+
+
+def pool_stats():
+    """ Return the stats for each pool keyed by the database file name. """
+    with _pools_lock:
+        return {str(path): pool.stats() for path, pool in _pools.items()}
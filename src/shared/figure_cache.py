@@ -0,0 +1,43 @@
+"""
+Cache of the Plotly figures returned by the Dash callbacks.
+
+The callbacks only have a few possible inputs (4 features for the line chart, 2 event types for the bar chart) so the
+figure for each input is created once and then stored as JSON. The key includes a data version so that figures are
+created again when the data changes.
+
+Usage:
+    figure = cached_figure(line_chart, "sports", version=data_version())
+"""
+import json
+
+from shared.lru import LRUCache
+
+# One cache shared by all the callbacks in the process
+_cache = LRUCache(maxsize=64)
+
+
+def cached_figure(func, *args, version=None):
+    """ Return the figure created by func(*args) from the shared figure cache, creating it if it is not in the cache.
+
+    Parameters
+    func: the function that creates a Plotly figure e.g. line_chart
+    args: arguments for the function
+    version: value that changes when the data changes e.g. the file modification times
+
+    Returns
+    figure: dict in the Plotly figure JSON format, this can be returned from a callback for a dcc.Graph figure
+    """
+    key = (func.__module__, func.__qualname__, args, version)
+    fig_json = _cache.get_or_create(key, lambda: func(*args).to_json())
+    # A new dict each time so that a callback cannot change the cached figure
+    return json.loads(fig_json)
+
+
+def figure_cache_stats():
+    """ Return the hit and miss counters for the shared figure cache. """
+    return _cache.stats()
+
+
+def clear_figure_cache():
+    """ Empty the shared figure cache. """
+    _cache.clear()
@@ -0,0 +1,150 @@
+"""
+Contains the secondary indexes for the paralympics databases, used by both the student and the tutor code.
+
+The tables only have primary keys, so without these indexes every lookup such as WHERE year = ? AND type = ? and every
+join on a foreign key column (host_event.event_id, participants.event_id, medal_result.event_id, ...) reads the whole
+table. This makes little difference for 32 events but does once medal results for all Games and countries are loaded.
+
+create_db, create_app_db and the Flask init-db command call create_indexes after the data is added. To add the indexes
+to an existing database (a migration) and check the query plans of the apps' queries run:
+    python -m student.placeholder.indexes path/to/paralympics.db
+sync_db needs the unique indexes and does not create them, so a database created before they were added must be
+migrated first. The migration stops with an error if a table has duplicate values for a unique index.
+
+The same functions work for the databases created by create_db, from paralympics.sql and for the Dash app's
+paralympics.db. Indexes for tables or columns that are not in the database are skipped, as are indexes that would
+duplicate an index the database already has e.g. for a primary key.
+"""
+import sqlite3
+
+# name: (table, columns, unique)
+# The unique indexes are on the natural key of the table, sync_db needs these for INSERT ... ON CONFLICT
+INDEXES = {
+    'uq_event_year_type': ('event', ['year', 'type'], True),
+    'uq_participants_event_id': ('participants', ['event_id'], True),
+    'uq_host_host': ('host', ['host'], True),
+    'idx_host_country_code': ('host', ['country_code'], False),
+    'idx_host_event_event_host': ('host_event', ['event_id', 'host_id'], False),
+    'uq_disability_category': ('disability', ['category'], True),
+    # LIKE is not case-sensitive so it can only use an index with the NOCASE collation, and only when the pattern
+    # does not start with a wildcard e.g. 'Vis%'
+    'idx_disability_category_nocase': ('disability', ['category COLLATE NOCASE'], False),
+    'idx_disability_event_event_id': ('disability_event', ['event_id', 'disability_id'], False),
+    'idx_disability_event_disability_id': ('disability_event', ['disability_id', 'event_id'], False),
+    'uq_medal_result_event_id_country_code': ('medal_result', ['event_id', 'country_code'], True),
+    'idx_medal_result_country_code': ('medal_result', ['country_code'], False),
+}
+
+# Indexes that were replaced by one in INDEXES, they are dropped once the new index has been created
+# name: name of the index that replaced it
+REPLACED_INDEXES = {
+    'idx_medal_result_event_id_country_code': 'uq_medal_result_event_id_country_code',
+}
+
+
+def _table_columns(cursor, table):
+    return {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+
+
+def existing_index(cursor, table, columns, unique):
+    """Return the name of an index on the table that starts with the same columns, or None."""
+    if any('COLLATE' in column for column in columns):
+        return None
+    for _, name, is_unique, *_ in cursor.execute(f'PRAGMA index_list({table})').fetchall():
+        index_columns = [row[2] for row in cursor.execute(f'PRAGMA index_info({name})')]
+        if index_columns[:len(columns)] == columns and (is_unique or not unique):
+            # A unique index must be on exactly the same columns
+            if not unique or index_columns == columns:
+                return name
+    return None
+
+
+def _index_sql(name, table, columns, unique):
+    return f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+
+
+def _duplicate_count(cursor, table, columns):
+    """Return the number of values of the columns that are in more than one row of the table."""
+    cols = ', '.join(columns)
+    sql = f'SELECT COUNT(*) FROM (SELECT 1 FROM {table} GROUP BY {cols} HAVING COUNT(*) > 1)'
+    return cursor.execute(sql).fetchone()[0]
+
+
+def create_indexes(cursor, connection):
+    """Create the INDEXES that the database does not already have and run ANALYZE so the query planner uses them.
+
+    A unique index cannot be created if the table already has duplicate values. The duplicates are not removed, an
+    IntegrityError is raised so that they can be checked and removed by hand before running the migration again.
+    The REPLACED_INDEXES are dropped once the index that replaced them has been created.
+
+    Parameters
+    ----------
+    cursor: sqlite cursor object
+    connection: sqlite connection object
+
+    Returns
+    -------
+    created: list of the names of the indexes created
+    """
+    created = []
+    for name, (table, columns, unique) in INDEXES.items():
+        table_columns = _table_columns(cursor, table)
+        if not all(column.split()[0] in table_columns for column in columns):
+            continue
+        existing = existing_index(cursor, table, columns, unique)
+        if existing is not None and existing != name:
+            continue
+        try:
+            cursor.execute(_index_sql(name, table, columns, unique))
+        except sqlite3.IntegrityError as e:
+            duplicates = _duplicate_count(cursor, table, columns)
+            raise sqlite3.IntegrityError(f'Index {name} cannot be created as {duplicates} values of '
+                                         f'({", ".join(columns)}) are in more than one row of {table}') from e
+        if existing is None:
+            created.append(name)
+    for old_name, new_name in REPLACED_INDEXES.items():
+        if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (new_name,)).fetchone():
+            cursor.execute(f'DROP INDEX IF EXISTS {old_name}')
+    cursor.execute('ANALYZE')
+    connection.commit()
+    return created
+
+
+def _covered_by(cursor, name):
+    """Return the text the query plan should contain for a name in a check.
+
+    For a name in INDEXES this is the managed index, or the index the database already has instead. Any other name
+    e.g. 'INTEGER PRIMARY KEY' is looked for in the plan as it is.
+    """
+    if name not in INDEXES:
+        return name
+    table, columns, unique = INDEXES[name]
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone():
+        return name
+    return existing_index(cursor, table, columns, unique)
+
+
+def check_query_plans(cursor, checks):
+    """Use EXPLAIN QUERY PLAN to check that each query uses the expected indexes.
+
+    Queries that cannot run on the database, e.g. on a table or column that it does not have, are skipped.
+
+    Parameters
+    ----------
+    cursor: sqlite cursor object
+    checks: dict of {query name: (SQL, parameters, list of the index names the plan must use)}
+
+    Returns
+    -------
+    results: dict of {query name: (passed, list of the query plan lines)}
+    """
+    results = {}
+    for query_name, (sql, parameters, index_names) in checks.items():
+        try:
+            plan = [row[3] for row in cursor.execute(f'EXPLAIN QUERY PLAN {sql}', parameters)]
+        except sqlite3.OperationalError:
+            continue
+        expected = [_covered_by(cursor, name) for name in index_names]
+        passed = all(index is not None and any(index in line for line in plan) for index in expected)
+        results[query_name] = (passed, plan)
+    return results
@@ -0,0 +1,115 @@
+"""
+Least recently used (LRU) cache used by the figure, chart fragment, response and prediction caches.
+
+Usage:
+    cache = LRUCache(maxsize=64)
+    html = cache.get_or_create(key, lambda: create_chart())
+    print(cache.stats())  # e.g. {'hits': 12, 'misses': 2, ...}
+
+The Dash development server, Flask and gunicorn threads can use a cache at the same time so it uses a lock.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by _lookup when the key is not in the cache, as None can be a value e.g. for a team the model does not know
+_MISSING = object()
+
+
+class LRUCache:
+    """ Least recently used cache with an optional time limit for each value.
+
+    Attributes:
+        maxsize (int): the maximum number of values to keep, the least recently used are removed. 0 keeps nothing
+        ttl (float): the number of seconds a value is kept, or None for no time limit
+        hits (int): number of values returned from the cache
+        misses (int): number of values that were not in the cache, or had expired
+        evictions (int): number of values removed to keep the cache to maxsize
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key: (value, time it was added)
+        self._values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key, now):
+        """ Return the value for the key or _MISSING, updating the counters. The caller must hold the lock. """
+        entry = self._values.get(key)
+        if entry is not None and (self.ttl is None or now - entry[1] < self.ttl):
+            self._values.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return _MISSING
+
+    def _store(self, key, value, now):
+        """ Add the value and remove the least recently used values. The caller must hold the lock. """
+        if self.maxsize <= 0:
+            return
+        self._values[key] = (value, now)
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """ Return the value for the key, or None if it is not in the cache or has expired. """
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+        return None if value is _MISSING else value
+
+    def set(self, key, value):
+        """ Add the value to the cache. """
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+    def get_many(self, keys):
+        """ Return a dict of {key: value} for the keys that are in the cache and have not expired. """
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key, now)
+                if value is not _MISSING:
+                    found[key] = value
+        return found
+
+    def set_many(self, values):
+        """ Add the {key: value} dict to the cache. """
+        now = time.monotonic()
+        with self._lock:
+            for key, value in values.items():
+                self._store(key, value, now)
+
+    def get_or_create(self, key, create):
+        """ Return the value for the key, calling create() to make it if it is not in the cache.
+
+        A cached None is returned without calling create(), as the lookup uses _MISSING rather than get().
+        """
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+        if value is _MISSING:
+            # Create the value without holding the lock so other threads are not blocked
+            value = create()
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        """ Return the counters, the hit rate and the number of values held. """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else None,
+                    "evictions": self.evictions, "size": len(self._values), "maxsize": self.maxsize, "ttl": self.ttl}
+
+    def clear(self):
+        """ Remove all values and reset the counters. """
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
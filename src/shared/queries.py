@@ -0,0 +1,49 @@
+"""
+The SQL run by the student Dash and Flask apps for the card, the map and the events API.
+
+The queries are here rather than in the apps so that the query plan checks in student/placeholder/indexes.py can use
+the same SQL without importing the apps. This module only has strings and a function to build the SQL, so importing
+it does not load Dash, Flask or pandas.
+"""
+
+# Dash app: columns for the events joined to their hosts in paralympics.db, used by the card
+HOSTS_SQL = '''
+    SELECT event.event_id, event.type, event.year, event.countries, event.events, event.sports,
+    event.participants, event.highlights, host.host
+    FROM event
+    JOIN host_event ON event.event_id = host_event.event_id
+    JOIN host ON host_event.host_id = host.host_id
+    '''
+
+# Dash app: the map data, host_geo already has REAL latitude and longitude and the hover text (see add_host_geo_data)
+GEO_SQL = 'SELECT year, host, latitude, longitude, name FROM host_geo ORDER BY event_id, host_id'
+
+# Flask app: the /events route
+EVENTS_SQL = 'SELECT year, type, start, "end" FROM event'
+
+# Flask app: columns of the event table that can be requested from /api/events with ?fields=
+EVENT_FIELDS = ['event_id', 'type', 'year', 'start', 'end', 'duration', 'countries', 'events', 'sports', 'highlights',
+                'url']
+
+
+def events_page_sql(fields, after, limit, event_type=None, year_from=None, year_to=None):
+    """Return the SQL and parameters for a page of events from /api/events, see api_events in routes.py.
+
+    One more row than the page size is read to find out if there is a next page. The fields must be from EVENT_FIELDS.
+    """
+    where = ['event_id > ?']
+    params = [after]
+    if event_type is not None:
+        where.append('type = ?')
+        params.append(event_type)
+    if year_from is not None:
+        where.append('year >= ?')
+        params.append(year_from)
+    if year_to is not None:
+        where.append('year <= ?')
+        params.append(year_to)
+    # The column names are from EVENT_FIELDS so are safe to add to the SQL, "end" is an SQL keyword so is quoted
+    columns = ', '.join(f'"{f}"' for f in fields)
+    sql = f'SELECT {columns} FROM event WHERE {" AND ".join(where)} ORDER BY event_id LIMIT ?'
+    params.append(limit + 1)
+    return sql, params
@@ -0,0 +1,104 @@
+"""
+Startup modes and cold-start timings for the student and tutor Dash apps.
+
+Set the environment variable DASH_STARTUP_MODE before starting the app:
+    eager: (default) the figures are created when the module is imported
+    lazy: the layout is a function so the figures are created when the first page is requested
+    warm: as lazy, and a background thread creates the figures straight after import
+
+When the layout is a function Dash calls it as soon as it is assigned to app.layout, to check the callbacks match the
+layout, unless app.validation_layout is already set. So in the lazy and warm modes the apps first set
+app.validation_layout to a copy of the layout without the figures, see set_layout().
+
+The import time and the time to first byte of the first request are printed and are available as JSON from the
+/startup-metrics URL. Each gunicorn worker is a separate process so each worker reports its own timings.
+"""
+import os
+import threading
+import time
+
+from flask import jsonify
+
+STARTUP_MODES = ["eager", "lazy", "warm"]
+
+
+def get_startup_mode():
+    """ Return the startup mode from the DASH_STARTUP_MODE environment variable. """
+    mode = os.environ.get("DASH_STARTUP_MODE", "eager").lower()
+    if mode not in STARTUP_MODES:
+        raise ValueError(f'Invalid value for DASH_STARTUP_MODE "{mode}". Must be one of {STARTUP_MODES}')
+    return mode
+
+
+def set_layout(app, create_layout, mode):
+    """ Set the layout of the app for the startup mode.
+
+    Parameters
+    app: the Dash app
+    create_layout: function that returns the layout, create_layout(with_figures=False) must return the same
+        components without creating the figures or reading the data
+    mode: the startup mode
+    """
+    if mode == "eager":
+        # Create the figures now, when the module is imported
+        app.layout = create_layout()
+    else:
+        # The layout without the figures is used to check the callbacks, so Dash does not call create_layout now
+        app.validation_layout = create_layout(with_figures=False)
+        # Pass the function rather than calling it, Dash calls it when a page is requested
+        app.layout = create_layout
+
+
+def start_warm_up(warm_up):
+    """ Run the warm_up function in a background (daemon) thread so that it does not delay the server starting. """
+    thread = threading.Thread(target=warm_up, name="dash-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_startup_metrics(app, import_start, mode):
+    """ Record the import time and the time to first byte of the first request for the app.
+
+    Parameters
+    app: the Dash app
+    import_start: value of time.perf_counter() at the start of the app module
+    mode: the startup mode
+
+    Returns
+    metrics: dict of the timings in seconds, the first request values are None until the first request is made
+    """
+    metrics = {
+        "pid": os.getpid(),
+        "mode": mode,
+        "import_seconds": round(time.perf_counter() - import_start, 4),
+        "first_request_ttfb_seconds": None,
+        "first_request_since_import_seconds": None,
+    }
+    lock = threading.Lock()
+    print(f"Startup ({mode}) pid {metrics['pid']}: import took {metrics['import_seconds']}s")
+
+    # Wrap the Flask WSGI app so that the timer includes Dash's own setup on the first request
+    wsgi_app = app.server.wsgi_app
+
+    def timed_wsgi_app(environ, start_response):
+        request_start = time.perf_counter()
+
+        def timed_start_response(*args, **kwargs):
+            with lock:
+                if metrics["first_request_ttfb_seconds"] is None:
+                    now = time.perf_counter()
+                    metrics["first_request_ttfb_seconds"] = round(now - request_start, 4)
+                    metrics["first_request_since_import_seconds"] = round(now - import_start, 4)
+                    print(f"Startup ({mode}) pid {metrics['pid']}: "
+                          f"first request took {metrics['first_request_ttfb_seconds']}s")
+            return start_response(*args, **kwargs)
+
+        return wsgi_app(environ, timed_start_response)
+
+    app.server.wsgi_app = timed_wsgi_app
+
+    @app.server.route("/startup-metrics")
+    def startup_metrics():
+        return jsonify(metrics)
+
+    return metrics
@@ -0,0 +1,94 @@
+"""
+Data versions: values that change when the data changes, used in the cache keys so that old entries are not used.
+
+- file_version(*paths): the modification times of data files, e.g. paralympics.csv and paralympics.db for the Dash apps
+- manifest_version(connection): a hash of the load_manifest table if the database has one (see
+  student/placeholder/workbook.py), the same in every process
+- database_version(connection): the manifest version, or if there is no manifest the modification time and size of the
+  database file and its WAL file
+- DataVersion(path): the database_version of a database, only worked out again when PRAGMA data_version shows that
+  another connection has committed a change
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+
+def file_version(*paths):
+    """ Return the modification times of the files, a value that changes when any of the files changes. """
+    return tuple(os.stat(path).st_mtime_ns for path in paths)
+
+
+def manifest_version(connection):
+    """ Return a hash of the sheet hashes in the load_manifest table, or None if the database does not have one.
+
+    Parameters
+    ----------
+    connection: sqlite3 connection, or a DB-API connection from SQLAlchemy's engine.raw_connection()
+    """
+    cursor = connection.cursor()
+    try:
+        rows = cursor.execute('SELECT sheet, content_hash FROM load_manifest ORDER BY sheet').fetchall()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        cursor.close()
+    if not rows:
+        return None
+    return 'manifest-' + hashlib.sha1(json.dumps([tuple(row) for row in rows]).encode()).hexdigest()
+
+
+def database_version(connection):
+    """ Return a value that changes when the data in an sqlite3 database changes.
+
+    If the database has a load_manifest table the version is manifest_version(), otherwise it is the modification time
+    and size of the database file and its WAL file. Both are the same for every process using the database. The file
+    times also change when SQLite copies the WAL file into the database, so the version occasionally changes when the
+    data has not, which only means a cached value is made again.
+
+    Parameters
+    ----------
+    connection: sqlite3 connection, or a DB-API connection from SQLAlchemy's engine.raw_connection()
+    """
+    version = manifest_version(connection)
+    if version is not None:
+        return version
+    cursor = connection.cursor()
+    try:
+        # The file of the main database, column 2 of PRAGMA database_list
+        path = cursor.execute('PRAGMA database_list').fetchone()[2]
+    finally:
+        cursor.close()
+    stats = []
+    for file in (path, f'{path}-wal'):
+        if file and os.path.exists(file):
+            stat = os.stat(file)
+            stats.append(f'{stat.st_mtime_ns}-{stat.st_size}')
+    return 'file-' + '-'.join(stats)
+
+
+class DataVersion:
+    """ Finds the database_version of a database using a connection kept open by the process.
+
+    PRAGMA data_version is a number that changes when another connection commits a change. It is cheap to read but the
+    number is only meaningful to the connection that reads it, so it is used to decide when to work out the
+    database_version again, which is the same in every process. Keeping the connection open also stops SQLite from
+    copying the WAL file into the database and deleting it each time the other connections are closed, which would
+    change the file times when the data has not changed.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._version = None
+
+    def get(self):
+        with self._lock:
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._version = database_version(self._conn)
+            return self._version
@@ -1,10 +1,8 @@
-import pathlib
-import pandas as pd
 import plotly.express as px
-import sqlite3
 import dash
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
+from student.dash_single.dataset import get_card_index, get_events, get_gender_ratios, get_geo
 
 
 def line_chart(feature):
@@ -28,13 +26,9 @@ def line_chart(feature):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
-    # Read the data from .csv into a DataFrame
+    # Get the events data, this is read from paralympics.csv once and then kept in memory
     cols = ["type", "year", "host", feature]
-
-    # Uses importlib.resources rather than pathlib.Path
-    # path to paralympic data
-    path = pathlib.Path(__file__).parent.parent.joinpath("data", "paralympics.csv")
-    line_chart_data = pd.read_csv(path, usecols=cols)
+    line_chart_data = get_events()[cols]
 
     # Create a Plotly Express line chart with the following parameters
     #    line_chart_data is the DataFrame
@@ -61,25 +55,12 @@ def bar_gender(event_type):
     Returns
     fig: Plotly Express bar chart
     """
-    cols = ['type', 'year', 'host', 'participants_m', 'participants_f', 'participants']
-    path = pathlib.Path(__file__).parent.parent.joinpath("data", "paralympics.csv")
-    df_events = pd.read_csv(path, usecols=cols)
-    # Drop Rome as there is no male/female data
-    # Drop rows where male/female data is missing
-    df_events = df_events.dropna(subset=['participants_m', 'participants_f'])
-    df_events.reset_index(drop=True, inplace=True)
-
-    # Add new columns that each contain the result of calculating the % of male and female participants
-    df_events['Male'] = df_events['participants_m'] / df_events['participants']
-    df_events['Female'] = df_events['participants_f'] / df_events['participants']
-
-    # Sort the values by Type and Year
-    df_events.sort_values(['type', 'year'], ascending=(True, True), inplace=True)
-    # Create a new column that combines Location and Year to use as the x-axis
-    df_events['xlabel'] = df_events['host'] + ' ' + df_events['year'].astype(str)
+    # The ratios for all event types are calculated once, see build_gender_ratios() in dataset.py
+    # Select the rows for the event type
+    ratios = get_gender_ratios()
+    df_events = ratios.loc[ratios['type'] == event_type]
 
     # Create the stacked bar plot of the % for male and female
-    df_events = df_events.loc[df_events['type'] == event_type]
     fig = px.bar(df_events,
                     x='xlabel',
                     y=['Male', 'Female'],
@@ -94,26 +75,9 @@ def bar_gender(event_type):
 
 
 def scatter_geo():
-    path = pathlib.Path(__file__).parent.parent.joinpath("data", "paralympics.db")
-    # create database connection
-    connection = sqlite3.connect(path)
-
-    # define the sql query
-    sql = '''
-    SELECT event.year, host.host, host.latitude, host.longitude FROM event
-    JOIN host_event ON event.event_id = host_event.event_id
-    JOIN host on host_event.host_id = host.host_id
-    '''
-
-    # Use pandas read_sql to run a sql query and access the results as a DataFrame
-    df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
-
-    # The lat and lon are stored as string but need to be floats for the scatter_geo
-    df_locs['longitude'] = df_locs['longitude'].astype(float)
-    df_locs['latitude'] = df_locs['latitude'].astype(float)
-
-    # Adds a new column that concatenates the city and year e.g. Barcelona 2012
-    df_locs['name'] = df_locs['host'] + ' ' + df_locs['year'].astype(str)
+    # Get the host locations, this is read from the host_geo table in paralympics.db once and then kept in memory.
+    # The lat and lon are stored as REAL and the 'name' column (e.g. Barcelona 2012) is stored in the table.
+    df_locs = get_geo()
 
     # Create the figure
     fig = px.scatter_geo(df_locs,
@@ -142,32 +106,29 @@ def create_card(host_year):
     # Drop the last 5 digits (a space followed by the year) to the host city
     host = host_year[:-5] # add code in the brackets to get a slice of the string
 
-    # Read the data into a DataFrame from the SQLite database
-    path = pathlib.Path(__file__).parent.parent.joinpath("data", "paralympics.db")
-    conn = sqlite3.connect(path)
-    with conn:
-        conn.execute("PRAGMA foreign_keys = ON")
-        query = "SELECT * FROM event JOIN  host_event ON event.event_id = host_event.event_id JOIN host ON host_event.host_id = host.host_id WHERE event.year = ? AND host.host = ?;"
-        event_df = pd.read_sql_query(query, conn, params=[year, host])
-
-        # Variables for the card contents, the first is done for you as an example
-        logo_path = f'logos/{year}_{host}.jpg'
-        highlights = f'{event_df['highlights'].item()}'
-        participants = f'{event_df['participants'].item()} athletes'
-        events = f'{event_df['events'].item()} events'
-        countries = f'{event_df['countries'].item()} participating teams'
-        # sports = f'{event_df['sports'].item()} sports'
-
-        card = dbc.Card([
-            dbc.CardImg(src=dash.get_asset_url(logo_path), style={'max-width': '60px'}, top=True),
-            dbc.CardBody([
-                html.H4(host_year, className="card-title"),
-                html.P(highlights, className="card-text", ),
-                html.P(participants, className="card-text", ),
-                html.P(events, className="card-text", ),
-                html.P(countries, className="card-text", ),
-            ]),
-        ],
-            style={"width": "18rem"},
-        )
-        return card
+    # Find the event using the host and year, the index is created once from the database and held in memory
+    event = get_card_index().get(host_year)
+    if event is None:
+        return dbc.Alert("Event not found", color="danger")
+
+    # Variables for the card contents, the first is done for you as an example
+    logo_path = f'logos/{year}_{host}.jpg'
+    highlights = f'{event["highlights"]}'
+    participants = f'{event["participants"]} athletes'
+    events = f'{event["events"]} events'
+    countries = f'{event["countries"]} participating teams'
+    # sports = f'{event["sports"]} sports'
+
+    card = dbc.Card([
+        dbc.CardImg(src=dash.get_asset_url(logo_path), style={'max-width': '60px'}, top=True),
+        dbc.CardBody([
+            html.H4(host_year, className="card-title"),
+            html.P(highlights, className="card-text", ),
+            html.P(participants, className="card-text", ),
+            html.P(events, className="card-text", ),
+            html.P(countries, className="card-text", ),
+        ]),
+    ],
+        style={"width": "18rem"},
+    )
+    return card
@@ -0,0 +1,173 @@
+"""
+Shared in-memory copy of the paralympics data used by the Dash charts.
+
+The csv and database files are read the first time a chart needs them and the DataFrames are kept in memory.
+Each request checks the modification time of the file, if the file has changed then the data is read again.
+
+Usage:
+    from student.dash_single.dataset import get_events, get_hosts, get_card_index, cache_stats
+    df = get_events()
+    print(cache_stats())  # e.g. {'hits': 12, 'misses': 2, ...}
+
+The DataFrames are shared between callbacks so treat them as read-only, use df.copy() before changing them.
+"""
+import pathlib
+
+import pandas as pd
+
+from shared.dataset_cache import DatasetCache
+from shared.db_pool import get_pool
+from shared.queries import GEO_SQL, HOSTS_SQL
+from shared.versions import file_version
+
+DATA_DIR = pathlib.Path(__file__).parent.parent.joinpath("data")
+CSV_PATH = DATA_DIR.joinpath("paralympics.csv")
+DB_PATH = DATA_DIR.joinpath("paralympics.db")
+
+# Column types for the events data in paralympics.csv
+# participants_m and participants_f are float as Rome 1960 has no male/female data (NaN)
+EVENT_DTYPES = {
+    "type": str,
+    "year": "int64",
+    "host": str,
+    "countries": "int64",
+    "events": "int64",
+    "sports": "int64",
+    "participants_m": "float64",
+    "participants_f": "float64",
+    "participants": "int64",
+}
+
+
+def load_events(path):
+    """ Read the events data from the csv file into a DataFrame with typed columns.
+
+    Parameters
+    path: path to paralympics.csv
+
+    Returns
+    df: pandas DataFrame
+    """
+    return pd.read_csv(path, usecols=list(EVENT_DTYPES), dtype=EVENT_DTYPES)
+
+
+def load_hosts(path):
+    """ Read the events and their hosts from the database into a DataFrame with typed columns.
+
+    Future Games (e.g. 2028) have no counts yet so the counts use the nullable integer type rather than float.
+    The 'name' column combines the host and year e.g. Barcelona 1992, this is the hover text on the map.
+
+    Parameters
+    path: path to paralympics.db
+
+    Returns
+    df: pandas DataFrame
+    """
+    with get_pool(path).connection() as connection:
+        df = pd.read_sql_query(HOSTS_SQL, connection)
+    for col in ['countries', 'events', 'sports', 'participants']:
+        df[col] = df[col].astype('Int64')
+    df['name'] = df['host'] + ' ' + df['year'].astype(str)
+    return df
+
+
+def load_geo(path):
+    """ Read the locations of the hosts from the host_geo table, the columns are already the types the map needs.
+
+    Parameters
+    path: path to paralympics.db
+
+    Returns
+    df: pandas DataFrame with the columns year, host, latitude, longitude and name
+    """
+    with get_pool(path).connection() as connection:
+        return pd.read_sql_query(GEO_SQL, connection)
+
+
+def build_card_index(hosts_df):
+    """ Create a dictionary of the card contents for each event keyed by the host and year e.g. 'Barcelona 1992'.
+
+    The key is the same as the hover text on the map so the card can be found without a query.
+
+    Parameters
+    hosts_df: DataFrame returned by load_hosts()
+
+    Returns
+    index: dict of {host_year: dict of card values}
+    """
+    cols = ['year', 'host', 'highlights', 'participants', 'events', 'countries', 'sports']
+    # Missing counts (e.g. for future Games) are pd.NA in the Int64 columns, replace them with None so the card shows
+    # them the same way as when it read the row from the database
+    values = hosts_df[cols].astype(object)
+    records = values.where(values.notna(), None).to_dict(orient='records')
+    return dict(zip(hosts_df['name'], records))
+
+
+def build_gender_ratios(events_df):
+    """ Calculate the ratio of male and female participants for every event, for both summer and winter.
+
+    The calculation is done once for all event types so the bar chart for each type only needs to select its rows.
+
+    Parameters
+    events_df: DataFrame returned by load_events()
+
+    Returns
+    df: DataFrame with the columns type, year, xlabel, Male and Female sorted by type and year
+    """
+    # Drop rows where male/female data is missing, e.g. Rome 1960
+    df = events_df.dropna(subset=['participants_m', 'participants_f'])
+    df = df.sort_values(['type', 'year'], ignore_index=True)
+    # Divide both columns by the total in one operation
+    ratios = df[['participants_m', 'participants_f']].div(df['participants'], axis=0)
+    return pd.DataFrame({
+        'type': df['type'],
+        'year': df['year'],
+        # Combines the host and year to use as the x-axis e.g. Barcelona 1992
+        'xlabel': df['host'] + ' ' + df['year'].astype(str),
+        'Male': ratios['participants_m'],
+        'Female': ratios['participants_f'],
+    })
+
+
+# One cache shared by all the charts in the process
+_cache = DatasetCache()
+
+
+def get_events():
+    """ Return the events data from paralympics.csv """
+    return _cache.get("events", CSV_PATH, load_events)
+
+
+def get_hosts():
+    """ Return the events joined to their hosts from paralympics.db """
+    return _cache.get("hosts", DB_PATH, load_hosts)
+
+
+def get_geo():
+    """ Return the locations of the hosts for the map from paralympics.db """
+    return _cache.get("geo", DB_PATH, load_geo)
+
+
+def get_card_index():
+    """ Return the card contents for each event keyed by the host and year, see build_card_index() """
+    return _cache.get("card_index", DB_PATH, lambda path: build_card_index(get_hosts()))
+
+
+def get_gender_ratios():
+    """ Return the male and female participant ratios for every event, see build_gender_ratios() """
+    return _cache.get("gender_ratios", CSV_PATH, lambda path: build_gender_ratios(get_events()))
+
+
+def data_version():
+    """ Return a value that changes whenever the csv or database file changes. """
+    return file_version(CSV_PATH, DB_PATH)
+
+
+def cache_stats():
+    """ Return the hit and miss counters for the shared dataset cache. """
+    return _cache.stats()
+
+
+def clear_cache():
+    """ Empty the shared dataset cache, e.g. between tests. """
+    _cache.clear()
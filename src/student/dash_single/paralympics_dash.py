@@ -1,9 +1,16 @@
+# Record the start time before the imports as they are a large part of the import time, see startup.py
+import time
+import_start = time.perf_counter()
+
 import pathlib
 # Imports for Dash and Dash.html and dcc
-from dash import Dash, html, dcc, Input, Output
+from dash import Dash, html, dcc, Input, Output, State, Patch
 # Import Dash Bootstrap
 import dash_bootstrap_components as dbc
 from student.dash_single.charts import line_chart, bar_gender, scatter_geo, create_card
+from student.dash_single.dataset import data_version
+from shared.figure_cache import cached_figure
+from shared.startup import get_startup_mode, record_startup_metrics, set_layout, start_warm_up
 import os
 from selenium.webdriver.chrome.options import Options
 
@@ -17,107 +24,188 @@ meta_tags = [
 # Bootstrap styling from dash bootstrap components (dbc)
 external_stylesheets = [dbc.themes.BOOTSTRAP]
 
+# Set the environment variable CLIENTSIDE_LINE_CHART=1 to change the line chart in the browser rather than on the server.
+# All the line chart figures are sent once in a dcc.Store and a JavaScript callback picks the one for the dropdown value.
+CLIENTSIDE_LINE_CHART = os.environ.get("CLIENTSIDE_LINE_CHART", "0") == "1"
+
+# The values in the dropdown, these are the column names in the data
+LINE_CHART_FEATURES = ["events", "sports", "countries", "participants"]
+
 # Pass the stylesheet and meta_tag variables to the Dash app constructor
 app = Dash(__name__, external_stylesheets=external_stylesheets,
            meta_tags=meta_tags,)
 
-# Create the Plotly Express line chart object, e.g. to show number of sports
-line_fig = line_chart("sports")
-
-# Create the Plotly Express bar chart object
-bar_fig = bar_gender("summer")  # Insert 'winter' or 'summer'
-
-# Create the scatter map
-map = scatter_geo()
-
-# Create a card variable
-card = create_card("Barcelona 1992")
-
-# Defining variables for each row
-# Row 1
-row_one = dbc.Row([
-    dbc.Col([html.H1("Paralympics Data Analytics"),
-             html.P("""Lorem ipsum dolor sit amet, consectetur adipiscing elit.
-                    Praesent congue luctus elit nec gravida.""")], width=12)
-])
-
-# Row 2
-row_two = dbc.Row([
-    dbc.Col(children=[dbc.Select(options=[
-        {"label": "Events", "value": "events"},  # The value is in the format of the column heading in the data
-        {"label": "Sports", "value": "sports"},
-        {"label": "Countries", "value": "countries"},
-        {"label": "Athletes", "value": "participants"},
-    ], value="events",  # The default selection
-    id="dropdown-input",  # id uniquely identifies the element, will be needed later for callbacks
-    )], width=4),
-
-    dbc.Col(children=[html.Div([
-        dbc.Label("Select the Paralympic Games type"),
-        dbc.Checklist(
-            options=[
-                {"label": "Summer", "value": "summer"},
-                {"label": "Winter", "value": "winter"},
-            ],
-            value=["summer"],  # Values is a list as you can select 1 AND 2
-            id="checklist-input"),
-        ])], width={"size": 4, "offset": 2}),
-    # 2 'empty' columns between this and the previous column
-])
-
-# Row 3
-row_three = dbc.Row([
-    dbc.Col(children=[dcc.Graph(id="line-chart", figure=line_fig), ], width=6),
-    dbc.Col(children=[], id='bar-div', width=6),
-], align="start")
-
-# Row 4
-row_four = dbc.Row([
-    dbc.Col(children=[dcc.Graph(id='map', figure=map)], width=8),
-    dbc.Col(children=[card], id='card', width=4),
-], align="start")
-
-# Wrap the layout in a Bootstrap container
-app.layout = dbc.Container([
-    # The layout will go here
-    row_one,
-    row_two,
-    row_three,
-    row_four,
-    # # Add the line chart to the layout
-    # dcc.Graph(id="line-chart", figure=line_fig),
-    # # Add the bar chart to the layout
-    # dcc.Graph(id="bar-chart", figure=bar_fig),
-    # dcc.Graph(id="geo-scatter", figure=map)
-])
+# eager, lazy or warm, see startup.py
+STARTUP_MODE = get_startup_mode()
+
+
+def create_layout(with_figures=True):
+    """ Creates the app layout.
+
+    The figures come from the figure cache, so after the first call the layout is quick to create. This means that
+    the function itself can be used as the layout (see DASH_STARTUP_MODE in startup.py), in which case Dash calls it
+    for each page load and the figures are created on the first request rather than when the module is imported.
+
+    Parameters
+    with_figures: False for the same layout with empty figures, used by Dash to check the callbacks without reading
+        the data
+
+    Returns
+    layout: dbc.Container with the rows of the layout
+    """
+    if with_figures:
+        version = data_version()
+
+        # Create the Plotly Express line chart object, e.g. to show number of sports
+        line_fig = cached_figure(line_chart, "sports", version=version)
+
+        # Create the scatter map
+        map = cached_figure(scatter_geo, version=version)
+
+        # Create a card variable
+        card = create_card("Barcelona 1992")
+    else:
+        line_fig, map, card = {}, {}, html.Div()
+
+    # Defining variables for each row
+    # Row 1
+    row_one = dbc.Row([
+        dbc.Col([html.H1("Paralympics Data Analytics"),
+                 html.P("""Lorem ipsum dolor sit amet, consectetur adipiscing elit.
+                        Praesent congue luctus elit nec gravida.""")], width=12)
+    ])
+
+    # Row 2
+    row_two = dbc.Row([
+        dbc.Col(children=[dbc.Select(options=[
+            {"label": "Events", "value": "events"},  # The value is in the format of the column heading in the data
+            {"label": "Sports", "value": "sports"},
+            {"label": "Countries", "value": "countries"},
+            {"label": "Athletes", "value": "participants"},
+        ], value="events",  # The default selection
+        id="dropdown-input",  # id uniquely identifies the element, will be needed later for callbacks
+        )], width=4),
+
+        dbc.Col(children=[html.Div([
+            dbc.Label("Select the Paralympic Games type"),
+            dbc.Checklist(
+                options=[
+                    {"label": "Summer", "value": "summer"},
+                    {"label": "Winter", "value": "winter"},
+                ],
+                value=["summer"],  # Values is a list as you can select 1 AND 2
+                id="checklist-input"),
+            ])], width={"size": 4, "offset": 2}),
+        # 2 'empty' columns between this and the previous column
+    ])
+
+    # The line chart figure for every feature, only used when CLIENTSIDE_LINE_CHART is set
+    line_figs = {}
+    if CLIENTSIDE_LINE_CHART and with_figures:
+        line_figs = {feature: cached_figure(line_chart, feature, version=version) for feature in LINE_CHART_FEATURES}
+
+    # Row 3
+    row_three = dbc.Row([
+        dbc.Col(children=[dcc.Graph(id="line-chart", figure=line_fig),
+                          dcc.Store(id="line-chart-store", data=line_figs), ], width=6),
+        dbc.Col(children=[], id='bar-div', width=6),
+        # The event types that have a chart in 'bar-div', in the same order as the charts
+        dcc.Store(id='bar-div-types', data=[]),
+    ], align="start")
+
+    # Row 4
+    row_four = dbc.Row([
+        dbc.Col(children=[dcc.Graph(id='map', figure=map)], width=8),
+        dbc.Col(children=[card], id='card', width=4),
+    ], align="start")
+
+    # Wrap the layout in a Bootstrap container
+    return dbc.Container([
+        # The layout will go here
+        row_one,
+        row_two,
+        row_three,
+        row_four,
+        # # Add the line chart to the layout
+        # dcc.Graph(id="line-chart", figure=line_fig),
+        # # Add the bar chart to the layout
+        # dcc.Graph(id="bar-chart", figure=bar_fig),
+        # dcc.Graph(id="geo-scatter", figure=map)
+    ])
+
+
+# eager: create the figures now, lazy or warm: when a page is requested, see startup.py
+set_layout(app, create_layout, STARTUP_MODE)
 
 
-@app.callback(
-    Output(component_id='line-chart', component_property='figure'),
-    Input(component_id='dropdown-input', component_property='value')
-)
 def update_line_chart(feature):
-    figure = line_chart(feature)
+    # The figure for each feature is only created once, see figure_cache.py
+    figure = cached_figure(line_chart, feature, version=data_version())
     return figure
 
 
+if CLIENTSIDE_LINE_CHART:
+    # Runs in the browser: select the figure for the feature from the store, no request is sent to the server
+    app.clientside_callback(
+        """
+        function(feature, figures) {
+            if (!figures || !(feature in figures)) {
+                return window.dash_clientside.no_update;
+            }
+            return figures[feature];
+        }
+        """,
+        Output(component_id='line-chart', component_property='figure'),
+        Input(component_id='dropdown-input', component_property='value'),
+        State(component_id='line-chart-store', component_property='data'),
+    )
+else:
+    # Runs on the server, creates (or gets from the cache) the figure for the feature
+    app.callback(
+        Output(component_id='line-chart', component_property='figure'),
+        Input(component_id='dropdown-input', component_property='value')
+    )(update_line_chart)
+
+
 @app.callback(
     Output(component_id='bar-div', component_property='children'),
-    Input(component_id='checklist-input', component_property='value')
+    Output(component_id='bar-div-types', component_property='data'),
+    Input(component_id='checklist-input', component_property='value'),
+    State(component_id='bar-div-types', component_property='data'),
 )
-def update_bar_chart(selected_values):
+def update_bar_chart(selected_values, shown_values):
     """ Updates the bar chart based on the checklist selection.
-     Creates one chart for each of the selected values.
+     There is one chart for each of the selected values.
+
+     Rather than creating all the charts again, a Patch is returned that only removes the charts for values that are
+     no longer selected and adds charts for newly selected values. The charts that are already shown are not sent.
+
+     Parameters
+     selected_values: list of the event types selected in the checklist
+     shown_values: list of the event types that already have a chart, in the same order as the charts
+
+     Returns
+     patch: Patch for the children of 'bar-div'
+     shown: the event types that have a chart after the patch is applied
      """
-    figures = []
-    # Iterate the list of values from the checkbox component
+    shown_values = shown_values or []
+    patch = Patch()
+    # Remove the charts that are no longer selected, starting from the end so the earlier positions do not change
+    for position in reversed(range(len(shown_values))):
+        if shown_values[position] not in selected_values:
+            del patch[position]
+    shown = [value for value in shown_values if value in selected_values]
+
+    # Add a chart for each newly selected value
+    version = data_version()
     for value in selected_values:
-        fig = bar_gender(value)
-        # Assign id to be used to identify the charts
-        id = f"bar-chart-{value}"
-        element = dcc.Graph(figure=fig, id=id)
-        figures.append(element)
-    return figures
+        if value not in shown:
+            fig = cached_figure(bar_gender, value, version=version)
+            # Assign id to be used to identify the charts
+            id = f"bar-chart-{value}"
+            patch.append(dcc.Graph(figure=fig, id=id))
+            shown.append(value)
+    return patch, shown
 
 
 @app.callback(
@@ -149,6 +237,22 @@ def pytest_setup_options():
         options.add_argument("start-maximized")
     return options
 
+
+def warm_up():
+    """ Create the layout and the figure for every callback input so that they are in the figure cache. """
+    create_layout()
+    version = data_version()
+    for feature in LINE_CHART_FEATURES:
+        cached_figure(line_chart, feature, version=version)
+    for event_type in ["summer", "winter"]:
+        cached_figure(bar_gender, event_type, version=version)
+
+
+if STARTUP_MODE == "warm":
+    start_warm_up(warm_up)
+
+startup_metrics = record_startup_metrics(app, import_start, STARTUP_MODE)
+
 # Run the app
 if __name__ == '__main__':
     app.run(debug=True, port=5050)
@@ -2,12 +2,14 @@ import os
 
 from flask import Flask
 from .db import init_app
+from .model_service import debug_model
 
 
 def create_app(test_config=None):
     # create the Flask app
     app = Flask(__name__, instance_relative_config=True)
     init_app(app)
+    app.add_url_rule('/debug/model', 'debug_model', debug_model)
 
     # Put the following code inside the create_app function after the code to ensure the instance folder exists
     with app.app_context():
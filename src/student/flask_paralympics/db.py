@@ -1,6 +1,15 @@
 """Copied from https://flask.palletsprojects.com/en/stable/tutorial/database/#define-and-access-the-database
 To create the database you need to run the following command in a Terminal:
 flask --app tutor.flask_para_sqlite init-db
+
+Each connection is opened with the SQLite settings (PRAGMAs) in DEFAULT_SQLITE_PRAGMAS. WAL mode lets the pages be
+read while a quiz response or prediction is being written, instead of failing with 'database is locked'.
+To change a setting add SQLITE_PRAGMAS to the app config e.g. in instance/config.py:
+    SQLITE_PRAGMAS = {'mmap_size': 0, 'busy_timeout': 10000}
+A setting with the value None is not applied. To print the settings used by the connection run:
+flask --app student.flask_paralympics db-settings
+
+To record the queries, their times and the slowest queries set QUERY_LOG = True in the config, see query_log.py
 """
 import importlib.resources
 import sqlite3
@@ -8,25 +17,75 @@ from datetime import datetime
 
 import click
 from flask import current_app, g
+from flask.cli import with_appcontext
+
+from shared.indexes import create_indexes
+from shared.versions import DataVersion
+from student.flask_paralympics.query_log import TracingConnection, debug_queries, get_query_log
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers do not block the writer and the writer does not block readers
+    'synchronous': 'NORMAL',  # safe in WAL mode, the WAL file is not synced on every commit
+    'mmap_size': 268435456,  # 256 MB, read the file using memory-mapped I/O
+    'cache_size': -64000,  # negative values are in KiB, so 64 MB of page cache per connection
+    'temp_store': 'MEMORY',  # temporary tables and indexes e.g. for ORDER BY are kept in memory
+    'busy_timeout': 5000,  # milliseconds to wait for a lock before 'database is locked'
+}
+
+
+def get_sqlite_pragmas():
+    """Return the SQLite settings to use, the defaults updated with SQLITE_PRAGMAS from the app config."""
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **current_app.config.get('SQLITE_PRAGMAS', {})}
+    unknown = set(pragmas) - set(DEFAULT_SQLITE_PRAGMAS)
+    if unknown:
+        raise ValueError(f'Unknown SQLITE_PRAGMAS {sorted(unknown)}. Must be from {list(DEFAULT_SQLITE_PRAGMAS)}')
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_sqlite_pragmas(db, pragmas):
+    """Apply the settings to a connection.
+
+    The names have been checked by get_sqlite_pragmas; the values cannot be passed as ? parameters in a PRAGMA so
+    only integers and words are allowed.
+    """
+    for name, value in pragmas.items():
+        if not isinstance(value, int) and not str(value).isalpha():
+            raise ValueError(f'Invalid value for SQLite PRAGMA {name}: {value!r}')
+        db.execute(f'PRAGMA {name} = {value};')
+
 
 # Copied from https://flask.palletsprojects.com/en/stable/tutorial/database/
 def get_db():
     if 'db' not in g:
+        # The query log is optional, when it is off a normal sqlite3 connection is used
+        query_log = current_app.config.get('QUERY_LOG', False)
         g.db = sqlite3.connect(
             current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            factory=TracingConnection if query_log else sqlite3.Connection
         )
+        if query_log:
+            g.db.query_log = get_query_log()
         g.db.row_factory = sqlite3.Row
 
         # Enable foreign key support
         g.db.execute('PRAGMA foreign_keys = ON;')
 
-        # Print SQL to the terminal for debugging purposes
-        g.db.set_trace_callback(trace_callback)
+        # Performance settings, see DEFAULT_SQLITE_PRAGMAS
+        apply_sqlite_pragmas(g.db, get_sqlite_pragmas())
 
     return g.db
 
 
+def get_data_version():
+    """Return the DataVersion of the app's database, creating it the first time, see shared/versions.py."""
+    data_version = current_app.extensions.get('data_version')
+    if data_version is None:
+        data_version = DataVersion(current_app.config['DATABASE'])
+        current_app.extensions['data_version'] = data_version
+    return data_version
+
+
 # Copied from https://flask.palletsprojects.com/en/stable/tutorial/database/
 def close_db(e=None):
     db = g.pop('db', None)
@@ -44,6 +103,9 @@ def init_db():
         with current_app.open_resource(str(sql_path)) as f:
             db.executescript(f.read().decode('utf8'))
 
+    # Add the secondary indexes for the lookups and joins, see shared/indexes.py
+    create_indexes(db.cursor(), db)
+
 
 @click.command('init-db')
 def init_db_command():
@@ -52,6 +114,19 @@ def init_db_command():
     click.echo('Initialized the database.')
 
 
+@click.command('db-settings')
+@with_appcontext
+def db_settings_command():
+    """Print the SQLite settings used by the database connection."""
+    db = get_db()
+    pragmas = get_sqlite_pragmas()
+    click.echo(f"Database: {current_app.config['DATABASE']}")
+    for name in ['foreign_keys', *DEFAULT_SQLITE_PRAGMAS]:
+        effective = db.execute(f'PRAGMA {name};').fetchone()[0]
+        configured = pragmas.get(name, 'ON' if name == 'foreign_keys' else 'not set')
+        click.echo(f'{name}: {effective} (configured: {configured})')
+
+
 sqlite3.register_converter(
     "timestamp", lambda v: datetime.fromisoformat(v.decode())
 )
@@ -61,8 +136,5 @@ sqlite3.register_converter(
 def init_app(app):
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
-
-
-def trace_callback(query):
-    """Trace function to log queries."""
-    print("Executing query:", query)
+    app.cli.add_command(db_settings_command)
+    app.add_url_rule('/debug/queries', 'debug_queries', debug_queries)
@@ -0,0 +1,238 @@
+"""
+Loads the machine learning model once per process and uses it for the predictions, see activities/week8/8-6-page-ml.md.
+
+The version of make_prediction in the activity loads data/model.pkl with joblib for every prediction, and the model
+predicts one (year, team) at a time. Instead the ModelService:
+
+- loads the model the first time it is needed and keeps it for the following requests
+- checks the modification time, size and inode of the pkl file before each prediction and loads the model again if the
+  file has changed, e.g. after running create_ml_model.py, so the app does not need to be restarted
+- can memory-map the numpy arrays in the model with joblib.load(path, mmap_mode='r'). The arrays are then read from
+  the file by the operating system and shared by the worker processes rather than copied into each one. This only
+  makes a difference for a large model saved without compression
+- predicts a list of (year, team) pairs with one call to predict(), used by the POST /api/predict route in routes.py
+- records the time of each prediction, the median (p50) and 99th percentile (p99) are at /debug/model
+- keeps the results in an LRUCache (shared/lru.py), so a (year, team) that has already been asked for is a dict
+  lookup. The key includes a hash of the pkl file so results from an old model are not used. Optionally the predictions
+  for every team in a range of years are made when the model is loaded, one call to predict() for the whole grid
+
+MODEL_PATH can also be a .npz file saved by coefficient_model.py, which is loaded with NumPy so scikit-learn is not
+imported.
+
+Config (all optional):
+    MODEL_PATH = 'path/to/model.pkl'  # .pkl or .npz, defaults to model.pkl in the student.data package
+    MODEL_MMAP_MODE = 'r'  # memory-map the arrays of a .pkl model, None (default) to load them into memory
+    MODEL_LATENCY_SIZE = 1000  # the number of recent prediction times used for p50 and p99
+    PREDICTION_CACHE_SIZE = 4096  # the most results kept in the least recently used cache, 0 for no cache
+    PREDICTION_CACHE_TTL = None  # seconds a result is kept, None to keep it until it is the least recently used
+    MODEL_PRECOMPUTE_YEARS = (1960, 2040)  # predict every team for these years (inclusive) when the model is loaded
+
+The model and the cache are kept in memory in each process, so with more than one gunicorn worker each has its own.
+The cache hits, misses and evictions are at /debug/model.
+"""
+import hashlib
+import importlib.resources
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from flask import current_app, jsonify
+
+from shared.lru import LRUCache
+from student.placeholder.coefficient_model import CoefficientModel
+
+
+def file_hash(path):
+    """ Return the SHA-256 hash of the contents of the file. """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ModelService:
+    """ Loads the model from a pkl file once, and again if the file changes, and makes predictions with it.
+
+    Attributes:
+        path (str): the path of the pkl file
+        mmap_mode (str): passed to joblib.load, 'r' to memory-map the arrays or None to load them
+        cache (LRUCache): results of earlier predictions, or None to predict every time
+        precompute_years (tuple): (first year, last year) to predict for every team when the model is loaded, or None
+        model_hash (str): SHA-256 hash of the pkl file the model was loaded from
+        loads (int): the number of times the model has been loaded
+    """
+
+    def __init__(self, path, mmap_mode=None, latency_size=1000, cache=None, precompute_years=None):
+        self.path = str(path)
+        self.mmap_mode = mmap_mode
+        self.cache = cache
+        self.precompute_years = precompute_years
+        self._lock = threading.Lock()
+        self._model = None
+        self._teams = None
+        self._file_version = None
+        self._grid = {}
+        self._grid_hits = 0
+        self._latencies = deque(maxlen=latency_size)
+        self.model_hash = None
+        self.loads = 0
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def get_model(self):
+        """ Return the model, its teams and the hash of its file, loading it if it has not been loaded or the file has
+        changed since it was loaded. """
+        file_version = self._stat()
+        with self._lock:
+            if file_version != self._file_version:
+                model = _load_model(self.path, self.mmap_mode)
+                self._model = model
+                self._teams = _known_teams(model)
+                self.model_hash = file_hash(self.path)
+                self._grid = self._precompute(model, self._teams)
+                self._file_version = file_version
+                self.loads += 1
+            return self._model, self._teams, self.model_hash
+
+    def _precompute(self, model, teams):
+        """ Return {(year, team): prediction} for every team and year in precompute_years, or {} if it is not set. """
+        if self.precompute_years is None or not teams:
+            return {}
+        first, last = self.precompute_years
+        grid = [(year, team) for year in range(first, last + 1) for team in sorted(teams)]
+        if not grid:
+            return {}
+        return dict(zip(grid, _predict(model, grid)))
+
+    def predict(self, inputs):
+        """ Predict the total medals for each (year, team).
+
+        Results are taken from the precomputed grid, then the cache, and the rest are predicted with one call to the
+        model's predict method.
+
+        Parameters
+        ----------
+        inputs: list of (year, team) tuples
+
+        Returns
+        -------
+        predictions: list with an int for each input, or None if the model was not trained with the team
+        """
+        start = time.perf_counter()
+        model, teams, model_hash = self.get_model()
+        grid = self._grid
+        results = {}
+        for year, team in inputs:
+            if (year, team) in grid:
+                results[(year, team)] = grid[(year, team)]
+        grid_hits = len(results)
+
+        # Look up the rest in the cache, the key includes the model hash so results from an old model are not used
+        missing = {pair for pair in inputs if pair not in results}
+        if missing and self.cache is not None:
+            found = self.cache.get_many([(model_hash, year, team) for year, team in missing])
+            results.update({(year, team): result for (_, year, team), result in found.items()})
+            missing = {pair for pair in missing if pair not in results}
+
+        if missing:
+            # The model cannot predict teams it was not trained with, and one unknown team makes predict() fail for all
+            new_results = {pair: None for pair in missing}
+            known = [pair for pair in missing if teams is None or pair[1] in teams]
+            if known:
+                new_results.update(zip(known, _predict(model, known)))
+            results.update(new_results)
+            if self.cache is not None:
+                self.cache.set_many({(model_hash, year, team): result for (year, team), result in new_results.items()})
+
+        with self._lock:
+            self._grid_hits += grid_hits
+            self._latencies.append(((time.perf_counter() - start) * 1000, len(inputs)))
+        return [results[pair] for pair in inputs]
+
+    def stats(self):
+        """ Return the number of loads and the p50 and p99 of the recent prediction times in milliseconds. """
+        with self._lock:
+            latencies = list(self._latencies)
+        stats = {'path': self.path, 'mmap_mode': self.mmap_mode, 'model_hash': self.model_hash, 'loads': self.loads,
+                 'predictions': len(latencies), 'precomputed': len(self._grid), 'precomputed_hits': self._grid_hits,
+                 'cache': self.cache.stats() if self.cache is not None else None}
+        if latencies:
+            ms = np.array([latency for latency, rows in latencies])
+            rows = sum(rows for latency, rows in latencies)
+            stats.update({'p50_ms': float(np.percentile(ms, 50)), 'p99_ms': float(np.percentile(ms, 99)),
+                          'rows': rows, 'ms_per_row': float(ms.sum() / rows) if rows else None})
+        return stats
+
+
+def _load_model(path, mmap_mode=None):
+    """ Return the model from a .npz file saved by coefficient_model.py, or from a .pkl file saved with joblib. """
+    if path.endswith('.npz'):
+        return CoefficientModel.load(path)
+    # joblib is only needed for the prediction pages so is imported here, see requirements.txt
+    import joblib
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def _predict(model, pairs):
+    """ Return the predictions for a list of (year, team) pairs with one call to the model's predict method. """
+    # The predict() method fails if not in DataFrame format
+    input_data = pd.DataFrame({'Year': [year for year, team in pairs], 'Team': [team for year, team in pairs]})
+    # predict() returns floats so convert to int and handle negative predictions
+    return [max(0, int(value)) for value in model.predict(input_data)]
+
+
+def _known_teams(model):
+    """ Return the set of teams the model's OneHotEncoder was trained with, or None if it does not have one. """
+    if isinstance(model, CoefficientModel):
+        return set(model.teams.tolist())
+    try:
+        encoder = model.named_steps['preprocessor'].named_transformers_['team']
+        return set(encoder.categories_[0])
+    except (AttributeError, KeyError):
+        return None
+
+
+def get_model_service():
+    """ Return the ModelService for the app, creating it from the app config the first time. """
+    service = current_app.extensions.get('model_service')
+    if service is None:
+        path = current_app.config.get('MODEL_PATH')
+        if path is None:
+            path = importlib.resources.files('student.data').joinpath('model.pkl')
+        cache_size = current_app.config.get('PREDICTION_CACHE_SIZE', 4096)
+        cache = LRUCache(cache_size, current_app.config.get('PREDICTION_CACHE_TTL')) if cache_size else None
+        service = ModelService(path, current_app.config.get('MODEL_MMAP_MODE'),
+                               current_app.config.get('MODEL_LATENCY_SIZE', 1000), cache,
+                               current_app.config.get('MODEL_PRECOMPUTE_YEARS'))
+        current_app.extensions['model_service'] = service
+    return service
+
+
+def make_prediction(year, team):
+    """Takes the year and team name and predicts how many total medals will be won
+
+    Parameters:
+    year (int): The year of the prediction
+    team (str): The name of the team
+
+    Returns:
+    prediction (str or int): int of the prediction result, or string if error
+    """
+    try:
+        prediction = get_model_service().predict([(year, team)])[0]
+    except Exception as e:
+        return f"Error making prediction: {e}"
+    if prediction is None:
+        return f"Error making prediction: the model has no data for {team}"
+    return prediction
+
+
+def debug_model():
+    """ Return the model load count, the p50 and p99 prediction times and the cache counters as JSON. """
+    return jsonify(get_model_service().stats())
@@ -0,0 +1,166 @@
+"""
+Optional log of the SQL queries run by the app, used instead of printing every query to the terminal.
+
+The log is off by default and then the app uses normal sqlite3 connections, so there is no extra work per query.
+To turn it on add the following to the app config e.g. in instance/config.py:
+    QUERY_LOG = True
+    QUERY_LOG_SIZE = 500  # the number of most recent queries kept in memory
+    SLOW_QUERY_MS = 100  # queries that take longer than this are also written to the 'paralympics.queries' logger
+
+The slowest recent queries can then be seen as JSON at /debug/queries?n=10
+
+The time for a query includes executing it and fetching the rows with fetchone/fetchmany/fetchall.
+The log is kept in memory in each process, so with more than one gunicorn worker each has its own log.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import abort, current_app, jsonify, request
+
+logger = logging.getLogger('paralympics.queries')
+
+
+class QueryLog:
+    """ Ring buffer of the most recent queries.
+
+    Attributes:
+        maxlen (int): the number of queries to keep, older queries are removed
+        slow_ms (float): queries that take longer than this many milliseconds are logged as slow
+    """
+
+    def __init__(self, maxlen=500, slow_ms=100):
+        self.maxlen = maxlen
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._queries = deque(maxlen=maxlen)
+        self.total = 0
+
+    def add(self, entry):
+        """ Add a query. Returns a copy of the entry if the query is slow, otherwise None. """
+        with self._lock:
+            self._queries.append(entry)
+            self.total += 1
+            return self._mark_slow(entry)
+
+    def add_fetch(self, entry, ms, rows):
+        """ Add the time and rows of a fetch to a query. Returns a copy of the entry if the query has just become
+        slow, otherwise None.
+
+        The entry is changed while holding the lock so that slowest() never copies a half updated entry.
+        """
+        with self._lock:
+            entry['ms'] += ms
+            entry['rows'] += rows
+            return self._mark_slow(entry)
+
+    def _mark_slow(self, entry):
+        """ Mark the entry as slow the first time it takes longer than slow_ms. The caller must hold the lock. """
+        if not entry['slow'] and entry['ms'] > self.slow_ms:
+            entry['slow'] = True
+            return dict(entry)
+        return None
+
+    def slowest(self, n=10):
+        """ Return the n slowest of the recent queries, slowest first. """
+        with self._lock:
+            queries = [dict(q) for q in self._queries]
+        return sorted(queries, key=lambda q: q['ms'], reverse=True)[:n]
+
+    def clear(self):
+        with self._lock:
+            self._queries.clear()
+            self.total = 0
+
+
+class TracingCursor(sqlite3.Cursor):
+    """ Cursor that records the SQL, the time taken and the number of rows for each query in the QueryLog. """
+
+    _entry = None
+
+    def _start(self, sql, seconds):
+        self._entry = {'sql': ' '.join(sql.split()), 'ms': seconds * 1000, 'rows': max(self.rowcount, 0),
+                       'slow': False}
+        self._log_slow(self.connection.query_log.add(self._entry))
+
+    def _add_fetch(self, seconds, rows):
+        if self._entry is not None:
+            self._log_slow(self.connection.query_log.add_fetch(self._entry, seconds * 1000, rows))
+
+    @staticmethod
+    def _log_slow(entry):
+        """ Log the copy of the entry returned by the QueryLog when a query becomes slow, outside the lock. """
+        if entry is not None:
+            logger.warning('Slow query (%.3f ms): %s', entry['ms'], entry['sql'],
+                           extra={'sql': entry['sql'], 'ms': round(entry['ms'], 3)})
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._start(sql, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._start(sql, time.perf_counter() - start)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add_fetch(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add_fetch(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add_fetch(time.perf_counter() - start, len(rows))
+        return rows
+
+
+class TracingConnection(sqlite3.Connection):
+    """ Connection whose cursors are TracingCursors, including those created by execute and executemany. """
+
+    query_log = None
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def get_query_log():
+    """ Return the QueryLog for the app, creating it from the app config the first time. """
+    query_log = current_app.extensions.get('query_log')
+    if query_log is None:
+        query_log = QueryLog(current_app.config.get('QUERY_LOG_SIZE', 500),
+                             current_app.config.get('SLOW_QUERY_MS', 100))
+        current_app.extensions['query_log'] = query_log
+    return query_log
+
+
+def debug_queries():
+    """ Return the slowest recent queries as JSON. Not found (404) unless QUERY_LOG is True. """
+    if not current_app.config.get('QUERY_LOG', False):
+        abort(404)
+    query_log = get_query_log()
+    n = request.args.get('n', 10, type=int)
+    return jsonify({
+        'slow_ms': query_log.slow_ms,
+        'recorded': query_log.total,
+        'kept': query_log.maxlen,
+        'slowest': query_log.slowest(n),
+    })
@@ -0,0 +1,151 @@
+"""
+Cache of the responses to GET routes, for routes that only read data that changes when the database is reloaded.
+
+Add the decorator after the route decorator:
+    @main.route('/events')
+    @cached_response
+    def get_events():
+
+The cache key is the path, the query string arguments and the data version of the database, so when the data changes
+the old entries are no longer used. Each response has an ETag (a hash of the body) and Cache-Control header, and a
+request with If-None-Match set to the ETag gets 304 Not Modified with no body.
+
+The data version is from get_data_version() in db.py, see DataVersion in shared/versions.py. It is the hashes in the
+load_manifest table if the database has one (see student/placeholder/workbook.py), otherwise the modification times
+and sizes of the database and WAL files. Both are the same for every worker, so the workers can share entries.
+With the load_manifest version a change that does not reload the data (e.g. a quiz response) does not change the
+version, so only use the decorator on routes that show the loaded data.
+
+The headers the route sets are stored with the body and sent with each cached response, except the hop-by-hop headers
+and Content-Length, which are worked out again, and ETag and Cache-Control, which are set by the cache. Responses that
+set a cookie are not cached, as the cookie is for one user.
+
+Streamed responses, e.g. from /api/events, are not cached: reading the body would load all of it into memory, and
+the route sets its own ETag.
+
+Config (all optional):
+    RESPONSE_CACHE = 'lru'  # 'lru' (default) in each process, 'sqlite' shared by the workers, or None for no cache
+    RESPONSE_CACHE_SIZE = 256  # the maximum number of responses in the 'lru' cache
+    RESPONSE_CACHE_PATH = 'instance/response_cache.sqlite'  # the file for the 'sqlite' cache
+    RESPONSE_CACHE_BACKEND = None  # any object with get(key) and set(key, value) methods, e.g. for Redis
+    RESPONSE_CACHE_CONTROL = 'no-cache'  # the Cache-Control header, no-cache means check the ETag each time
+"""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from flask import Response, current_app, make_response, request
+
+from shared.lru import LRUCache
+from student.flask_paralympics.db import get_data_version
+
+# Headers of the route's response that are not stored, in lower case
+SKIPPED_HEADERS = {
+    # hop-by-hop headers are for one connection only, see RFC 9110 section 7.6.1
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer', 'transfer-encoding',
+    'upgrade',
+    # worked out again for each response
+    'content-length',
+    # set by the cache
+    'etag', 'cache-control',
+}
+
+
+class SQLiteBackend:
+    """ Cache in an SQLite file that all the worker processes on the server can use.
+
+    Each entry is a row with the body, the headers as JSON and the ETag in their own columns, so nothing read from the
+    file is unpickled. Entries for an old data version are not used again but are not removed, delete the file to remove them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute("""CREATE TABLE IF NOT EXISTS cached_response (
+                                key TEXT PRIMARY KEY,
+                                body BLOB NOT NULL,
+                                headers TEXT NOT NULL,
+                                etag TEXT NOT NULL)""")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute('SELECT body, headers, etag FROM cached_response WHERE key = ?',
+                                         (key,)).fetchone()
+        return {'body': row[0], 'headers': json.loads(row[1]), 'etag': row[2]} if row else None
+
+    def set(self, key, value):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cached_response (key, body, headers, etag) VALUES (?, ?, ?, ?)',
+            (key, value['body'], json.dumps(value['headers']), value['etag']))
+
+
+def _create_backend(config):
+    backend = config.get('RESPONSE_CACHE_BACKEND')
+    if backend is not None:
+        return backend
+    kind = config.get('RESPONSE_CACHE', 'lru')
+    if kind == 'lru':
+        return LRUCache(config.get('RESPONSE_CACHE_SIZE', 256))
+    if kind == 'sqlite':
+        default_path = os.path.join(current_app.instance_path, 'response_cache.sqlite')
+        return SQLiteBackend(config.get('RESPONSE_CACHE_PATH', default_path))
+    raise ValueError(f'Invalid RESPONSE_CACHE "{kind}". Must be "lru", "sqlite" or None')
+
+
+def get_response_cache():
+    """ Return (backend, DataVersion) for the app, creating them the first time, or None if the cache is off. """
+    if current_app.config.get('RESPONSE_CACHE', 'lru') is None:
+        return None
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        cache = (_create_backend(current_app.config), get_data_version())
+        current_app.extensions['response_cache'] = cache
+    return cache
+
+
+def _not_modified(etag, cache_control):
+    return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': cache_control})
+
+
+def cached_response(view):
+    """ Decorator for a route function that caches its 200 responses to GET requests. """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        if cache is None or request.method != 'GET':
+            return view(*args, **kwargs)
+        backend, data_version = cache
+        cache_control = current_app.config.get('RESPONSE_CACHE_CONTROL', 'no-cache')
+
+        query = sorted((k, v) for k in request.args for v in request.args.getlist(k))
+        key = hashlib.sha1(json.dumps([request.path, query, data_version.get()]).encode()).hexdigest()
+        entry = backend.get(key)
+
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                    or 'Set-Cookie' in response.headers):
+                return response
+            body = response.get_data()
+            headers = [[name, value] for name, value in response.headers.items()
+                       if name.lower() not in SKIPPED_HEADERS]
+            entry = {'body': body, 'headers': headers, 'etag': hashlib.sha1(body).hexdigest()}
+            backend.set(key, entry)
+
+        if entry['etag'] in request.if_none_match:
+            return _not_modified(entry['etag'], cache_control)
+        return Response(entry['body'], headers=[*map(tuple, entry['headers']), ('ETag', f'"{entry["etag"]}"'),
+                                                ('Cache-Control', cache_control)])
+
+    return wrapper
@@ -1,5 +1,11 @@
-from flask import Blueprint, render_template, request
-from student.flask_paralympics.db import get_db
+import hashlib
+import json
+
+from flask import Blueprint, Response, jsonify, render_template, request, stream_with_context
+from shared.queries import EVENT_FIELDS, EVENTS_SQL, events_page_sql
+from student.flask_paralympics.db import get_data_version, get_db
+from student.flask_paralympics.model_service import get_model_service
+from student.flask_paralympics.response_cache import cached_response
 
 # Define a Blueprint named 'main' for the main routes
 main = Blueprint('main', __name__)
@@ -12,9 +18,129 @@ main = Blueprint('main', __name__)
 def index(name=None):
     return render_template('index.html', name=name)
 
+
 @main.route('/events')
+@cached_response
 def get_events():
     db = get_db()
-    events = db.execute('SELECT * FROM Event').fetchall()
+    events = db.execute(EVENTS_SQL).fetchall()
     events_text = [f'{event["year"]} {event["type"]} {event["start"]} {event["end"]}' for event in events]
-    return events_text
\ No newline at end of file
+    return events_text
+
+
+EVENT_TYPES = ['summer', 'winter']
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _int_arg(name, default=None, minimum=None):
+    """Return the query string argument as an int, raising ValueError with a message if it is not valid."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'"{name}" must be a whole number') from None
+    if minimum is not None and number < minimum:
+        raise ValueError(f'"{name}" must be at least {minimum}')
+    return number
+
+
+@main.route('/api/events')
+def api_events():
+    """Return a page of events as JSON.
+
+    Query string arguments (all optional):
+        after: the event_id of the last event on the previous page, use the "next" value from the previous page
+        limit: the number of events per page, default 20, maximum 100
+        fields: comma-separated columns to return e.g. fields=year,type,url, event_id is always returned
+        type: summer or winter
+        year_from, year_to: only events in these years (inclusive)
+
+    The page uses keyset pagination: WHERE event_id > after ORDER BY event_id, so a page is found using the primary key
+    however far through the table it is. The rows are written to the response as they are read from the database rather
+    than all being loaded first.
+
+    The response has an ETag, send it back in an If-None-Match header and if the data in the database has not changed
+    the response is 304 Not Modified with no body. The route does not use cached_response as the body is streamed and
+    the ETag is found without reading the page.
+    """
+    try:
+        after = _int_arg('after', default=0)
+        limit = min(_int_arg('limit', default=DEFAULT_PAGE_SIZE, minimum=1), MAX_PAGE_SIZE)
+        year_from = _int_arg('year_from')
+        year_to = _int_arg('year_to')
+        fields = request.args.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(EVENT_FIELDS)
+        unknown = [f for f in fields if f not in EVENT_FIELDS]
+        if unknown:
+            raise ValueError(f'Unknown fields {unknown}. Must be from {EVENT_FIELDS}')
+        event_type = request.args.get('type')
+        if event_type is not None and event_type not in EVENT_TYPES:
+            raise ValueError(f'"type" must be one of {EVENT_TYPES}')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if 'event_id' not in fields:
+        fields.insert(0, 'event_id')
+
+    sql, params = events_page_sql(fields, after, limit, event_type, year_from, year_to)
+
+    # The ETag is a hash of the data version of the database and the SQL and parameters of the page, which include the
+    # fields, the after cursor, the limit and the filters. The page is not read to work out the ETag.
+    etag = hashlib.sha1(json.dumps([get_data_version().get(), sql, params]).encode()).hexdigest()
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+
+    def generate():
+        cursor = get_db().execute(sql, params)
+        yield '{"events": ['
+        count = 0
+        last_id = None
+        for row in cursor:
+            if count == limit:
+                break
+            yield (',' if count else '') + json.dumps(dict(zip(fields, row)))
+            count += 1
+            last_id = row[0]
+        else:
+            last_id = None
+        cursor.close()
+        yield f'], "count": {count}, "next": {json.dumps(last_id)}}}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json',
+                    headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+
+
+# The most (year, team) pairs that can be sent to /api/predict in one request
+MAX_PREDICT_INPUTS = 1000
+
+
+@main.route('/api/predict', methods=['POST'])
+def api_predict():
+    """Predict the total medals for many (year, team) pairs with one call to the model, see model_service.py.
+
+    The request body is JSON: {"inputs": [{"year": 2028, "team": "Great Britain"}, ...]}, up to 1000 inputs.
+    The response is {"predictions": [...]} in the same order as the inputs, with null for a team the model does not
+    know.
+    """
+    body = request.get_json(silent=True)
+    inputs = body.get('inputs') if isinstance(body, dict) else None
+    if not isinstance(inputs, list) or not inputs:
+        return jsonify({'error': 'The body must be JSON with a non-empty list of "inputs"'}), 400
+    if len(inputs) > MAX_PREDICT_INPUTS:
+        return jsonify({'error': f'At most {MAX_PREDICT_INPUTS} inputs can be predicted in one request'}), 400
+    pairs = []
+    for i, item in enumerate(inputs):
+        year = item.get('year') if isinstance(item, dict) else None
+        team = item.get('team') if isinstance(item, dict) else None
+        # bool is a subclass of int, so true/false are not accepted as years
+        if not isinstance(year, int) or isinstance(year, bool) or not isinstance(team, str):
+            return jsonify({'error': f'Input {i} must have an integer "year" and a string "team"'}), 400
+        pairs.append((year, team))
+    try:
+        predictions = get_model_service().predict(pairs)
+    except Exception as e:
+        return jsonify({'error': f'Error making predictions: {e}'}), 500
+    return jsonify({'predictions': predictions})
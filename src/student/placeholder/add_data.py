@@ -2,6 +2,13 @@
 Code from COMP0035
 Contains functions to add data to the paralympics database.
 Uses the SQLAlchemy object, db.
+
+The add_..._data functions create one model object for each row, this is the version explained in the activities.
+The bulk versions in bulk_add_data.py are faster for larger data, use add_all_data(bulk=True) to add the data using
+them.
+
+add_all_data has the same data_path and cache_format parameters as add_data_sql3.add_all_data, but not the cursor and
+connection as it uses db.session. bulk and autoflush must be given by name.
 """
 from importlib import resources
 
@@ -9,6 +16,9 @@ import pandas as pd
 from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 
+from student.placeholder.add_data_sql3 import normalise_host
+from student.placeholder.bulk_add_data import bulk_add_all_data
+from student.placeholder.workbook import read_workbook
 from tutor.flask_para_t import db
 from tutor.flask_para_t.models import Country, Disability, DisabilityEvent, Event, Host, HostEvent, MedalResult, \
     Participants
@@ -64,8 +74,8 @@ def add_event_data(df):
         db.session.rollback()
 
 
-def add_host_data(df_events):
-    """Add host data database."""
+def add_host_data(df_events, df_locations):
+    """Add host data database. The latitude and longitude are from host_locations.csv, see workbook.py."""
 
     try:
         # Extract unique host name and country pairs
@@ -82,13 +92,18 @@ def add_host_data(df_events):
         # Remove duplicate hosts from the dataframe
         host_country_df = host_country_df.drop_duplicates(subset=['host', 'country'])
 
+        # Add the latitude and longitude of each host, hosts that are not in host_locations.csv have NaN
+        host_country_df = host_country_df.merge(df_locations, on='host', how='left')
+        host_country_df = host_country_df.astype(object).where(host_country_df.notna(), None)
+
         # Iterate over the dataframe, add the host and country to the host table
         for index, row in host_country_df.iterrows():
             # Get the country code from the country table
             country_name = row['country']
             country = Country.query.filter_by(name=country_name).first()
             if country:
-                new_host = Host(country_code=country.code, host=row['host'])
+                new_host = Host(country_code=country.code, host=row['host'], latitude=row['latitude'],
+                                longitude=row['longitude'])
                 db.session.add(new_host)
         # Commit the changes
         db.session.commit()
@@ -171,9 +186,11 @@ def add_medal_result_data(df):
     try:
         # Iterate each result row, get the event_id and code and insert into the MedalResult table
         for index, row in df.iterrows():
-            # Find the event id for the event. This matches based on the year and host name.
-            query = db.select(Event).join(Event.host_events).join(HostEvent.host).where(Event.year == row['Year'],
-                                                                                        Host.host == row['Location'])
+            # Find the event id for the event. This matches based on the year and host name, ignoring the case and
+            # '-' in the name as add_data_sql3.normalise_host does e.g. 'Tignes Albertville' and 'Tignes-Albertville'
+            host_name = func.replace(func.lower(func.trim(Host.host)), '-', ' ')
+            query = db.select(Event).join(Event.host_events).join(HostEvent.host).where(
+                Event.year == row['Year'], host_name == normalise_host(row['Location']))
             event = db.session.execute(query).scalar_one_or_none()
             if event:
                 # Insert the medal results
@@ -192,29 +209,42 @@ def add_medal_result_data(df):
         db.session.rollback()
 
 
-def add_all_data():
+def add_all_data(data_path=None, cache_format=None, *, bulk=False, autoflush=True):
     """Adds all the data.
+
+    Parameters:
+        data_path: path to the spreadsheet, defaults to paralympics.xlsx in tutor.data
+        cache_format: None, 'parquet' or 'feather', see workbook.read_workbook()
+        bulk: if True use bulk_add_data.bulk_add_all_data and add all the data in one transaction
+        autoflush: if False the session does not flush before each query while the data is added (bulk only)
     """
     # Specifies the path to the data file
-    data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
+    if data_path is None:
+        data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
+
+    # Read data and create pandas dataframes, reading the spreadsheet once for all the sheets
+    sheets = read_workbook(data_path, cache_format)
+    events_df = sheets['events']
+    medals_df = sheets['medal_standings']
+    npc_df = sheets['npc_codes']
+    locations_df = sheets['host_locations']
 
-    # Read data and create pandas dataframes
-    events_df = pd.read_excel(data_path, sheet_name='events')
-    medals_df = pd.read_excel(data_path, sheet_name='medal_standings')
-    npc_df = pd.read_excel(data_path, sheet_name='npc_codes')
+    if bulk:
+        bulk_add_all_data(db.session, sheets, autoflush)
+        return
 
     # List of tables and corresponding data addition functions and dataframes
     tables_and_functions = [
-        (Country, add_country_data, npc_df),
-        (Event, add_event_data, events_df),
-        (Host, add_host_data, events_df),
-        (HostEvent, add_host_event_data, events_df),
-        (Disability, add_disabilities_data, events_df),
-        (MedalResult, add_medal_result_data, medals_df)
+        (Country, add_country_data, [npc_df]),
+        (Event, add_event_data, [events_df]),
+        (Host, add_host_data, [events_df, locations_df]),
+        (HostEvent, add_host_event_data, [events_df]),
+        (Disability, add_disabilities_data, [events_df]),
+        (MedalResult, add_medal_result_data, [medals_df])
     ]
 
     # Add data to the tables if they are empty
     for table, add_data_function, data in tables_and_functions:
         count_query = db.select(func.count()).select_from(table)
         if db.session.execute(count_query).scalar() == 0:
-            add_data_function(data)
+            add_data_function(*data)
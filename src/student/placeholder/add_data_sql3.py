@@ -2,217 +2,334 @@
 Code from COMP0035
 Contains functions to add data to the paralympics database.
 Uses sqlite3
+
+The data is added in bulk: each function prepares a list of tuples and inserts them with a single executemany,
+the foreign keys are found using dictionaries rather than a SELECT for each row, and add_all_data adds everything in one
+transaction so it is either all added or, if there is an error, none of it is.
+The add_..._data functions only need the cursor and do not commit, add_all_data commits once at the end.
 """
 import sqlite3
+import time
 from importlib import resources
 
-import pandas as pd
+from student.placeholder.workbook import read_workbook, sheet_hashes, update_manifest
 
+# Columns of the medal_standings sheet used for the medal_result table, in the order medal_result_rows() needs
+MEDAL_COLUMNS = ['Year', 'Location', 'NPC', 'Rank', 'Gold', 'Silver', 'Bronze', 'Total']
 
-def add_country_data(df, cursor, connection):
-    """Add the country data to the paralympics database."""
-    # Insert all values into the country table
-    try:
-        for index, row in df.iterrows():
-            # The row is pandas series, we want the series as a list of values
-            row_values = row.tolist()
-            cursor.execute('INSERT INTO country VALUES (?,?,?,?,?,?)', row_values)
 
-        connection.commit()
+def df_to_rows(df, columns):
+    """Return the values of the columns as a list of tuples, with NaN replaced by None and numpy types by Python types."""
+    values = df[columns].astype(object)
+    values = values.where(values.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def _event_ids(cursor):
+    """Return a dictionary of {(year, type): event_id} for the events in the database."""
+    return {(year, event_type): event_id
+            for event_id, year, event_type in cursor.execute('SELECT event_id, year, type FROM event')}
+
+
+def split_hosts(df):
+    """Return a list of (year, type, host, country) with one entry for each host of each event.
+
+    Some events have more than one host e.g. 'Stoke Mandeville, New York' with the countries in the same order.
+    """
+    pairs = []
+    for year, event_type, hosts, countries in df[['year', 'type', 'host', 'country']].itertuples(index=False):
+        for host, country in zip(hosts.split(','), countries.split(',')):
+            pairs.append((year, event_type, host.strip(), country.strip()))
+    return pairs
+
+
+def normalise_host(name):
+    """Host names are not written the same way in every sheet e.g. 'Tignes Albertville' and 'Tignes-Albertville'."""
+    return name.strip().lower().replace('-', ' ')
+
+
+def medal_event_ids(cursor):
+    """Return a dictionary of {(year, normalised host name): event_id} for the events in the database.
+
+    The medal_standings sheet has the year and host (Location) of each result but not the type of event, and there
+    can be a summer and a winter event in the same year, so the results are matched to an event using both. All the
+    loaders use this so the same result is always matched to the same event; sync_db makes the same dictionary from
+    the events and hosts in the spreadsheet.
+    """
+    hosted = cursor.execute('''SELECT event.year, host.host, event.event_id FROM event
+                               JOIN host_event ON event.event_id = host_event.event_id
+                               JOIN host ON host_event.host_id = host.host_id''')
+    return {(year, normalise_host(host)): event_id for year, host, event_id in hosted}
+
 
-    except sqlite3.Error as e:
-        print(f'An error occurred adding country data to the paralympics database. Error: {e}')
-        if connection:
-            connection.rollback()  # Rollback the changes on error
+def medal_result_rows(medal_rows, event_ids):
+    """Return the (event_id, country_code, rank, gold, silver, bronze, total) rows for the medal_result table.
 
+    Parameters
+    ----------
+    medal_rows: (year, location, npc, rank, gold, silver, bronze, total) for each row of the medal_standings sheet
+    event_ids: dictionary from medal_event_ids(), results for an event that is not in the database are not added
+    """
+    values = []
+    for year, location, npc, rank, gold, silver, bronze, total in medal_rows:
+        event_id = event_ids.get((year, normalise_host(location)))
+        if event_id is not None:
+            values.append((event_id, npc, rank, gold, silver, bronze, total))
+    return values
+
+
+def host_locations(df_locations):
+    """Return a dictionary of {host: (latitude, longitude)} from the host_locations sheet, see workbook.py."""
+    return {host: (latitude, longitude)
+            for host, latitude, longitude in df_to_rows(df_locations, ['host', 'latitude', 'longitude'])}
+
+
+# Each table has a prepare_ function, which creates the rows from the sheets without using the database, and an
+# insert_ function, which finds the foreign keys from the database and inserts the rows. add_..._data calls both;
+# pipeline.py calls the prepare_ functions in parallel and the insert_ functions in turn.
+
+def prepare_country(df):
+    """Return the country rows."""
+    return df_to_rows(df, ['code', 'name', 'region', 'sub_region', 'member_type', 'notes'])
 
-def add_event_data(df, cursor, connection):
+
+def insert_country(cursor, rows):
+    cursor.executemany('INSERT INTO country VALUES (?,?,?,?,?,?)', rows)
+    return {'country': len(rows)}
+
+
+def add_country_data(df, cursor):
+    """Add the country data to the paralympics database."""
+    return insert_country(cursor, prepare_country(df))
+
+
+def prepare_events(df):
+    """Return the event rows and the participants rows, the participants are keyed by (year, type) of the event."""
+    # Convert the dates to strings. A copy is made so the dataframe passed in, which is used by the other functions,
+    # is not changed.
+    df = df.copy()
+    df['start'] = df['start'].dt.strftime('%d/%m/%Y')
+    df['end'] = df['end'].dt.strftime('%d/%m/%Y')
+    events = df_to_rows(df, ['type', 'year', 'start', 'end', 'countries', 'events', 'sports', 'highlights', 'url'])
+    participants = df_to_rows(df, ['year', 'type', 'participants_m', 'participants_f', 'participants'])
+    return events, participants
+
+
+def insert_events(cursor, rows):
+    events, participants = rows
+    # Insert the values into the event table
+    cursor.executemany(
+        'INSERT INTO event (type, year, start, end, countries, events, sports, highlights, url) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', events)
+
+    # Insert the participants data, the event_id is found from the year and type of the event
+    event_ids = _event_ids(cursor)
+    participant_values = [
+        (event_ids[(year, event_type)], participants_m, participants_f, total)
+        for year, event_type, participants_m, participants_f, total in participants
+    ]
+    sql_ins_part = 'INSERT INTO participants (event_id, participants_m, participants_f, participants) VALUES (?, ?, ?, ?)'
+    cursor.executemany(sql_ins_part, participant_values)
+    return {'event': len(events), 'participants': len(participant_values)}
+
+
+def add_event_data(df, cursor):
     """Add event and participant data to the paralympics database."""
-    try:
-        # Convert the dates to strings
-        df['start'] = df['start'].dt.strftime('%d/%m/%Y')
-        df['end'] = df['end'].dt.strftime('%d/%m/%Y')
-
-        # Insert the values into the event table
-        for index, row in df.iterrows():
-            values = (
-                row['type'],
-                row['year'],
-                str(row['start']),
-                str(row['end']),
-                row['countries'],
-                row['events'],
-                row['sports'],
-                row['highlights'],
-                row['url'])
-            cursor.execute(
-                f'INSERT INTO event (type, year, start, end, countries, events, sports, highlights, url) VALUES (?, ? , ?, ?, ?, ?, ?, ?, ?)',
-                values)
-            # insert the participants data
-            event_id = cursor.lastrowid
-            participant_values = (
-                event_id,
-                row['participants_m'],
-                row['participants_f'],
-                row['participants'],
-            )
-            sql_ins_part = 'INSERT INTO participants (event_id, participants_m, participants_f, participants) VALUES (?, ?, ?, ?)'
-            cursor.execute(sql_ins_part, participant_values)
-
-        connection.commit()
-
-    except sqlite3.Error as e:
-        print(f'An error occurred adding event data to the paralympics database. Error: {e}')
-        if connection:
-            connection.rollback()
-
-
-def add_host_data(df_events, cursor, connection):
+    return insert_events(cursor, prepare_events(df))
+
+
+def prepare_hosts(df_events, df_locations):
+    """Return the unique (host, country name, latitude, longitude) rows.
+
+    The latitude and longitude are from host_locations.csv, a host that is not in the file has no location.
+    """
+    # Unique host and country pairs, dict.fromkeys removes duplicates and keeps the order
+    host_country = dict.fromkeys((host, country) for year, event_type, host, country in split_hosts(df_events))
+    locations = host_locations(df_locations)
+    return [(host, country, *locations.get(host, (None, None))) for host, country in host_country]
+
+
+def insert_hosts(cursor, rows):
+    # Get the country codes from the country table
+    country_codes = {name: code for code, name in cursor.execute('SELECT code, name FROM country')}
+
+    # Hosts in a country that is not in the country table are not added
+    host_values = [(country_codes[country], host, latitude, longitude)
+                   for host, country, latitude, longitude in rows if country in country_codes]
+    cursor.executemany('INSERT INTO host (country_code, host, latitude, longitude) VALUES (?, ?, ?, ?)', host_values)
+    return {'host': len(host_values)}
+
+
+def add_host_data(df_events, df_locations, cursor):
     """Add data to the normalised paralympics database."""
+    return insert_hosts(cursor, prepare_hosts(df_events, df_locations))
 
-    try:
-        # Extract unique host and country pairs
-        # Initialize an empty DataFrame with the columns needed
-        host_country_df = pd.DataFrame(columns=['host', 'country'])
-        # Iterate over each row in the events DataFrame and split each column into multiple values where there is ','
-        for index, row in df_events.iterrows():
-            hosts = row['host'].split(',')
-            countries = row['country'].split(',')
-            # Create pairs of each host with each country and append to the DataFrame
-            for host, country in zip(hosts, countries):
-                new_row = pd.DataFrame({'host': [host.strip()], 'country': [country.strip()]})
-                host_country_df = pd.concat([host_country_df, new_row], ignore_index=True)
-        # Remove duplicate hosts from the dataframe
-        host_country_df = host_country_df.drop_duplicates(subset=['host', 'country'])
-
-        # Iterate over the dataframe, add the host and country to the host table
-        for index, row in host_country_df.iterrows():
-            # Get the country code from the country table
-            country_name = row['country']
-            select_sql = f'SELECT code from country where name="{country_name}"'
-            result = cursor.execute(select_sql).fetchone()
-            country_code = result[0]
-            # Insert into the host table
-            host = row['host']
-            cursor.execute('INSERT INTO host (country_code, host) VALUES (?, ?)', (country_code, host))
-
-        # Commit the changes
-        connection.commit()
-
-    except sqlite3.Error as e:
-        print(f'An error occurred adding host data to the paralympics database. Error: {e}')
-        if connection:
-            connection.rollback()  # Rollback the changes on error
-
-
-def add_host_event_data(df, cursor, connection):
+
+def prepare_host_events(df):
+    """Return a (host, year, type) row for each host of each event."""
+    return [(host, year, event_type) for year, event_type, host, country in split_hosts(df)]
+
+
+def insert_host_events(cursor, rows):
+    event_ids = _event_ids(cursor)
+    # If more than one host has the same name, use the first one
+    host_ids = {}
+    for host_id, host in cursor.execute('SELECT host_id, host FROM host ORDER BY host_id'):
+        host_ids.setdefault(host, host_id)
+
+    host_event_values = [(host_ids[host], event_ids[(year, event_type)]) for host, year, event_type in rows]
+    cursor.executemany('INSERT INTO host_event (host_id, event_id) VALUES (?, ?)', host_event_values)
+    return {'host_event': len(host_event_values)}
+
+
+def add_host_event_data(df, cursor):
     """Add HostEvent data to the paralympics database."""
+    return insert_host_events(cursor, prepare_host_events(df))
 
-    try:
-        # Iterate each event, find the pairs of hosts, then get the event_id and host_id and insert into the host_event table
-        for index, row in df.iterrows():
-            hosts = row['host'].split(',')
-            # Find the event id for the event. This matches based on the year and type of event.
-            event_id = cursor.execute(
-                'SELECT event_id FROM event WHERE year = ? AND type = ?',
-                (row['year'], row['type'])
-            ).fetchone()[0]
-            # Find the host_id for each host
-            for host in hosts:
-                host_id = cursor.execute(f'SELECT host_id FROM host WHERE host = "{host.strip()}"').fetchall()[0][0]
-                # Insert the host_event pair
-                cursor.execute('INSERT INTO host_event (host_id, event_id) VALUES (?, ?)', (host_id, event_id))
-
-        connection.commit()
-
-    except sqlite3.Error as e:
-        print(f'An error occurred adding host_event data to the paralympics database. Error: {e}')
-        if connection:
-            connection.rollback()
-
-
-def add_disabilities_data(df, cursor, connection):
+
+def prepare_disabilities(df):
+    """Return the sorted disability categories and the (year, type, category) pairs for disability_event."""
+    # Split the comma-separated values into lists
+    split_disabilities = df['disabilities'].str.split(', ')
+    # Unique values from all the lists, sorted so that the ids are the same each time the data is added
+    categories = sorted({d for disabilities in split_disabilities for d in disabilities})
+    pairs = [(year, event_type, d)
+             for year, event_type, disabilities in zip(df['year'], df['type'], split_disabilities)
+             for d in disabilities]
+    return categories, pairs
+
+
+def insert_disabilities(cursor, rows):
+    categories, pairs = rows
+    cursor.executemany('INSERT INTO disability (category) VALUES (?)', [(d,) for d in categories])
+
+    # Find the ids of the events and disabilities, then add a disability_event row for each pair
+    event_ids = _event_ids(cursor)
+    disability_ids = {category: disability_id
+                      for disability_id, category in cursor.execute('SELECT disability_id, category FROM disability')}
+    disability_event_values = [(event_ids[(year, event_type)], disability_ids[d]) for year, event_type, d in pairs]
+    cursor.executemany('INSERT INTO disability_event (event_id, disability_id) VALUES (?, ?)',
+                       disability_event_values)
+    return {'disability': len(categories), 'disability_event': len(disability_event_values)}
+
+
+def add_disabilities_data(df, cursor):
     """Add Disability and DisabilityEvent data."""
+    return insert_disabilities(cursor, prepare_disabilities(df))
 
-    try:
-        # Split the comma-separated values into lists
-        split_disabilities = df['disabilities'].str.split(', ')
-        # Flatten the list of lists into a single list
-        all_disabilities = [item for sublist in split_disabilities for item in sublist]
-        # Convert the list to a set to get unique values
-        unique_disabilities = set(all_disabilities)
-        # Insert the unique values into the table
-        for d in unique_disabilities:
-            cursor.execute('INSERT INTO disability (category) VALUES (?)', (d,))
-        connection.commit()
-
-        # Iterate each result row in the event table
-        for index, row in df.iterrows():
-            # find the event_id
-            event_id = cursor.execute('SELECT event_id FROM event WHERE year = ? AND type = ?',
-                                      (row['year'], row['type'])).fetchone()[0]
-            # split the values for the disabilities
-            disabilities = row['disabilities'].split(', ')
-            # add each diability
-            for d in disabilities:
-                # find the disability_id.
-                disability_id = cursor.execute(
-                    'SELECT disability_id FROM disability WHERE category LIKE ?', (d,)
-                ).fetchone()[0]
-                # Insert into the DisabilityEvent table
-                cursor.execute('INSERT INTO disability_event (event_id, disability_id) VALUES (?, ?)',
-                               (event_id, disability_id))
-
-        connection.commit()
-
-    except sqlite3.Error as e:
-        print(f'An error occurred adding disability data to the paralympics database. Error: {e}')
-        if connection:
-            connection.rollback()
-
-
-def add_medal_result_data(df, cursor, connection):
-    """Add MedalResult data to the paralympics database."""
 
-    try:
-        # Iterate each result row, get the event_id and code and insert into the MedalResult table
-        for index, row in df.iterrows():
-            # Find the event id for the event. This matches based on the year and type of event.
-            qry = f'SELECT event_id FROM Event WHERE year = {row['Year']}'
-            event_id = cursor.execute(qry).fetchone()[0]
-            # Insert the medal results
-            values = (event_id, row['NPC'], row['Rank'], row['Gold'], row['Silver'], row['Bronze'], row['Total'])
-            sql = 'INSERT INTO medal_result (event_id, country_code, rank, gold, silver, bronze, total) VALUES (?, ?, ?, ?, ?, ?, ?)'
-            cursor.execute(sql, values)
+def prepare_medals(df):
+    """Return the medal standings rows, the event is found from the year and host when the rows are inserted."""
+    return df_to_rows(df, MEDAL_COLUMNS)
+
 
-        connection.commit()
+def insert_medals(cursor, rows):
+    # Find the event id for each result from the year and host, see medal_event_ids
+    values = medal_result_rows(rows, medal_event_ids(cursor))
 
-    except sqlite3.Error as e:
-        print(f'An error occurred adding MedalResult data. Error: {e}')
-        if connection:
-            connection.rollback()
+    # Insert the medal results
+    sql = 'INSERT INTO medal_result (event_id, country_code, rank, gold, silver, bronze, total) VALUES (?, ?, ?, ?, ?, ?, ?)'
+    cursor.executemany(sql, values)
+    return {'medal_result': len(values)}
 
 
-def add_all_data(cur, conn):
-    """Adds all the data.
+def add_medal_result_data(df, cursor):
+    """Add MedalResult data to the paralympics database."""
+    return insert_medals(cursor, prepare_medals(df))
+
+
+def add_host_geo_data(cursor):
+    """Create or refresh the host_geo table used by the map.
+
+    host_geo is a summary table with one row per host of each event. The latitude and longitude are stored as REAL and
+    the hover text for the map (host followed by year e.g. Barcelona 1992) is stored in the name column, so the map can
+    use the rows as they are read without converting the types.
+    The index on host_event supports the join from event to host that is used to fill the table.
+
+    Returns the number of rows added to each table.
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS host_geo (
+                        event_id INTEGER NOT NULL,
+                        host_id INTEGER NOT NULL,
+                        year INTEGER NOT NULL,
+                        host TEXT NOT NULL,
+                        latitude REAL,
+                        longitude REAL,
+                        name TEXT NOT NULL,
+                        PRIMARY KEY (event_id, host_id))''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_host_event_event_host ON host_event (event_id, host_id)')
+    cursor.execute('DELETE FROM host_geo')
+    cursor.execute('''INSERT INTO host_geo (event_id, host_id, year, host, latitude, longitude, name)
+                      SELECT event.event_id, host.host_id, event.year, host.host,
+                      CAST(host.latitude AS REAL), CAST(host.longitude AS REAL),
+                      host.host || ' ' || event.year
+                      FROM event
+                      JOIN host_event ON event.event_id = host_event.event_id
+                      JOIN host ON host_event.host_id = host.host_id
+                      ORDER BY event.event_id, host_event.rowid''')
+    return {'host_geo': cursor.rowcount}
+
+
+def add_all_data(cur, conn, data_path=None, cache_format=None):
+    """Adds all the data in one transaction and prints the number of rows added per second for each table.
+
+    The hash of each sheet is saved in the load_manifest table so that sync_db can skip the sheets that have not
+    changed since.
 
     Parameters
     ----------
     conn: sqlite connection object
     cur: sqlite cursor object
+    data_path: path to the spreadsheet, defaults to paralympics.xlsx in tutor.data
+    cache_format: None, 'parquet' or 'feather', see workbook.read_workbook()
+
+    Returns
+    -------
+    report: dict of {tables: (rows, seconds)} for each step, empty if there was an error and the changes were rolled
+    back. A step that adds to more than one table, e.g. 'event + participants', is timed as one.
     """
     # Specifies the path to the data file
-    data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
-
-    # Read data and create pandas dataframes
-    events_df = pd.read_excel(data_path, sheet_name='events')
-    medals_df = pd.read_excel(data_path, sheet_name='medal_standings')
-    npc_df = pd.read_excel(data_path, sheet_name='npc_codes')
-
-    # add data to the tables
-    add_country_data(npc_df, cur, conn)
-    add_host_data(events_df, cur, conn)
-    add_event_data(events_df, cur, conn)
-    add_host_event_data(events_df, cur, conn)
-    add_disabilities_data(events_df, cur, conn)
-    add_medal_result_data(medals_df, cur, conn)
+    if data_path is None:
+        data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
+
+    # Read data and create pandas dataframes, reading the spreadsheet once for all the sheets
+    sheets = read_workbook(data_path, cache_format)
+    events_df = sheets['events']
+    medals_df = sheets['medal_standings']
+    npc_df = sheets['npc_codes']
+    locations_df = sheets['host_locations']
+
+    # The functions to add the data and the dataframes they need, in the order needed for the foreign keys
+    loaders = [
+        (add_country_data, [npc_df]),
+        (add_host_data, [events_df, locations_df]),
+        (add_event_data, [events_df]),
+        (add_host_event_data, [events_df]),
+        (add_disabilities_data, [events_df]),
+        (add_medal_result_data, [medals_df]),
+    ]
+
+    report = {}
+    try:
+        for add_data_function, data in loaders:
+            start = time.perf_counter()
+            counts = add_data_function(*data, cur)
+            seconds = time.perf_counter() - start
+            # The tables of a step are added together so the rows per second is for all of them
+            report[' + '.join(counts)] = (sum(counts.values()), seconds)
+        start = time.perf_counter()
+        counts = add_host_geo_data(cur)
+        report['host_geo'] = (counts['host_geo'], time.perf_counter() - start)
+        update_manifest(cur, sheet_hashes(sheets))
+        conn.commit()
+
+    except (sqlite3.Error, KeyError) as e:
+        print(f'An error occurred adding data to the paralympics database. Error: {e}')
+        if conn:
+            conn.rollback()  # Rollback all the changes on error
+        return {}
+
+    for table, (rows, seconds) in report.items():
+        rate = rows / seconds if seconds else float('inf')
+        print(f'{table}: {rows} rows in {seconds:.4f}s ({rate:,.0f} rows/sec)')
+    return report
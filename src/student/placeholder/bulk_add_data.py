@@ -0,0 +1,183 @@
+"""
+Contains the bulk versions of the functions in add_data.py, used by add_data.add_all_data(bulk=True).
+
+The foreign keys are found using dictionaries that are created with one query per table, and the rows are inserted
+using insert() with a list of dictionaries, so no model objects are created for the rows. This is faster for larger
+data.
+
+The functions take a SQLAlchemy session, e.g. db.session, and the tables of the database it is connected to, which
+bulk_add_all_data finds with MetaData.reflect(). They do not use the model classes, so they can be used before the
+models have been written and with a plain SQLAlchemy session.
+"""
+from contextlib import nullcontext
+
+from sqlalchemy import MetaData, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from student.placeholder.add_data_sql3 import normalise_host, split_hosts
+
+
+def _records(df, columns):
+    """Return the rows as a list of dictionaries of {table column: value} with NaN replaced by None.
+
+    Parameters:
+        df: pandas DataFrame
+        columns: dict of {DataFrame column name: table column name}
+    """
+    values = df[list(columns)].astype(object)
+    values = values.where(values.notna(), None)
+    return values.rename(columns=columns).to_dict(orient='records')
+
+
+def _insert(session, table, rows):
+    """Insert the rows, insert() with an empty list would insert one row of default values so nothing is done."""
+    if rows:
+        session.execute(insert(table), rows)
+
+
+def event_id_map(session, tables):
+    """Return a dictionary of {(year, type): event_id} using one query."""
+    event = tables['event']
+    rows = session.execute(select(event.c.year, event.c.type, event.c.event_id))
+    return {(year, event_type): event_id for year, event_type, event_id in rows}
+
+
+def host_id_map(session, tables):
+    """Return a dictionary of {host name: host_id} using one query. If names are repeated the first host is used."""
+    host = tables['host']
+    host_ids = {}
+    for name, host_id in session.execute(select(host.c.host, host.c.host_id).order_by(host.c.host_id)):
+        host_ids.setdefault(name, host_id)
+    return host_ids
+
+
+def disability_id_map(session, tables):
+    """Return a dictionary of {category: disability_id} using one query."""
+    disability = tables['disability']
+    rows = session.execute(select(disability.c.category, disability.c.disability_id))
+    return {category: disability_id for category, disability_id in rows}
+
+
+def country_code_map(session, tables):
+    """Return a dictionary of {country name: code} using one query."""
+    country = tables['country']
+    rows = session.execute(select(country.c.name, country.c.code))
+    return {name: code for name, code in rows}
+
+
+def bulk_add_country_data(session, tables, df):
+    """Add the country data using a bulk insert."""
+    columns = {name: name for name in ['code', 'name', 'region', 'sub_region', 'member_type', 'notes']}
+    _insert(session, tables['country'], _records(df, columns))
+
+
+def bulk_add_event_data(session, tables, df):
+    """Add the event and participant data using bulk inserts."""
+    # Convert the dates to strings, using a copy so the DataFrame used by the other functions is not changed
+    df = df.copy()
+    df['start'] = df['start'].dt.strftime('%d/%m/%Y')
+    df['end'] = df['end'].dt.strftime('%d/%m/%Y')
+    columns = {name: name for name in
+               ['type', 'year', 'start', 'end', 'countries', 'events', 'sports', 'highlights', 'url']}
+    _insert(session, tables['event'], _records(df, columns))
+
+    # Find the event_id of each new event, then add the participants
+    event_ids = event_id_map(session, tables)
+    participants = _records(df, {name: name for name in
+                                 ['year', 'type', 'participants_m', 'participants_f', 'participants']})
+    for row in participants:
+        row['event_id'] = event_ids[(row.pop('year'), row.pop('type'))]
+    _insert(session, tables['participants'], participants)
+
+
+def bulk_add_host_data(session, tables, df_events, df_locations):
+    """Add the host data using a bulk insert."""
+    # Unique host and country pairs, dict.fromkeys removes duplicates and keeps the order
+    host_country = dict.fromkeys((host, country) for year, event_type, host, country in split_hosts(df_events))
+    country_codes = country_code_map(session, tables)
+    locations = {row['host']: row for row in _records(df_locations, {'host': 'host', 'latitude': 'latitude',
+                                                                     'longitude': 'longitude'})}
+    hosts = [{'country_code': country_codes[country], 'host': host,
+              'latitude': locations.get(host, {}).get('latitude'),
+              'longitude': locations.get(host, {}).get('longitude')}
+             for host, country in host_country if country in country_codes]
+    _insert(session, tables['host'], hosts)
+
+
+def bulk_add_host_event_data(session, tables, df):
+    """Add the host_event data using a bulk insert."""
+    event_ids = event_id_map(session, tables)
+    host_ids = host_id_map(session, tables)
+    host_events = [{'host_id': host_ids[host], 'event_id': event_ids[(year, event_type)]}
+                   for year, event_type, host, country in split_hosts(df)
+                   if host in host_ids and (year, event_type) in event_ids]
+    _insert(session, tables['host_event'], host_events)
+
+
+def bulk_add_disabilities_data(session, tables, df):
+    """Add the disability and disability_event data using bulk inserts."""
+    split_disabilities = df['disabilities'].str.split(', ')
+    # Unique values from all the lists, sorted so that the ids are the same each time the data is added
+    unique_disabilities = sorted({d for disabilities in split_disabilities for d in disabilities})
+    _insert(session, tables['disability'], [{'category': d} for d in unique_disabilities])
+
+    event_ids = event_id_map(session, tables)
+    disability_ids = disability_id_map(session, tables)
+    disability_events = [{'event_id': event_ids[(year, event_type)], 'disability_id': disability_ids[d]}
+                         for year, event_type, disabilities in zip(df['year'], df['type'], split_disabilities)
+                         if (year, event_type) in event_ids
+                         for d in disabilities]
+    _insert(session, tables['disability_event'], disability_events)
+
+
+def bulk_add_medal_result_data(session, tables, df):
+    """Add the medal_result data using a bulk insert."""
+    # Find the event for each result using the year and host name, as add_data_sql3.medal_event_ids does, using one
+    # query
+    event, host_event, host = tables['event'], tables['host_event'], tables['host']
+    query = (select(event.c.year, host.c.host, event.c.event_id)
+             .join(host_event, event.c.event_id == host_event.c.event_id)
+             .join(host, host_event.c.host_id == host.c.host_id))
+    event_ids = {(year, normalise_host(name)): event_id for year, name, event_id in session.execute(query)}
+    columns = {'Year': 'year', 'Location': 'location', 'NPC': 'country_code', 'Rank': 'rank', 'Gold': 'gold',
+               'Silver': 'silver', 'Bronze': 'bronze', 'Total': 'total'}
+    results = []
+    for row in _records(df, columns):
+        event_id = event_ids.get((row.pop('year'), normalise_host(row.pop('location'))))
+        if event_id is not None:
+            row['event_id'] = event_id
+            results.append(row)
+    _insert(session, tables['medal_result'], results)
+
+
+def bulk_add_all_data(session, sheets, autoflush=True):
+    """Add the data from the sheets to the empty tables in one transaction.
+
+    Parameters:
+        session: SQLAlchemy session e.g. db.session
+        sheets: dict of DataFrames from workbook.read_workbook()
+        autoflush: if False the session does not flush before each query while the data is added
+    """
+    metadata = MetaData()
+    metadata.reflect(bind=session.connection())
+    tables = metadata.tables
+    events_df = sheets['events']
+
+    # (table to check is empty, function, dataframes) in foreign key order
+    tables_and_functions = [
+        ('country', bulk_add_country_data, [sheets['npc_codes']]),
+        ('event', bulk_add_event_data, [events_df]),
+        ('host', bulk_add_host_data, [events_df, sheets['host_locations']]),
+        ('host_event', bulk_add_host_event_data, [events_df]),
+        ('disability', bulk_add_disabilities_data, [events_df]),
+        ('medal_result', bulk_add_medal_result_data, [sheets['medal_standings']]),
+    ]
+    try:
+        with session.no_autoflush if not autoflush else nullcontext():
+            for table, add_data_function, data in tables_and_functions:
+                if session.execute(select(func.count()).select_from(tables[table])).scalar() == 0:
+                    add_data_function(session, tables, *data)
+        session.commit()
+    except (SQLAlchemyError, KeyError) as e:
+        print(f'An error occurred adding data to the paralympics database. Error: {e}')
+        session.rollback()
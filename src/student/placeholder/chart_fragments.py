@@ -0,0 +1,53 @@
+"""
+Contains functions to serve plotly.js as a static file and to cache the HTML of the charts.
+
+fig.to_html(include_plotlyjs=True) adds the whole plotly.js library, over 3 MB, to the HTML of every chart. Instead:
+
+1. plotly.js is saved once in the app's static folder with the Plotly version in the file name, e.g.
+   static/js/plotly-5.24.1.min.js, and the page template loads it with a script tag. The browser can cache the file
+   and it only changes when Plotly is upgraded.
+2. The charts are created with include_plotlyjs=False so the HTML is a div and a small script, a few KB.
+3. The HTML for each chart is cached in fragment_cache for each feature and data version (see
+   shared/versions.py database_version), so the query and the figure are only made again when the data changes.
+
+Usage in a Flask route, see line_chart_fragment() in figures_sqlite3.py and figures_sqlalchemy.py:
+    plotly_js = plotlyjs_static_file(current_app.static_folder)
+    fig_html = line_chart_fragment('sports', get_db())
+    return render_template('chart.html', plotly_js=plotly_js, fig_html=fig_html)
+
+and in the template (layout.html does this when plotly_js is passed to it):
+    <script src="{{ url_for('static', filename=plotly_js) }}"></script>
+"""
+import os
+import pathlib
+
+import plotly
+from plotly.offline import get_plotlyjs
+
+from shared.lru import LRUCache
+
+
+def plotlyjs_static_file(static_folder):
+    """Save plotly.js in the static folder if it is not already there.
+
+    Parameters
+    ----------
+    static_folder: path to the app's static folder e.g. current_app.static_folder
+
+    Returns
+    -------
+    filename: the path of the file relative to the static folder, for url_for('static', filename=filename)
+    """
+    filename = f'js/plotly-{plotly.__version__}.min.js'
+    path = pathlib.Path(static_folder, filename)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file then rename it so another process never serves half a file
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(get_plotlyjs(), encoding='utf-8')
+        os.replace(tmp_path, path)
+    return filename
+
+
+# One cache shared by all the requests in the process
+fragment_cache = LRUCache(maxsize=64)
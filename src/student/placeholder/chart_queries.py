@@ -0,0 +1,133 @@
+"""
+Contains the queries for the chart data, selecting only the columns each chart uses.
+
+The line chart used SELECT * FROM event JOIN participants, which reads every column including the long highlights
+and url text, when the chart only needs the year, the type and one number. The same columns and dtypes are used by
+figures_sqlite3.py, which uses line_chart_sql(), and figures_sqlalchemy.py, which uses line_chart_select() with the
+tables of the models. Both create the DataFrame with line_chart_frame().
+
+To compare the bytes and time of the old and new queries run:
+    python -m student.placeholder.chart_queries path/to/paralympics.db
+"""
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+from sqlalchemy import select
+
+# feature: (table, column)
+LINE_CHART_FEATURES = {
+    'sports': ('event', 'sports'),
+    'events': ('event', 'events'),
+    'countries': ('event', 'countries'),
+    'participants': ('participants', 'participants'),
+}
+
+
+def line_chart_columns(feature):
+    """Return the (table, column) pairs for the line chart of the feature: the year, the type and the feature."""
+    if feature not in LINE_CHART_FEATURES:
+        raise ValueError(f'Invalid value for "feature". Must be one of {list(LINE_CHART_FEATURES)}')
+    return [('event', 'year'), ('event', 'type'), LINE_CHART_FEATURES[feature]]
+
+
+def line_chart_dtypes(feature):
+    """Return the dtypes for the line chart data. Int64 allows for missing values e.g. for future Games."""
+    return {'year': 'int64', 'type': 'category', feature: 'Int64'}
+
+
+def line_chart_sql(feature):
+    """Return the SQL for the line chart data. The participants table is only joined if the feature needs it."""
+    columns = line_chart_columns(feature)
+    select = ', '.join(f'{table}.{column}' for table, column in columns)
+    sql = f'SELECT {select} FROM event'
+    if any(table == 'participants' for table, column in columns):
+        sql += ' JOIN participants ON event.event_id = participants.event_id'
+    return sql + ' ORDER BY event.year'
+
+
+def line_chart_select(feature, event, participants):
+    """Return the SQLAlchemy select() for the line chart data, the same columns and join as line_chart_sql().
+
+    Parameters
+    ----------
+    feature: the name of the feature
+    event, participants: SQLAlchemy tables e.g. Event.__table__ and Participants.__table__ from the models
+    """
+    tables = {'event': event, 'participants': participants}
+    columns = line_chart_columns(feature)
+    stmt = select(*[tables[table].c[column] for table, column in columns]).select_from(event)
+    if any(table == 'participants' for table, column in columns):
+        stmt = stmt.join(participants, event.c.event_id == participants.c.event_id)
+    return stmt.order_by(event.c.year)
+
+
+def line_chart_frame(rows, feature):
+    """Return a DataFrame with the line_chart_dtypes() from the (year, type, feature) rows of a query.
+
+    Each column is created with its dtype. This is quicker than pd.read_sql_query(sql, connection, dtype=...), which
+    creates object columns first and then converts them.
+
+    Parameters
+    ----------
+    rows: list of (year, type, feature value) tuples, from an sqlite3 cursor or an SQLAlchemy result
+    feature: the name of the feature
+
+    Returns
+    -------
+    df: pandas DataFrame with the columns year, type and the feature
+    """
+    dtypes = line_chart_dtypes(feature)
+    columns = list(zip(*rows)) or [()] * len(dtypes)
+    return pd.DataFrame({name: pd.array(values, dtype=dtype) for (name, dtype), values in zip(dtypes.items(), columns)})
+
+
+def read_line_chart_data(feature, connection):
+    """Return the line chart data as a DataFrame, using an sqlite3 connection."""
+    cursor = connection.execute(line_chart_sql(feature))
+    try:
+        return line_chart_frame(cursor.fetchall(), feature)
+    finally:
+        cursor.close()
+
+
+def _result_bytes(rows):
+    """Approximate number of bytes in the query results: the length of the text values and 8 bytes for each number."""
+    return sum(len(value.encode()) if isinstance(value, str) else 8 for row in rows for value in row)
+
+
+def benchmark(connection, repeat=200):
+    """Compare SELECT * with the column-pruned query for each feature.
+
+    Returns
+    -------
+    results: dict of {feature: {'before': (bytes, ms per query), 'after': (bytes, ms per query)}}
+    """
+    select_all = 'SELECT * FROM event JOIN participants ON event.event_id = participants.event_id'
+    results = {}
+    for feature in LINE_CHART_FEATURES:
+        queries = {
+            'before': (select_all, lambda: pd.read_sql_query(select_all, connection)),
+            'after': (line_chart_sql(feature), lambda: read_line_chart_data(feature, connection)),
+        }
+        results[feature] = {}
+        for name, (sql, read) in queries.items():
+            size = _result_bytes(connection.execute(sql).fetchall())
+            start = time.perf_counter()
+            for _ in range(repeat):
+                read()
+            results[feature][name] = (size, (time.perf_counter() - start) / repeat * 1000)
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python -m student.placeholder.chart_queries path/to/paralympics.db')
+        sys.exit(2)
+    db = sqlite3.connect(sys.argv[1])
+    for feature, result in benchmark(db).items():
+        (bytes_before, ms_before), (bytes_after, ms_after) = result['before'], result['after']
+        print(f'{feature}: {bytes_before:,} bytes in {ms_before:.3f} ms before, '
+              f'{bytes_after:,} bytes in {ms_after:.3f} ms after')
+    db.close()
@@ -0,0 +1,87 @@
+"""
+Saves the model from create_ml_model.py as a small table of numbers, and makes predictions with NumPy only.
+
+The model is a scikit-learn Pipeline: a OneHotEncoder for Team, Year passed through, and a LinearRegression. A
+prediction is therefore:
+    weight of the team + Year * year coefficient + intercept
+
+so the fitted pipeline can be saved as the team names, a weight for each team, the year coefficient and the intercept in
+a NumPy .npz file of a few KB. Loading the .npz file only needs NumPy, whereas loading the pkl file imports
+scikit-learn, which is most of the time it takes a Flask worker to start.
+
+To save the .npz file as well as the .pkl file run:
+    python -m student.placeholder.create_ml_model --npz
+
+Then set MODEL_PATH to the .npz file in the Flask app config, see model_service.py.
+"""
+import numpy as np
+
+
+def export_coefficients(pipeline, path):
+    """Save the coefficients of a fitted pipeline from create_ml_model.py to an .npz file.
+
+    Parameters
+    ----------
+    pipeline: fitted Pipeline with a 'preprocessor' ColumnTransformer, which one-hot encodes Team and passes Year
+        through, and a LinearRegression 'regressor'
+    path: the file to save, e.g. 'model.npz'
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    regressor = pipeline.named_steps['regressor']
+    encoder = preprocessor.named_transformers_['team']
+    teams = encoder.categories_[0]
+    # Check the columns the regressor was trained on are one per team, in the order of the categories, then Year
+    expected = [f'team__Team_{team}' for team in teams] + ['remainder__Year']
+    if list(preprocessor.get_feature_names_out()) != expected:
+        raise ValueError('The pipeline does not have the columns of the model in create_ml_model.py, '
+                         'one-hot encoded Team then Year')
+    coef = np.asarray(regressor.coef_, dtype=np.float64)
+    np.savez_compressed(path, teams=np.asarray(teams, dtype=str), team_weights=coef[:len(teams)],
+                        year_coef=coef[len(teams)], intercept=np.float64(regressor.intercept_))
+
+
+class CoefficientModel:
+    """ Linear model of the total medals for a year and team, loaded from the .npz file saved by export_coefficients.
+
+    It has the same predict method as the pipeline so model_service.py can use either.
+
+    Attributes:
+        teams (numpy.ndarray): the names of the teams the model was trained with
+        team_weights (numpy.ndarray): the weight of each team, in the same order as teams
+        year_coef (float): the coefficient of the year
+        intercept (float): the intercept
+    """
+
+    def __init__(self, teams, team_weights, year_coef, intercept):
+        self.teams = teams
+        self.team_weights = team_weights
+        self.year_coef = year_coef
+        self.intercept = intercept
+        self._team_index = {team: i for i, team in enumerate(teams.tolist())}
+
+    @classmethod
+    def load(cls, path):
+        """ Return the CoefficientModel saved in the .npz file. """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['teams'], data['team_weights'], data['year_coef'][()], data['intercept'][()])
+
+    def predict(self, X):
+        """Predict the total medals.
+
+        The sums are done in the same order as the scikit-learn pipeline so the results are the same.
+
+        Parameters
+        ----------
+        X: DataFrame (or dict) with the columns 'Year' and 'Team'
+
+        Returns
+        -------
+        predictions: numpy array of floats, one for each row
+        """
+        teams = list(X['Team'])
+        unknown = sorted({team for team in teams if team not in self._team_index})
+        if unknown:
+            raise ValueError(f'Found unknown categories {unknown} in column Team')
+        index = np.array([self._team_index[team] for team in teams], dtype=np.intp)
+        years = np.asarray(X['Year'], dtype=np.float64)
+        return (self.team_weights[index] + years * self.year_coef) + self.intercept
@@ -0,0 +1,126 @@
+"""
+Contains a function to create paralympics.db, the database used by the Dash apps, from paralympics.xlsx and
+host_locations.csv.
+
+The Dash database has fewer tables than the one from create_db.py: the event table also has the disabilities and
+participants columns, and there are no quiz, disability or medal tables. The host table has the latitude and
+longitude from host_locations.csv and host_geo is filled from it for the map (see add_data_sql3.add_host_geo_data).
+The indexes from shared/indexes.py are added at the end.
+
+The files in src/student/data and src/tutor/data are created by this script and are the same, so to change them
+edit the spreadsheet or host_locations.csv and run:
+    python -m student.placeholder.create_app_db
+"""
+import os
+import sqlite3
+import tempfile
+from importlib import resources
+
+from shared.indexes import create_indexes
+from student.placeholder.add_data_sql3 import add_country_data, add_host_data, add_host_event_data, \
+    add_host_geo_data, df_to_rows
+from student.placeholder.workbook import read_workbook
+
+country_sql = '''CREATE TABLE country (code TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    region TEXT,
+                    sub_region TEXT,
+                    member_type TEXT,
+                    notes TEXT)'''
+
+host_sql = '''CREATE TABLE host (host_id INTEGER PRIMARY KEY,
+                country_code TEXT NOT NULL,
+                host TEXT NOT NULL,
+                latitude REAL,
+                longitude REAL,
+                FOREIGN KEY (country_code) REFERENCES country(code) ON DELETE CASCADE ON UPDATE CASCADE)'''
+
+event_sql = '''CREATE TABLE event (
+                    event_id INTEGER PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    start TEXT,
+                    end TEXT,
+                    disabilities TEXT,
+                    countries INTEGER,
+                    events INTEGER,
+                    sports INTEGER,
+                    participants_m INTEGER,
+                    participants_f INTEGER,
+                    participants INTEGER,
+                    highlights TEXT,
+                    url TEXT
+                )'''
+
+host_event_sql = '''CREATE TABLE host_event (
+                            host_event_id INTEGER PRIMARY KEY,
+                            host_id INTEGER NOT NULL,
+                            event_id INTEGER NOT NULL,
+                            FOREIGN KEY (host_id) REFERENCES host(host_id) ON DELETE CASCADE ON UPDATE CASCADE,
+                            FOREIGN KEY (event_id) REFERENCES event(event_id) ON DELETE CASCADE ON UPDATE CASCADE
+                    )'''
+
+EVENT_COLUMNS = ['type', 'year', 'start', 'end', 'disabilities', 'countries', 'events', 'sports', 'participants_m',
+                 'participants_f', 'participants', 'highlights', 'url']
+
+
+def add_app_event_data(df, cursor):
+    """Add the events, with the disabilities and participants in the same table."""
+    df = df.copy()
+    df['start'] = df['start'].dt.strftime('%d/%m/%Y')
+    df['end'] = df['end'].dt.strftime('%d/%m/%Y')
+    placeholders = ', '.join('?' * len(EVENT_COLUMNS))
+    cursor.executemany(f'INSERT INTO event ({", ".join(EVENT_COLUMNS)}) VALUES ({placeholders})',
+                       df_to_rows(df, EVENT_COLUMNS))
+    return {'event': len(df)}
+
+
+def create_app_db(db_path, data_path=None):
+    """Create the Dash app database at db_path, replacing the file if it exists.
+
+    The database is created in a temporary file in the same folder which replaces db_path once it is complete, so an
+    app that is reading the database never sees it half created.
+
+    Parameters
+    ----------
+    db_path: path of the database to create
+    data_path: path to the spreadsheet, defaults to paralympics.xlsx in tutor.data. host_locations.csv must be in
+    the same folder
+
+    Returns
+    -------
+    counts: dict of {table: rows added}
+    """
+    if data_path is None:
+        data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
+    sheets = read_workbook(data_path)
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        cursor = connection.cursor()
+        for sql in [country_sql, host_sql, event_sql, host_event_sql]:
+            cursor.execute(sql)
+        counts = {}
+        counts.update(add_country_data(sheets['npc_codes'], cursor))
+        counts.update(add_host_data(sheets['events'], sheets['host_locations'], cursor))
+        counts.update(add_app_event_data(sheets['events'], cursor))
+        counts.update(add_host_event_data(sheets['events'], cursor))
+        counts.update(add_host_geo_data(cursor))
+        connection.commit()
+        create_indexes(cursor, connection)
+        cursor.execute('VACUUM')
+    except BaseException:
+        connection.close()
+        os.remove(tmp_path)
+        raise
+    connection.close()
+    os.replace(tmp_path, db_path)
+    return counts
+
+
+if __name__ == '__main__':
+    for package in ['student.data', 'tutor.data']:
+        path = resources.files(package).joinpath('paralympics.db')
+        print(f'{path}: {create_app_db(path)}')
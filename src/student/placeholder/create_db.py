@@ -4,7 +4,8 @@ Contains functions to create the paralympics database without data.
 """
 import sqlite3
 
-from student.placeholder import add_data
+from shared.indexes import create_indexes
+from student.placeholder import add_data_sql3
 
 
 def create_db(cursor, connection):
@@ -34,11 +35,13 @@ def create_db(cursor, connection):
                     host_id INTEGER PRIMARY KEY,
                     country_code TEXT NOT NULL,
                     host TEXT NOT NULL,
+                    latitude REAL,
+                    longitude REAL,
                     FOREIGN KEY (country_code) REFERENCES country(code) ON DELETE CASCADE ON UPDATE CASCADE)'''
 
     event_sql = '''CREATE TABLE event (
                     event_id INTEGER PRIMARY KEY,
-                    type INTEGER NOT NULL,
+                    type TEXT NOT NULL,
                     year INTEGER NOT NULL,
                     start TEXT,
                     end TEXT,
@@ -57,7 +60,7 @@ def create_db(cursor, connection):
                             FOREIGN KEY (event_id) REFERENCES event(event_id) ON DELETE CASCADE ON UPDATE CASCADE)'''
 
     host_event_sql = '''CREATE TABLE host_event (
-                            host_id TEXT NOT NULL,
+                            host_id INTEGER NOT NULL,
                             event_id INTEGER NOT NULL,
                             PRIMARY KEY (host_id, event_id),
                             FOREIGN KEY (host_id) REFERENCES host(host_id) ON DELETE CASCADE ON UPDATE CASCADE,
@@ -127,6 +130,8 @@ def create_db(cursor, connection):
 
     try:
         # Drop each table if they already exist
+        cursor.execute('DROP TABLE IF EXISTS load_manifest;')
+        cursor.execute('DROP TABLE IF EXISTS host_geo;')
         cursor.execute('DROP TABLE IF EXISTS host_event;')
         cursor.execute('DROP TABLE IF EXISTS disability_event;')
         cursor.execute('DROP TABLE IF EXISTS participants;')
@@ -159,8 +164,11 @@ def create_db(cursor, connection):
         # Commit the changes
         connection.commit()
 
-        # Call the function to add the data
-        add_data.add_all_data(cursor, connection)
+        # Call the function to add the data, the sqlite3 version as this uses the cursor and connection
+        add_data_sql3.add_all_data(cursor, connection)
+
+        # Add the secondary indexes after the data, it is quicker than updating them for each row
+        create_indexes(cursor, connection)
 
     except sqlite3.Error as e:
         print(f'An error occurred creating the database. Error: {e}')
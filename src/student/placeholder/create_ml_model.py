@@ -2,7 +2,12 @@
 Machine learning is not covered in the module.
 This is a simple example of how to create a model using the medal standings data.
 `pip install scikit-learn` is required before you can run this code.
+
+To also save the coefficients of the model to model.npz, which can be used without scikit-learn (see
+coefficient_model.py), run:
+    python -m student.placeholder.create_ml_model --npz
 """
+import sys
 from pathlib import Path
 
 import joblib
@@ -13,10 +18,18 @@ from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
 
+from student.placeholder.coefficient_model import export_coefficients
+
 
-def train_and_save_model():
+def train_and_save_model(export_npz=False):
     """
     Train a model to predict Total based on Year and Team, and save it to a .pkl file.
+
+    Parameters:
+    export_npz (bool): True to also save the coefficients to model.npz
+
+    Returns:
+    pipeline: the fitted Pipeline
     """
     # Read the data into a DataFrame
     para_excel = Path(__file__).parent.parent.joinpath("data", "paralympics.xlsx")
@@ -55,7 +68,13 @@ def train_and_save_model():
 
     print("Model saved to model.pkl")
 
+    if export_npz:
+        export_coefficients(pipeline, 'model.npz')
+        print("Coefficients saved to model.npz")
+
+    return pipeline
+
 
 if __name__ == "__main__":
     # Train the model and save it
-    train_and_save_model()
+    train_and_save_model(export_npz='--npz' in sys.argv[1:])
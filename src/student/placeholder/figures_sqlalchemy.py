@@ -1,14 +1,18 @@
 import plotly.express as px
-import pandas as pd
 
+from shared.versions import database_version
 from student.flask_paralympics.models import Event, Participants
+from student.placeholder.chart_fragments import fragment_cache
+from student.placeholder.chart_queries import line_chart_frame, line_chart_select
 
 
-def line_chart(feature, db):
+def line_chart(feature, db, include_plotlyjs=True):
     """ Creates a line chart with data from paralympics_events.csv
 
      Parameters
      feature: events, sports, countries or participants
+     db: Flask-SQLAlchemy database object
+     include_plotlyjs: True to add plotly.js to the HTML, False if the page already loads it (see chart_fragments.py)
 
      Returns
      fig_html: Plotly Express line figure html/Javascript
@@ -22,9 +26,10 @@ def line_chart(feature, db):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
-    # Get the data from the database using pandas.read_sql_query and FlaskSQLAlchemy.
-    stmt = db.select(Event, Participants).join(Participants)
-    line_chart_df = pd.read_sql_query(stmt, db.get_engine())
+    # Get the data from the database using FlaskSQLAlchemy.
+    # Only the year, type and feature columns are selected, the same as figures_sqlite3.py, see chart_queries.py
+    stmt = line_chart_select(feature, Event.__table__, Participants.__table__)
+    line_chart_df = line_chart_frame(db.session.execute(stmt).all(), feature)
 
     # Set the title for the chart using the value of 'feature'
     title_text = f"How has the number of {feature} changed over time?"
@@ -49,5 +54,28 @@ def line_chart(feature, db):
                   )
 
     # Convert to HTML
-    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=True, div_id="line-chart")}
-    return fig_html
\ No newline at end of file
+    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs, div_id="line-chart")}
+    return fig_html
+
+
+def line_chart_fragment(feature, db):
+    """ Returns the line chart HTML without plotly.js, from the cache if the data has not changed.
+
+     The page must load plotly.js itself, see chart_fragments.plotlyjs_static_file().
+
+     Parameters
+     feature: events, sports, countries or participants
+     db: Flask-SQLAlchemy database object
+
+     Returns
+     fig_html: Plotly Express line figure html/Javascript
+     """
+    raw_connection = db.engine.raw_connection()
+    try:
+        version = database_version(raw_connection)
+    finally:
+        raw_connection.close()
+    html = fragment_cache.get_or_create(
+        ("figures_sqlalchemy.line_chart", feature, version),
+        lambda: line_chart(feature, db, include_plotlyjs=False)["fig"])
+    return {"fig": html}
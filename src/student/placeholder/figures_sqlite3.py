@@ -1,13 +1,17 @@
 import plotly.express as px
-import pandas as pd
 
+from shared.versions import database_version
+from student.placeholder.chart_fragments import fragment_cache
+from student.placeholder.chart_queries import read_line_chart_data
 
-def line_chart(feature, db):
+
+def line_chart(feature, db, include_plotlyjs=True):
     """ Creates a line chart with data from paralympics.xlsx
 
      Parameters
      feature: events, sports, countries or participants
      db: SQLAlchemy database connection object (from get_db())
+     include_plotlyjs: True to add plotly.js to the HTML, False if the page already loads it (see chart_fragments.py)
 
      Returns
      fig_html: Plotly Express line figure html
@@ -21,9 +25,9 @@ def line_chart(feature, db):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
-    # Get the data from the database using pandas.read_sql_query and the sqlite3 database connection
-    query = 'SELECT * FROM event JOIN participants on event.event_id = participants.event_id;'
-    df = pd.read_sql_query(query, db)
+    # Get the data from the database using the sqlite3 database connection
+    # Only the year, type and feature columns are selected, see chart_queries.py
+    df = read_line_chart_data(feature, db)
 
     # Set the title for the chart using the value of 'feature'
     title_text = f"How has the number of {feature} changed over time?"
@@ -48,5 +52,23 @@ def line_chart(feature, db):
                   )
 
     # Convert to HTML
-    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=True, div_id="line-chart")}
+    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs, div_id="line-chart")}
     return fig_html
+
+
+def line_chart_fragment(feature, db):
+    """ Returns the line chart HTML without plotly.js, from the cache if the data has not changed.
+
+     The page must load plotly.js itself, see chart_fragments.plotlyjs_static_file().
+
+     Parameters
+     feature: events, sports, countries or participants
+     db: sqlite3 database connection object (from get_db())
+
+     Returns
+     fig_html: Plotly Express line figure html
+     """
+    html = fragment_cache.get_or_create(
+        ("figures_sqlite3.line_chart", feature, database_version(db)),
+        lambda: line_chart(feature, db, include_plotlyjs=False)["fig"])
+    return {"fig": html}
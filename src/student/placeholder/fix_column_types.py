@@ -0,0 +1,152 @@
+"""
+Contains a migration that fixes the declared types of two columns in the paralympics database.
+
+create_db.py declared host_event.host_id as TEXT, but host.host_id is an INTEGER PRIMARY KEY, and declared event.type
+as INTEGER, but it holds 'summer' and 'winter'. Because of the TEXT affinity the host ids are stored as strings, so
+every host_event JOIN host (used by the map and the card) converts the value before it can look up the host.
+
+SQLite cannot change the type of a column, so the migration follows the steps in
+https://www.sqlite.org/lang_altertable.html#otheralter: create a new table with the correct types, copy the rows
+converting the values, drop the old table, rename the new table and create the indexes again. It then adds the
+indexes from shared/indexes.py, which include host_event(event_id, host_id) so the joins from an event to its hosts only
+read the index.
+
+The join queries are timed before and after. To migrate a database run:
+    python -m student.placeholder.fix_column_types path/to/paralympics.db
+"""
+import re
+import sqlite3
+import sys
+import time
+
+from shared.indexes import create_indexes
+
+# table: (column, correct type)
+COLUMN_TYPES = {
+    'host_event': ('host_id', 'INTEGER'),
+    'event': ('type', 'TEXT'),
+}
+
+# The joins used by the card (create_card) and the map table (add_host_geo_data)
+BENCHMARK_QUERIES = {
+    'card: event JOIN host_event JOIN host': '''
+        SELECT event.event_id, event.year, event.countries, host.host FROM event
+        JOIN host_event ON event.event_id = host_event.event_id
+        JOIN host ON host_event.host_id = host.host_id''',
+    'map: host_event JOIN host JOIN event': '''
+        SELECT host_event.event_id, host.host_id, event.year, host.host FROM host_event
+        JOIN host ON host_event.host_id = host.host_id
+        JOIN event ON host_event.event_id = event.event_id
+        ORDER BY host_event.event_id''',
+}
+
+
+def _declared_type(cursor, table, column):
+    """Return the type the column was declared with, or None if the table or column does not exist."""
+    for row in cursor.execute(f'PRAGMA table_info({table})'):
+        if row[1] == column:
+            return row[2].upper()
+    return None
+
+
+def _rebuild_table(cursor, table, column, new_type):
+    """Create the table again with the new type for the column, keeping the rows, other columns and indexes."""
+    create_sql = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                (table,)).fetchone()[0]
+    index_sqls = [row[0] for row in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+
+    # Replace the name of the table and the type in the column definition e.g. "host_id TEXT NOT NULL"
+    new_sql = re.sub(rf'^(\s*CREATE TABLE\s+(?:IF NOT EXISTS\s+)?)"?{table}"?', rf'\1{table}_new', create_sql,
+                     count=1, flags=re.IGNORECASE)
+    new_sql, replaced = re.subn(rf'(\b"?{column}"?\s+)\w+', rf'\g<1>{new_type}', new_sql, count=1)
+    if not replaced:
+        raise sqlite3.OperationalError(f'Could not find the definition of {table}.{column}')
+
+    select_columns = [f'CAST({c} AS {new_type})' if c == column else c for c in columns]
+    cursor.execute(new_sql)
+    cursor.execute(f'INSERT INTO {table}_new ({", ".join(columns)}) SELECT {", ".join(select_columns)} FROM {table}')
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+    for index_sql in index_sqls:
+        cursor.execute(index_sql)
+
+
+def benchmark(cursor, repeat=500):
+    """Return the average time in milliseconds to run and fetch each of the BENCHMARK_QUERIES."""
+    timings = {}
+    for name, sql in BENCHMARK_QUERIES.items():
+        cursor.execute(sql).fetchall()  # Warm up the page cache
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cursor.execute(sql).fetchall()
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+def fix_column_types(cursor, connection):
+    """Change host_event.host_id to INTEGER and event.type to TEXT, converting the existing rows.
+
+    Columns that already have the correct type are not changed, so the migration can be run more than once.
+    All the changes are made in one transaction, with the foreign key checks turned off until the end as the
+    tables are dropped and created again.
+
+    Parameters
+    ----------
+    cursor: sqlite cursor object
+    connection: sqlite connection object
+
+    Returns
+    -------
+    changed: list of the columns changed e.g. ['host_event.host_id'], None if there was an error
+    """
+    foreign_keys = cursor.execute('PRAGMA foreign_keys').fetchone()[0]
+    # foreign_keys cannot be changed inside a transaction
+    connection.commit()
+    cursor.execute('PRAGMA foreign_keys = OFF')
+    changed = []
+    try:
+        cursor.execute('BEGIN')
+        for table, (column, new_type) in COLUMN_TYPES.items():
+            declared = _declared_type(cursor, table, column)
+            if declared is not None and declared != new_type:
+                _rebuild_table(cursor, table, column, new_type)
+                changed.append(f'{table}.{column}')
+        problems = cursor.execute('PRAGMA foreign_key_check').fetchall()
+        if problems:
+            raise sqlite3.IntegrityError(f'Foreign key check failed for {problems[:5]}')
+        connection.commit()
+    except sqlite3.Error as e:
+        print(f'An error occurred changing the column types. Error: {e}')
+        connection.rollback()
+        return None
+    finally:
+        cursor.execute(f'PRAGMA foreign_keys = {foreign_keys}')
+    create_indexes(cursor, connection)
+    return changed
+
+
+def migrate(db_path, repeat=500):
+    """Fix the column types of a database and print the join timings before and after."""
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    cursor = connection.cursor()
+    try:
+        before = benchmark(cursor, repeat)
+        changed = fix_column_types(cursor, connection)
+        if changed is None:
+            return False
+        after = benchmark(cursor, repeat)
+    finally:
+        connection.close()
+    print(f"Columns changed: {', '.join(changed) if changed else 'none, the types were already correct'}")
+    for name in BENCHMARK_QUERIES:
+        print(f'{name}: {before[name]:.4f} ms before, {after[name]:.4f} ms after ({before[name] / after[name]:.2f}x)')
+    return True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python -m student.placeholder.fix_column_types path/to/paralympics.db')
+        sys.exit(2)
+    sys.exit(0 if migrate(sys.argv[1]) else 1)
@@ -0,0 +1,47 @@
+"""
+Adds the secondary indexes in shared/indexes.py to an existing database (a migration) and checks that the queries the
+apps run use them. Run:
+    python -m student.placeholder.indexes path/to/paralympics.db
+
+The checked queries are the ones the apps run, from shared/queries.py and chart_queries.py, so a change to a query is
+checked as well; the apps themselves are not imported. Queries on tables or columns that the database does not have
+are skipped, e.g. the card query on a database made from paralympics.sql.
+"""
+import sqlite3
+import sys
+
+from shared.indexes import check_query_plans, create_indexes
+from shared.queries import EVENT_FIELDS, HOSTS_SQL, events_page_sql
+from student.placeholder.chart_queries import line_chart_sql
+
+# name: (SQL, parameters, index names the plan must use), see check_query_plans
+QUERY_CHECKS = {
+    'line chart: events joined to participants': (line_chart_sql('participants'), (), ['uq_participants_event_id']),
+    'card: events joined to their hosts': (HOSTS_SQL, (), ['idx_host_event_event_host']),
+    # Keyset pagination, the page is found using the primary key however far through the table it is
+    'api events: a page of events': (*events_page_sql(EVENT_FIELDS, 10, 20), ['INTEGER PRIMARY KEY']),
+}
+
+
+def migrate(db_path):
+    """Add the indexes to an existing database, then print the query plans. Returns True if all the checks pass."""
+    connection = sqlite3.connect(db_path)
+    cursor = connection.cursor()
+    try:
+        created = create_indexes(cursor, connection)
+        print(f"Indexes created: {', '.join(created) if created else 'none, the database already has them'}")
+        results = check_query_plans(cursor, QUERY_CHECKS)
+    finally:
+        connection.close()
+    for query_name, (passed, plan) in results.items():
+        print(f"{'PASS' if passed else 'FAIL'} {query_name}")
+        for line in plan:
+            print(f'    {line}')
+    return all(passed for passed, plan in results.values())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python -m student.placeholder.indexes path/to/paralympics.db')
+        sys.exit(2)
+    sys.exit(0 if migrate(sys.argv[1]) else 1)
@@ -6,7 +6,7 @@ The 'db' parameter is defined during activity 7.2.
 Complete the code for the quiz tables at the end of the models.py file."""
 from typing import List
 
-from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy import Float, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from tutor.student import db
@@ -88,6 +88,8 @@ class Host(db.Model):
     host_id = mapped_column(Integer, primary_key=True)
     country_code = mapped_column(ForeignKey('country.code'))
     host = mapped_column(Text, nullable=False)
+    latitude = mapped_column(Float)
+    longitude = mapped_column(Float)
 
     # Relationships
     host_events: Mapped[List["HostEvent"]] = relationship(back_populates="host")
@@ -0,0 +1,163 @@
+"""
+Contains a pipeline that adds all the data to the paralympics database, reading and preparing the sheets in parallel.
+
+add_data_sql3.add_all_data runs each step in turn. The slow part is reading the spreadsheet, and the three sheets
+(events, medal_standings, npc_codes) do not depend on each other, so the pipeline has three stages:
+
+1. parse: each sheet is read by pd.read_excel in its own process (openpyxl is pure Python so threads would not run
+   at the same time because of the GIL).
+2. prepare: the rows for each table are created from the sheets in a thread pool. Each step starts as soon as the
+   sheets it needs have been read, e.g. the country rows only need npc_codes.
+3. write: SQLite allows only one writer at a time, so all the rows are inserted by the calling thread using the one
+   connection that was passed in, in foreign key order and in one transaction. The ids needed for the foreign keys
+   are found from the database as each table is written.
+
+The prepare and write steps are the prepare_ and insert_ functions from add_data_sql3, which add_all_data also uses,
+so the two add the same rows.
+
+The time taken by each step is printed.
+
+Usage:
+    connection = sqlite3.connect(db_path)
+    add_all_data_parallel(connection.cursor(), connection)
+"""
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from importlib import resources
+
+import pandas as pd
+
+from student.placeholder.add_data_sql3 import add_host_geo_data, insert_country, insert_disabilities, insert_events, \
+    insert_host_events, insert_hosts, insert_medals, prepare_country, prepare_disabilities, prepare_events, \
+    prepare_host_events, prepare_hosts, prepare_medals
+from student.placeholder.workbook import SHEET_NAMES, read_host_locations, read_workbook, sheet_hashes, \
+    update_manifest
+
+
+def _parse_sheet(data_path, sheet):
+    """Read one sheet of the spreadsheet. Runs in a worker process so it must be a module level function."""
+    start = time.perf_counter()
+    df = pd.read_excel(data_path, sheet_name=sheet)
+    return df, time.perf_counter() - start
+
+
+def _timed(function, *args):
+    """Run the function and return (result, seconds taken)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+# name: (prepare function from add_data_sql3, sheets it needs). The prepare functions do not use the database so they
+# can run in the thread pool.
+PREPARE_STEPS = {
+    'country': (prepare_country, ['npc_codes']),
+    'events': (prepare_events, ['events']),
+    'hosts': (prepare_hosts, ['events', 'host_locations']),
+    'host_events': (prepare_host_events, ['events']),
+    'disabilities': (prepare_disabilities, ['events']),
+    'medals': (prepare_medals, ['medal_standings']),
+}
+
+# (insert function from add_data_sql3, prepare step it needs) in foreign key order. These are run one at a time with
+# the single writer connection.
+WRITE_STEPS = [
+    (insert_country, 'country'),
+    (insert_hosts, 'hosts'),
+    (insert_events, 'events'),
+    (insert_host_events, 'host_events'),
+    (insert_disabilities, 'disabilities'),
+    (insert_medals, 'medals'),
+]
+
+
+def _parse_and_prepare(data_path, cache_format, workers, timings):
+    """Run the parse and prepare stages and return (sheets, {prepare step: rows})."""
+    sheets = {}
+    prepared = {}
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        if cache_format is not None:
+            start = time.perf_counter()
+            sheets = read_workbook(data_path, cache_format)
+            timings['parse: all sheets (cache)'] = time.perf_counter() - start
+            parsing = {}
+            processes = None
+        else:
+            # The csv of host locations is small so is read here rather than in a worker process
+            sheets['host_locations'] = read_host_locations(data_path)
+            processes = ProcessPoolExecutor(max_workers=min(workers, len(SHEET_NAMES)))
+            parsing = {processes.submit(_parse_sheet, str(data_path), sheet): sheet for sheet in SHEET_NAMES}
+
+        preparing = {}
+        waiting = dict(PREPARE_STEPS)
+        try:
+            while waiting or parsing or preparing:
+                # Start each prepare step as soon as all the sheets it needs have been read
+                for name, (function, needs) in list(waiting.items()):
+                    if all(sheet in sheets for sheet in needs):
+                        future = threads.submit(_timed, function, *[sheets[sheet] for sheet in needs])
+                        preparing[future] = name
+                        del waiting[name]
+                done, _ = wait(list(parsing) + list(preparing), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parsing:
+                        sheet = parsing.pop(future)
+                        sheets[sheet], timings[f'parse: {sheet}'] = future.result()
+                    else:
+                        name = preparing.pop(future)
+                        prepared[name], timings[f'prepare: {name}'] = future.result()
+        finally:
+            if processes is not None:
+                processes.shutdown(cancel_futures=True)
+    return sheets, prepared
+
+
+def add_all_data_parallel(cur, conn, data_path=None, cache_format=None, workers=4):
+    """Adds all the data to the empty tables, reading and preparing the sheets in parallel.
+
+    The tables, ids and values are the same as those added by add_data_sql3.add_all_data.
+
+    Parameters
+    ----------
+    cur: sqlite cursor object, the only one used to write to the database
+    conn: sqlite connection object
+    data_path: path to the spreadsheet, defaults to paralympics.xlsx in tutor.data
+    cache_format: None, 'parquet' or 'feather', see workbook.read_workbook()
+    workers: the maximum number of worker processes and threads
+
+    Returns
+    -------
+    timings: dict of {step: seconds} for each step of each stage, empty if there was an error
+    """
+    if data_path is None:
+        data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
+    timings = {}
+    total_start = time.perf_counter()
+    sheets, prepared = _parse_and_prepare(data_path, cache_format, workers, timings)
+    timings['parse and prepare (elapsed)'] = time.perf_counter() - total_start
+
+    rows = {}
+    try:
+        for write_function, name in WRITE_STEPS:
+            start = time.perf_counter()
+            counts = write_function(cur, prepared[name])
+            timings[f'write: {", ".join(counts)}'] = time.perf_counter() - start
+            rows.update(counts)
+        start = time.perf_counter()
+        rows.update(add_host_geo_data(cur))
+        update_manifest(cur, sheet_hashes(sheets))
+        conn.commit()
+        timings['write: host_geo, load_manifest, commit'] = time.perf_counter() - start
+
+    except (sqlite3.Error, KeyError) as e:
+        print(f'An error occurred adding data to the paralympics database. Error: {e}')
+        if conn:
+            conn.rollback()
+        return {}
+
+    timings['total'] = time.perf_counter() - total_start
+    for step, seconds in timings.items():
+        print(f'{step}: {seconds:.4f}s')
+    print(f'Rows added: {rows}')
+    return timings
@@ -0,0 +1,215 @@
+"""
+Contains a function to update the paralympics database from paralympics.xlsx without recreating it.
+
+create_db drops all the tables and adds all the data again. sync_db instead compares the spreadsheet with the rows
+already in the database using the natural key of each table, for example the year and type of an event rather than
+the event_id, and only inserts, updates or deletes the rows that are different.
+Running it again with the same spreadsheet makes no changes.
+
+Uses sqlite3 and INSERT ... ON CONFLICT DO UPDATE, which needs a unique index on the natural key columns. create_db
+adds these indexes (see shared/indexes.py). sync_db does not create them or change the rows to make them unique: if one
+is missing it stops with an error, and the database must be migrated first with
+    python -m student.placeholder.indexes path/to/paralympics.db
+
+The hash of each sheet is stored in the load_manifest table (see workbook.py). Only the tables that are loaded from a
+sheet that has changed since the last load are compared; if no sheet has changed nothing is compared at all.
+"""
+import sqlite3
+from importlib import resources
+
+from shared.indexes import existing_index
+from student.placeholder.add_data_sql3 import MEDAL_COLUMNS, add_host_geo_data, df_to_rows, host_locations, \
+    medal_result_rows, normalise_host, split_hosts
+from student.placeholder.workbook import changed_sheets, read_workbook, sheet_hashes, update_manifest
+
+# The natural keys that are not already a primary key in create_db.py, each needs a unique index from shared/indexes.py
+NATURAL_KEY_INDEXES = {
+    'event': ['year', 'type'],
+    'participants': ['event_id'],
+    'host': ['host'],
+    'disability': ['category'],
+    'medal_result': ['event_id', 'country_code'],
+}
+
+# The sheets each table is created from, e.g. host needs the country code for the country name in the events sheet
+TABLE_SHEETS = {
+    'country': {'npc_codes'},
+    'event': {'events'},
+    'participants': {'events'},
+    'host': {'events', 'npc_codes', 'host_locations'},
+    'host_event': {'events', 'npc_codes'},
+    'disability': {'events'},
+    'disability_event': {'events'},
+    'medal_result': {'medal_standings', 'events', 'npc_codes'},
+}
+
+
+def _check_natural_key_indexes(cursor):
+    """Raise a ValueError if a table does not have the unique index on its natural key that ON CONFLICT needs."""
+    missing = [f'{table} ({", ".join(columns)})' for table, columns in NATURAL_KEY_INDEXES.items()
+               if existing_index(cursor, table, columns, unique=True) is None]
+    if missing:
+        raise ValueError(f"The database does not have a unique index on {', '.join(missing)}. Add the indexes with "
+                         f"'python -m student.placeholder.indexes path/to/paralympics.db' and then run sync_db again")
+
+
+def _sync_table(cursor, table, key_columns, value_columns, rows):
+    """Insert or update the rows that differ from the database and work out which rows need to be deleted.
+
+    Parameters
+    ----------
+    cursor: sqlite cursor object
+    table: name of the table
+    key_columns: list of the natural key columns
+    value_columns: list of the other columns to compare and update
+    rows: list of tuples of the key values followed by the other values, one tuple for each row in the spreadsheet
+
+    Returns
+    -------
+    counts: dict with the number of rows 'inserted' and 'updated'
+    deletes: list of the keys of the rows in the database that are not in the spreadsheet
+    """
+    n = len(key_columns)
+    columns = key_columns + value_columns
+    current = {row[:n]: row[n:] for row in cursor.execute(f'SELECT {", ".join(columns)} FROM {table}')}
+    wanted = {row[:n]: row[n:] for row in rows}
+
+    inserts = [key + values for key, values in wanted.items() if key not in current]
+    updates = [key + values for key, values in wanted.items() if key in current and current[key] != values]
+    deletes = [key for key in current if key not in wanted]
+
+    if inserts or updates:
+        if value_columns:
+            update_sql = 'DO UPDATE SET ' + ', '.join(f'{col} = excluded.{col}' for col in value_columns)
+        else:
+            update_sql = 'DO NOTHING'
+        cursor.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT ({", ".join(key_columns)}) {update_sql}',
+            inserts + updates)
+    return {'inserted': len(inserts), 'updated': len(updates)}, deletes
+
+
+def _delete_rows(cursor, table, key_columns, keys):
+    """Delete the rows with the given natural keys."""
+    where = ' AND '.join(f'{col} = ?' for col in key_columns)
+    cursor.executemany(f'DELETE FROM {table} WHERE {where}', keys)
+    return len(keys)
+
+
+def sync_db(cursor, connection, data_path=None, cache_format=None, force=False):
+    """Update the database so that it matches paralympics.xlsx, changing only the rows that are different.
+
+    The tables and the unique indexes must already exist, e.g. created by create_db, a ValueError is raised if an
+    index is missing. All the changes are made in one transaction.
+
+    Parameters
+    ----------
+    cursor: sqlite cursor object
+    connection: sqlite connection object
+    data_path: path to the spreadsheet, defaults to paralympics.xlsx in tutor.data
+    cache_format: None, 'parquet' or 'feather', see workbook.read_workbook()
+    force: compare every table even if the sheets have not changed since the last load
+
+    Returns
+    -------
+    report: dict of {table: {'inserted': n, 'updated': n, 'deleted': n}} for the tables that were compared, empty if
+    no sheet has changed or there was an error
+    """
+    _check_natural_key_indexes(cursor)
+    if data_path is None:
+        data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
+    sheets = read_workbook(data_path, cache_format)
+    hashes = sheet_hashes(sheets)
+    changed = set(hashes) if force else changed_sheets(cursor, hashes)
+    if not changed:
+        print('No sheets have changed since the last load, the database was not changed')
+        return {}
+    print(f"Changed sheets: {', '.join(sorted(changed))}")
+
+    events_df = sheets['events'].copy()
+    medals_df = sheets['medal_standings']
+    npc_df = sheets['npc_codes']
+
+    # Dates are stored as strings in the same format used by add_event_data
+    events_df['start'] = events_df['start'].dt.strftime('%d/%m/%Y')
+    events_df['end'] = events_df['end'].dt.strftime('%d/%m/%Y')
+
+    report = {}
+    # (table, key columns, keys to delete) in the order the rows are added, deletes are done in the reverse order
+    pending_deletes = []
+
+    def sync(table, key_columns, value_columns, rows):
+        if not TABLE_SHEETS[table] & changed:
+            return
+        counts, deletes = _sync_table(cursor, table, key_columns, value_columns, rows)
+        report[table] = {**counts, 'deleted': 0}
+        pending_deletes.append((table, key_columns, deletes))
+
+    try:
+        sync('country', ['code'], ['name', 'region', 'sub_region', 'member_type', 'notes'],
+             df_to_rows(npc_df, ['code', 'name', 'region', 'sub_region', 'member_type', 'notes']))
+
+        sync('event', ['year', 'type'], ['start', 'end', 'countries', 'events', 'sports', 'highlights', 'url'],
+             df_to_rows(events_df, ['year', 'type', 'start', 'end', 'countries', 'events', 'sports', 'highlights',
+                                    'url']))
+        event_ids = {(year, event_type): event_id
+                     for event_id, year, event_type in cursor.execute('SELECT event_id, year, type FROM event')}
+
+        participants = [(event_ids[(year, event_type)], participants_m, participants_f, participants)
+                        for year, event_type, participants_m, participants_f, participants
+                        in df_to_rows(events_df, ['year', 'type', 'participants_m', 'participants_f',
+                                                  'participants'])]
+        sync('participants', ['event_id'], ['participants_m', 'participants_f', 'participants'], participants)
+
+        host_pairs = split_hosts(events_df)
+        country_codes = {name: code for code, name in cursor.execute('SELECT code, name FROM country')}
+        locations = host_locations(sheets['host_locations'])
+        hosts = list(dict.fromkeys((host, country_codes[country], *locations.get(host, (None, None)))
+                                   for year, event_type, host, country in host_pairs if country in country_codes))
+        sync('host', ['host'], ['country_code', 'latitude', 'longitude'], hosts)
+        host_ids = {host: host_id for host_id, host in cursor.execute('SELECT host_id, host FROM host')}
+
+        host_events = [(host_ids[host], event_ids[(year, event_type)])
+                       for year, event_type, host, country in host_pairs if host in host_ids]
+        sync('host_event', ['host_id', 'event_id'], [], host_events)
+
+        split_disabilities = events_df['disabilities'].str.split(', ')
+        categories = sorted({d for disabilities in split_disabilities for d in disabilities})
+        sync('disability', ['category'], [], [(d,) for d in categories])
+        disability_ids = {category: disability_id for disability_id, category
+                          in cursor.execute('SELECT disability_id, category FROM disability')}
+        disability_events = [(disability_ids[d], event_ids[(year, event_type)])
+                             for year, event_type, disabilities
+                             in zip(events_df['year'], events_df['type'], split_disabilities)
+                             for d in disabilities]
+        sync('disability_event', ['disability_id', 'event_id'], [], disability_events)
+
+        # Medal results are matched to an event by the year and the host name, the same as medal_event_ids in
+        # add_all_data. The events and hosts are from the spreadsheet rather than the database, which still has the
+        # events that are about to be deleted, so the results for those events are deleted as well.
+        medal_ids = {(year, normalise_host(host)): event_ids[(year, event_type)]
+                     for year, event_type, host, country in host_pairs if host in host_ids}
+        medal_results = medal_result_rows(df_to_rows(medals_df, MEDAL_COLUMNS), medal_ids)
+        sync('medal_result', ['event_id', 'country_code'], ['rank', 'gold', 'silver', 'bronze', 'total'],
+             medal_results)
+
+        # Delete the rows that are no longer in the spreadsheet, child tables before their parent tables
+        for table, key_columns, keys in reversed(pending_deletes):
+            report[table]['deleted'] += _delete_rows(cursor, table, key_columns, keys)
+
+        # The map table is created from the other tables so is refreshed if anything changed
+        if any(sum(counts.values()) for counts in report.values()):
+            add_host_geo_data(cursor)
+        update_manifest(cursor, hashes)
+        connection.commit()
+
+    except (sqlite3.Error, KeyError) as e:
+        print(f'An error occurred updating the paralympics database. Error: {e}')
+        if connection:
+            connection.rollback()
+        return {}
+
+    for table, counts in report.items():
+        print(f"{table}: {counts['inserted']} inserted, {counts['updated']} updated, {counts['deleted']} deleted")
+    return report
@@ -0,0 +1,159 @@
+"""
+Contains functions to read paralympics.xlsx once and to detect which sheets have changed since the last load.
+
+Reading the spreadsheet with openpyxl is the slowest part of loading the database, so:
+
+- read_workbook() reads all the sheets with one call to pd.read_excel instead of one call per sheet.
+- The sheets can optionally be cached as Parquet or Feather files next to the spreadsheet, so that later loads of the
+  same spreadsheet do not use openpyxl at all. This needs pyarrow, which is in requirements.txt. If it is not
+  installed a message is printed and the spreadsheet is read as normal.
+- A hash of the contents of each sheet is stored in the load_manifest table, so the loader can skip the sheets that
+  have not changed since they were last loaded.
+
+The spreadsheet does not have the locations of the hosts, they are in host_locations.csv in the same folder and are
+returned by read_workbook as the 'host_locations' sheet so that they are hashed and loaded in the same way.
+
+Usage:
+    sheets = read_workbook(data_path, cache_format='parquet')
+    changed = changed_sheets(cursor, sheet_hashes(sheets))
+    ... load the changed sheets ...
+    update_manifest(cursor, sheet_hashes(sheets))
+"""
+import hashlib
+import pathlib
+from datetime import datetime, timezone
+
+import pandas as pd
+
+SHEET_NAMES = ['events', 'medal_standings', 'npc_codes']
+LOCATIONS_FILE = 'host_locations.csv'
+LOCATION_COLUMNS = ['host', 'latitude', 'longitude']
+CACHE_FORMATS = ['parquet', 'feather']
+
+manifest_sql = '''CREATE TABLE IF NOT EXISTS load_manifest (
+                    sheet TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    loaded_at TEXT NOT NULL
+                )'''
+
+
+def file_hash(path):
+    """Return the sha256 hash of the bytes of a file."""
+    return hashlib.sha256(pathlib.Path(path).read_bytes()).hexdigest()
+
+
+def _cache_path(data_path, workbook_hash, sheet, cache_format):
+    """e.g. paralympics-<first 16 characters of the workbook hash>-events.parquet in the same folder as the xlsx"""
+    data_path = pathlib.Path(data_path)
+    return data_path.with_name(f'{data_path.stem}-{workbook_hash[:16]}-{sheet}.{cache_format}')
+
+
+def _read_cache(data_path, workbook_hash, cache_format):
+    """Return the cached sheets for this version of the spreadsheet, or None if they are not all cached."""
+    paths = {sheet: _cache_path(data_path, workbook_hash, sheet, cache_format) for sheet in SHEET_NAMES}
+    if not all(path.exists() for path in paths.values()):
+        return None
+    read = pd.read_parquet if cache_format == 'parquet' else pd.read_feather
+    return {sheet: read(path) for sheet, path in paths.items()}
+
+
+def _write_cache(sheets, data_path, workbook_hash, cache_format):
+    """Save the sheets in the cache format and remove the cached files for older versions of the spreadsheet."""
+    data_path = pathlib.Path(data_path)
+    for sheet, df in sheets.items():
+        for old_path in data_path.parent.glob(f'{data_path.stem}-*-{sheet}.{cache_format}'):
+            old_path.unlink()
+        path = _cache_path(data_path, workbook_hash, sheet, cache_format)
+        if cache_format == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_feather(path)
+
+
+def read_host_locations(data_path):
+    """Read the latitude and longitude of each host from host_locations.csv in the same folder as the spreadsheet.
+
+    If the file is not there a message is printed and an empty DataFrame is returned, the hosts are then added
+    without a location.
+    """
+    path = pathlib.Path(data_path).with_name(LOCATIONS_FILE)
+    if not path.exists():
+        print(f'{path} was not found, the hosts will not have a location')
+        return pd.DataFrame(columns=LOCATION_COLUMNS)
+    return pd.read_csv(path, usecols=LOCATION_COLUMNS)
+
+
+def read_workbook(data_path, cache_format=None):
+    """Read the events, medal_standings and npc_codes sheets from the spreadsheet, and the host locations.
+
+    Parameters
+    ----------
+    data_path: path to paralympics.xlsx
+    cache_format: None to always read the spreadsheet, or 'parquet' or 'feather' to cache the sheets
+
+    Returns
+    -------
+    sheets: dict of {sheet name: pandas DataFrame}, including 'host_locations' from read_host_locations()
+    """
+    if cache_format is not None and cache_format not in CACHE_FORMATS:
+        raise ValueError(f'Invalid cache_format "{cache_format}". Must be None or one of {CACHE_FORMATS}')
+
+    if cache_format is not None:
+        workbook_hash = file_hash(data_path)
+        try:
+            sheets = _read_cache(data_path, workbook_hash, cache_format)
+        except ImportError as e:
+            print(f'The {cache_format} cache is not available, reading the spreadsheet instead. Error: {e}')
+            cache_format = None
+        else:
+            if sheets is not None:
+                sheets['host_locations'] = read_host_locations(data_path)
+                return sheets
+
+    # One read of the workbook for all the sheets
+    sheets = pd.read_excel(data_path, sheet_name=SHEET_NAMES)
+
+    if cache_format is not None:
+        try:
+            _write_cache(sheets, data_path, workbook_hash, cache_format)
+        except (ImportError, OSError, ValueError) as e:
+            print(f'Could not save the {cache_format} cache of the spreadsheet. Error: {e}')
+    sheets['host_locations'] = read_host_locations(data_path)
+    return sheets
+
+
+def sheet_hash(df):
+    """Return a sha256 hash of the column names and values of a sheet.
+
+    The hash depends only on the data, not on how the spreadsheet file was saved, so re-saving the xlsx without
+    changing a sheet does not change its hash.
+    """
+    h = hashlib.sha256()
+    h.update('\x1f'.join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def sheet_hashes(sheets):
+    """Return a dict of {sheet name: content hash} for the sheets returned by read_workbook."""
+    return {sheet: sheet_hash(df) for sheet, df in sheets.items()}
+
+
+def changed_sheets(cursor, hashes):
+    """Return the set of sheet names whose hash is not the same as the one stored in the load_manifest table.
+
+    Creates the load_manifest table if it does not exist.
+    """
+    cursor.execute(manifest_sql)
+    stored = dict(cursor.execute('SELECT sheet, content_hash FROM load_manifest'))
+    return {sheet for sheet, content_hash in hashes.items() if stored.get(sheet) != content_hash}
+
+
+def update_manifest(cursor, hashes):
+    """Store the hash of each sheet in the load_manifest table. Does not commit."""
+    cursor.execute(manifest_sql)
+    loaded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    cursor.executemany('''INSERT INTO load_manifest (sheet, content_hash, loaded_at) VALUES (?, ?, ?)
+                          ON CONFLICT (sheet) DO UPDATE SET content_hash = excluded.content_hash,
+                          loaded_at = excluded.loaded_at''',
+                       [(sheet, content_hash, loaded_at) for sheet, content_hash in hashes.items()])
@@ -1,4 +1,4 @@
-import sqlite3
+from contextlib import contextmanager
 from importlib import resources
 
 import dash
@@ -7,20 +7,104 @@ import pandas as pd
 import plotly.express as px
 from dash import html
 
+from shared.dataset_cache import DatasetCache
+from shared.db_pool import get_pool
+from shared.versions import file_version
 
+
+@contextmanager
 def get_database_connection():
     """
-    Create a connection to the SQLite database.
+    Context manager that provides a read-only connection to the SQLite database from the connection pool.
 
-    Returns:
+    The connection is returned to the pool at the end of the with block, see db_pool.py.
+
+    Usage:
+    with get_database_connection() as conn:
+        df = pd.read_sql(sql, conn)
+
+    Yields:
     conn: sqlite3.Connection object
     """
     path_db = resources.files("tutor.data").joinpath("paralympics.db")
-    conn = sqlite3.connect(str(path_db))
-    with conn:
-        conn.execute("PRAGMA foreign_keys = ON")
+    with get_pool(str(path_db)).connection() as conn:
         # conn.set_trace_callback(print)
-        return conn
+        yield conn
+
+
+def data_version():
+    """
+    Return a value that changes whenever the csv or database file changes.
+
+    Used in the figure cache key so that cached figures are created again after the data is updated.
+    """
+    data = resources.files("tutor.data")
+    return file_version(str(data.joinpath("paralympics.csv")), str(data.joinpath("paralympics.db")))
+
+
+# The card index and gender ratios are kept in memory and created again when their file changes, see dataset_cache.py
+_cache = DatasetCache()
+
+
+def _load_card_index(path_db):
+    """ Query the database once for the card contents of every event, see get_card_index() """
+    with get_database_connection() as conn:
+        query = """SELECT host.host, event.year, event.participants, event.events, event.countries, event.sports
+                   FROM event
+                   JOIN host_event ON event.event_id = host_event.event_id
+                   JOIN host ON host_event.host_id = host.host_id;"""
+        rows = conn.execute(query).fetchall()
+    return {
+        f"{host} {year}": {"participants": participants, "events": events, "countries": countries, "sports": sports}
+        for host, year, participants, events, countries, sports in rows
+    }
+
+
+def get_card_index():
+    """
+    Return the card contents for every event keyed by the host and year, e.g. 'Sydney 2000'.
+
+    The key is the same as the hover text on the map so display_card does not need to query the database.
+    The index is created once and again only if the data files change.
+
+    Returns:
+    index: dict of {host_year: dict of card values}
+    """
+    path_db = str(resources.files("tutor.data").joinpath("paralympics.db"))
+    return _cache.get("card_index", path_db, _load_card_index)
+
+
+def _load_gender_ratios(csv_path):
+    """ Calculate the male and female ratios for every event from the csv file, see get_gender_ratios() """
+    cols = ['type', 'year', 'host', 'participants_m', 'participants_f', 'participants']
+    df_events = pd.read_csv(csv_path, usecols=cols)
+    # Drop rows where male/female data is missing, e.g. Rome 1960
+    df_events = df_events.dropna(subset=['participants_m', 'participants_f'])
+    # Sort the values by Type and Year
+    df_events = df_events.sort_values(['type', 'year'], ignore_index=True)
+    # Calculate the % of male and female participants for both columns in one operation
+    ratios = df_events[['participants_m', 'participants_f']].div(df_events['participants'], axis=0)
+    return pd.DataFrame({
+        'type': df_events['type'],
+        # Combines Location and Year to use as the x-axis
+        'xlabel': df_events['host'] + ' ' + df_events['year'].astype(str),
+        'Male': ratios['participants_m'],
+        'Female': ratios['participants_f'],
+    })
+
+
+def get_gender_ratios():
+    """
+    Return the ratio of male and female participants for every summer and winter event.
+
+    The ratios are calculated once for all event types, and again only if the data files change,
+    so each bar chart only needs to select the rows for its event type.
+
+    Returns:
+    df: DataFrame with the columns type, xlabel, Male and Female sorted by type and year
+    """
+    csv_path = str(resources.files("tutor.data").joinpath("paralympics.csv"))
+    return _cache.get("gender_ratios", csv_path, _load_gender_ratios)
 
 
 def create_line_chart(feature):
@@ -76,25 +160,11 @@ def create_bar_chart(event_type):
     Returns
     fig: Plotly Express bar chart
     """
-    cols = ['type', 'year', 'host', 'participants_m', 'participants_f', 'participants']
-    csv_path = resources.files("tutor.data").joinpath("paralympics.csv")
-    df_events = pd.read_csv(str(csv_path), usecols=cols)
-    # Drop Rome as there is no male/female data
-    # Drop rows where male/female data is missing
-    df_events = df_events.dropna(subset=['participants_m', 'participants_f'])
-    df_events.reset_index(drop=True, inplace=True)
-
-    # Add new columns that each contain the result of calculating the % of male and female participants
-    df_events['Male'] = df_events['participants_m'] / df_events['participants']
-    df_events['Female'] = df_events['participants_f'] / df_events['participants']
-
-    # Sort the values by Type and Year
-    df_events.sort_values(['type', 'year'], ascending=(True, True), inplace=True)
-    # Create a new column that combines Location and Year to use as the x-axis
-    df_events['xlabel'] = df_events['host'] + ' ' + df_events['year'].astype(str)
+    # The ratios for every event type are calculated once, select the rows for this event type
+    ratios = get_gender_ratios()
+    df_events = ratios.loc[ratios['type'] == event_type]
 
     # Create the stacked bar plot of the % for male and female
-    df_events = df_events.loc[df_events['type'] == event_type]
     fig = px.bar(df_events,
                  x='xlabel',
                  y=['Male', 'Female'],
@@ -108,22 +178,12 @@ def create_bar_chart(event_type):
 
 
 def create_scatter_geo():
-    # create database connection using the get_database_connection function in this file
-    connection = get_database_connection()
-
-    # define the sql query
-    sql = '''
-        SELECT event.year, host.host, host.latitude, host.longitude FROM event
-        JOIN host_event ON event.event_id = host_event.event_id
-        JOIN host on host_event.host_id = host.host_id
-        '''
-
-    df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
-    # The lat and lon are stored as string but need to be floats for the scatter_geo
-    df_locs['longitude'] = df_locs['longitude'].astype(float)
-    df_locs['latitude'] = df_locs['latitude'].astype(float)
-    # Adds a new column that concatenates the city and year e.g. Barcelona 2012
-    df_locs['name'] = df_locs['host'] + ' ' + df_locs['year'].astype(str)
+    # host_geo has the lat and lon stored as REAL and the name (host and year e.g. Barcelona 2012) for the hover text
+    sql = 'SELECT year, host, latitude, longitude, name FROM host_geo ORDER BY event_id, host_id'
+
+    # get a database connection from the pool using the get_database_connection function in this file
+    with get_database_connection() as connection:
+        df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
 
     fig = px.scatter_geo(df_locs,
                          lat=df_locs.latitude,
@@ -149,31 +209,28 @@ def create_card(host_year):
     year = host_year[-4:]
     host = host_year[:-5]
 
-    # Read the data into a DataFrame using a database query
-    conn = get_database_connection()
-    with conn:
-        query = "SELECT * FROM event JOIN  host_event ON event.event_id = host_event.event_id JOIN host ON host_event.host_id = host.host_id WHERE event.year = ? AND host.host = ?;"
-        ev = pd.read_sql_query(query, conn, params=[year, host])
-        if ev.empty:
-            return dbc.Alert("Event not found", color="danger")
-
-        # Variables for the card contents
-        logo = f'logos/{year}_{host}.jpg'
-        participants = f'{ev['participants'].item()} athletes'
-        events = f'{ev['events'].item()} events'
-        countries = f'{ev['countries'].item()} participating teams'
-        sports = f'{ev['sports'].item()} sports'
-
-        card = dbc.Card([
-            dbc.CardImg(src=dash.get_asset_url(logo), style={'max-width': '60px'}, top=True),
-            dbc.CardBody([
-                html.H4(host_year, className="card-title", id='card-title'),
-                html.P(participants, className="card-text", ),
-                html.P(events, className="card-text", ),
-                html.P(countries, className="card-text", ),
-                html.P(sports, className="card-text", ),
-            ]),
-        ],
-            style={"width": "18rem"},
-        )
-        return card
+    # Find the event in the index, this is a dictionary lookup rather than a database query
+    ev = get_card_index().get(host_year)
+    if ev is None:
+        return dbc.Alert("Event not found", color="danger")
+
+    # Variables for the card contents
+    logo = f'logos/{year}_{host}.jpg'
+    participants = f'{ev["participants"]} athletes'
+    events = f'{ev["events"]} events'
+    countries = f'{ev["countries"]} participating teams'
+    sports = f'{ev["sports"]} sports'
+
+    card = dbc.Card([
+        dbc.CardImg(src=dash.get_asset_url(logo), style={'max-width': '60px'}, top=True),
+        dbc.CardBody([
+            html.H4(host_year, className="card-title", id='card-title'),
+            html.P(participants, className="card-text", ),
+            html.P(events, className="card-text", ),
+            html.P(countries, className="card-text", ),
+            html.P(sports, className="card-text", ),
+        ]),
+    ],
+        style={"width": "18rem"},
+    )
+    return card
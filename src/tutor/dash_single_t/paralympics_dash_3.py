@@ -1,67 +1,91 @@
 """ Version as at the end of week 3: Charts with callbacks"""
+# Start time for the import timing, see startup.py
+import time
+import_start = time.perf_counter()
+
 import dash_bootstrap_components as dbc
 from dash import Dash, Input, Output, dcc, html
 
-from tutor.dash_single_t.figures import create_bar_chart, create_card, create_line_chart, create_scatter_geo
+from shared.figure_cache import cached_figure
+from tutor.dash_single_t.figures import create_bar_chart, create_card, create_line_chart, create_scatter_geo, \
+    data_version
+from shared.startup import get_startup_mode, record_startup_metrics, set_layout, start_warm_up
 
 meta_tags = [{"name": "viewport", "content": "width=device-width, initial-scale=1"}, ]
 external_stylesheets = [dbc.themes.BOOTSTRAP]
 app = Dash(__name__, external_stylesheets=external_stylesheets, meta_tags=meta_tags)
 
-# Create the figure (chart) variables
-fig_line = create_line_chart("sports")
-fig_bar = create_bar_chart("winter")
-map = create_scatter_geo()
-card = create_card("Sydney 2000")
-
-# Variables that define each row that will be added to the layout
-row_one = dbc.Row([
-    dbc.Col([
-        html.H1("Paralympics Dashboard", id='title'),
-        html.P("Try to answer the questions using the charts below.")
-    ], width=12),
-])
-
-row_two = dbc.Row([
-    dbc.Col(children=[
-        dbc.Select(
-            id="dropdown-category",
-            options=[
-                {"label": "Events", "value": "events"},
-                {"label": "Sports", "value": "sports"},
-                {"label": "Countries", "value": "countries"},
-                {"label": "Athletes", "value": "participants"},
-            ],
-            value="events"
-        )], width=4),
-    dbc.Col(children=[
-        dbc.Checklist(
-            options=[
-                {"label": "Summer", "value": "summer"},
-                {"label": "Winter", "value": "winter"},
-            ],
-            value=["summer"],
-            id="checklist-games-type",
-        )
-    ], width={"size": 4, "offset": 2}),
-])
-
-row_three = dbc.Row([
-    dbc.Col(children=[dcc.Graph(id="line-chart", figure=fig_line), ], width=6),
-    dbc.Col(children=[], id='bar-div', width=6),
-], align="start")
-
-row_four = dbc.Row([
-    dbc.Col(children=[dcc.Graph(id='map', figure=map)], width=8),
-    dbc.Col(children=[card], id='card', width=4),
-], align="start")
-
-app.layout = dbc.Container([
-    row_one,
-    row_two,
-    row_three,
-    row_four
-])
+# eager, lazy or warm, see startup.py
+STARTUP_MODE = get_startup_mode()
+
+
+def create_layout(with_figures=True):
+    """ Create the layout. The figures come from the figure cache so this is quick after the first call.
+
+    with_figures=False gives the same layout with empty figures, used by Dash to check the callbacks.
+    """
+    if with_figures:
+        version = data_version()
+
+        # Create the figure (chart) variables
+        fig_line = cached_figure(create_line_chart, "sports", version=version)
+        map = cached_figure(create_scatter_geo, version=version)
+        card = create_card("Sydney 2000")
+    else:
+        fig_line, map, card = {}, {}, html.Div()
+
+    # Variables that define each row that will be added to the layout
+    row_one = dbc.Row([
+        dbc.Col([
+            html.H1("Paralympics Dashboard", id='title'),
+            html.P("Try to answer the questions using the charts below.")
+        ], width=12),
+    ])
+
+    row_two = dbc.Row([
+        dbc.Col(children=[
+            dbc.Select(
+                id="dropdown-category",
+                options=[
+                    {"label": "Events", "value": "events"},
+                    {"label": "Sports", "value": "sports"},
+                    {"label": "Countries", "value": "countries"},
+                    {"label": "Athletes", "value": "participants"},
+                ],
+                value="events"
+            )], width=4),
+        dbc.Col(children=[
+            dbc.Checklist(
+                options=[
+                    {"label": "Summer", "value": "summer"},
+                    {"label": "Winter", "value": "winter"},
+                ],
+                value=["summer"],
+                id="checklist-games-type",
+            )
+        ], width={"size": 4, "offset": 2}),
+    ])
+
+    row_three = dbc.Row([
+        dbc.Col(children=[dcc.Graph(id="line-chart", figure=fig_line), ], width=6),
+        dbc.Col(children=[], id='bar-div', width=6),
+    ], align="start")
+
+    row_four = dbc.Row([
+        dbc.Col(children=[dcc.Graph(id='map', figure=map)], width=8),
+        dbc.Col(children=[card], id='card', width=4),
+    ], align="start")
+
+    return dbc.Container([
+        row_one,
+        row_two,
+        row_three,
+        row_four
+    ])
+
+
+# eager: create the figures now, lazy or warm: when a page is requested, see startup.py
+set_layout(app, create_layout, STARTUP_MODE)
 
 
 @app.callback(
@@ -70,7 +94,7 @@ app.layout = dbc.Container([
 )
 def update_line_chart(feature):
     """ Update the line chart based on the dropdown selection """
-    figure = create_line_chart(feature)
+    figure = cached_figure(create_line_chart, feature, version=data_version())
     return figure
 
 
@@ -84,9 +108,10 @@ def update_bar_chart(selected_values):
      Creates one chart for each of the selected values.
      """
     figures = []
+    version = data_version()
     # Iterate the list of values from the checkbox component
     for value in selected_values:
-        fig = create_bar_chart(value)
+        fig = cached_figure(create_bar_chart, value, version=version)
         # Assign id to be used to identify the charts
         id = f"bar-chart-{value}"
         element = dcc.Graph(figure=fig, id=id)
@@ -105,5 +130,20 @@ def display_card(hover_data):
         return create_card(text)
 
 
+def warm_up():
+    """ Create the layout and the figure for every callback input so that they are in the figure cache. """
+    create_layout()
+    version = data_version()
+    for feature in ["events", "sports", "countries", "participants"]:
+        cached_figure(create_line_chart, feature, version=version)
+    for event_type in ["summer", "winter"]:
+        cached_figure(create_bar_chart, event_type, version=version)
+
+
+if STARTUP_MODE == "warm":
+    start_warm_up(warm_up)
+
+startup_metrics = record_startup_metrics(app, import_start, STARTUP_MODE)
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+from student.placeholder.create_db import create_db
+
+# add_data.py uses the Flask-SQLAlchemy db from the tutor app, it is skipped if that is not available
+add_data = pytest.importorskip("student.placeholder.add_data", exc_type=ImportError,
+                               reason="add_data.py needs db and the models in tutor.flask_para_t")
+from tutor.flask_para_t import create_app, db  # noqa: E402
+
+TABLES = ["country", "host", "event", "participants", "host_event", "disability", "disability_event", "medal_result"]
+
+
+def test_bulk_add_all_data_adds_the_same_rows_as_sqlite3(tmp_path):
+    """
+    GIVEN an empty database created by the Flask-SQLAlchemy app and a database created by create_db
+    WHEN the data is added to the first with add_data.add_all_data(bulk=True)
+    THEN each table should have the same number of rows as the second, and the hosts the same locations
+    """
+    orm_path = tmp_path / "orm.db"
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{orm_path}"})
+    with app.app_context():
+        db.create_all()
+        add_data.add_all_data(bulk=True)
+
+    sql3 = sqlite3.connect(tmp_path / "sqlite3.db")
+    create_db(sql3.cursor(), sql3)
+    orm = sqlite3.connect(orm_path)
+    host_sql = "SELECT host, latitude, longitude FROM host ORDER BY host_id"
+    counts = {table: (orm.execute(f"SELECT COUNT(*) FROM {table}").fetchone(),
+                      sql3.execute(f"SELECT COUNT(*) FROM {table}").fetchone()) for table in TABLES}
+    hosts = orm.execute(host_sql).fetchall(), sql3.execute(host_sql).fetchall()
+    orm.close()
+    sql3.close()
+
+    assert {table: orm_count for table, (orm_count, sql3_count) in counts.items() if orm_count != sql3_count} == {}
+    assert hosts[0] == hosts[1]
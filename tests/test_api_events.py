@@ -0,0 +1,85 @@
+import pytest
+
+from student.flask_paralympics import create_app
+from student.flask_paralympics.db import get_db, init_db
+
+
+@pytest.fixture()
+def app(tmp_path):
+    app = create_app({"TESTING": True, "DATABASE": str(tmp_path / "paralympics.sqlite"), "QUERY_LOG": True})
+    with app.app_context():
+        init_db()
+    return app
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def test_api_events_pages_follow_the_cursor(client):
+    """
+    GIVEN the events API
+    WHEN the first page of summer events is requested with two fields, then the page after it
+    THEN each page should have the requested fields and the second page should start after the first
+    """
+    first = client.get("/api/events?type=summer&limit=5&fields=year,type").get_json()
+    second = client.get(f"/api/events?type=summer&limit=5&fields=year,type&after={first['next']}").get_json()
+
+    assert first["count"] == 5
+    assert set(first["events"][0]) == {"event_id", "year", "type"}
+    assert all(event["type"] == "summer" for event in first["events"] + second["events"])
+    assert second["events"][0]["event_id"] > first["events"][-1]["event_id"]
+
+
+def test_api_events_not_modified(client):
+    """
+    GIVEN a page from the events API and its ETag
+    WHEN the same page is requested with If-None-Match set to the ETag
+    THEN the response should be 304 Not Modified
+    """
+    response = client.get("/api/events?year_from=2000")
+    response.get_data()
+    repeat = client.get("/api/events?year_from=2000", headers={"If-None-Match": response.headers["ETag"]})
+
+    assert response.status_code == 200
+    assert repeat.status_code == 304
+
+
+def test_api_events_etag_does_not_read_the_page(app, client):
+    """
+    GIVEN a page from the events API and its ETag
+    WHEN the page is requested with the ETag, then again after an event has been changed
+    THEN the 304 response should not query the event table, and after the change the ETag should be different
+    """
+    response = client.get("/api/events?limit=5")
+    response.get_data()
+    app.extensions["query_log"].clear()
+    repeat = client.get("/api/events?limit=5", headers={"If-None-Match": response.headers["ETag"]})
+    queries = [entry["sql"] for entry in app.extensions["query_log"].slowest(100)]
+    with app.app_context():
+        db = get_db()
+        db.execute("UPDATE event SET sports = sports + 1 WHERE event_id = 1")
+        db.commit()
+    changed = client.get("/api/events?limit=5", headers={"If-None-Match": response.headers["ETag"]})
+    changed.get_data()
+
+    assert repeat.status_code == 304
+    assert not [sql for sql in queries if "FROM event" in sql]
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != response.headers["ETag"]
+
+
+def test_events_response_is_cached(client):
+    """
+    GIVEN the /events route, which uses the response cache
+    WHEN it is requested twice, then a third time with the ETag from the first response
+    THEN the second response should be the same as the first and the third should be 304 Not Modified
+    """
+    first = client.get("/events")
+    second = client.get("/events")
+    third = client.get("/events", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.get_data() == first.get_data()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert third.status_code == 304
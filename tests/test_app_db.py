@@ -0,0 +1,28 @@
+import sqlite3
+from importlib import resources
+
+from student.placeholder.create_app_db import create_app_db
+
+
+def test_app_db_is_created_with_the_host_locations(tmp_path):
+    """
+    GIVEN paralympics.xlsx and host_locations.csv
+    WHEN the Dash app database is created
+    THEN host_geo should have a REAL latitude and longitude for every host in host_locations.csv, and the rows should
+    be the same as the shipped paralympics.db
+    """
+    db_path = tmp_path / "paralympics.db"
+    create_app_db(db_path)
+
+    connection = sqlite3.connect(db_path)
+    shipped = sqlite3.connect(resources.files("student.data").joinpath("paralympics.db"))
+    geo_sql = "SELECT host, typeof(latitude), typeof(longitude) FROM host_geo WHERE host != 'Milano Cortina'"
+    types = {(lat, lon) for host, lat, lon in connection.execute(geo_sql)}
+    tables = {table: connection.execute(f"SELECT * FROM {table}").fetchall() ==
+              shipped.execute(f"SELECT * FROM {table}").fetchall()
+              for table in ["country", "host", "event", "host_event", "host_geo"]}
+    connection.close()
+    shipped.close()
+
+    assert types == {("real", "real")}
+    assert all(tables.values()), tables
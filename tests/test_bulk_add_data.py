@@ -0,0 +1,69 @@
+import sqlite3
+from importlib import resources
+
+from sqlalchemy import MetaData, create_engine
+from sqlalchemy.orm import Session
+
+from student.placeholder.bulk_add_data import bulk_add_all_data, bulk_add_medal_result_data
+from student.placeholder.create_db import create_db
+from student.placeholder.workbook import read_workbook
+
+DATA_PATH = resources.files("tutor.data").joinpath("paralympics.xlsx")
+TABLES = ["country", "host", "event", "participants", "host_event", "disability", "disability_event", "medal_result"]
+
+
+def test_bulk_add_all_data_adds_the_same_rows_as_sqlite3(tmp_path):
+    """
+    GIVEN a database created by create_db, and an empty database with the same tables
+    WHEN the data is added to the empty database with bulk_add_all_data using an SQLAlchemy session
+    THEN each table should have the same rows as the database created by create_db
+    """
+    sql3 = sqlite3.connect(tmp_path / "sqlite3.db")
+    create_db(sql3.cursor(), sql3)
+    bulk = sqlite3.connect(tmp_path / "bulk.db")
+    for table in TABLES:
+        bulk.execute(sql3.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0])
+    bulk.commit()
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    with Session(engine) as session:
+        bulk_add_all_data(session, read_workbook(DATA_PATH))
+    engine.dispose()
+    different = [table for table in TABLES
+                 if sql3.execute(f"SELECT * FROM {table}").fetchall() !=
+                 bulk.execute(f"SELECT * FROM {table}").fetchall()]
+    rows = bulk.execute("SELECT COUNT(*) FROM medal_result").fetchone()[0]
+    sql3.close()
+    bulk.close()
+
+    assert different == []
+    assert rows > 0
+
+
+def test_bulk_add_with_no_rows_inserts_nothing(tmp_path):
+    """
+    GIVEN an empty database with the tables created by create_db
+    WHEN medal results are added before there are any events, so no result has an event
+    THEN no rows should be added to medal_result
+    """
+    sql3 = sqlite3.connect(tmp_path / "sqlite3.db")
+    create_db(sql3.cursor(), sql3)
+    tables = {table: sql3.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+              for table in TABLES}
+    sql3.close()
+    empty = sqlite3.connect(tmp_path / "empty.db")
+    for create_sql in tables.values():
+        empty.execute(create_sql)
+    empty.commit()
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    with Session(engine) as session:
+        bulk_add_medal_result_data(session, metadata.tables, read_workbook(DATA_PATH)["medal_standings"])
+        session.commit()
+    engine.dispose()
+    rows = empty.execute("SELECT COUNT(*) FROM medal_result").fetchone()[0]
+    empty.close()
+
+    assert rows == 0
@@ -0,0 +1,52 @@
+import os
+import sqlite3
+from importlib import resources
+
+import plotly
+
+from student.placeholder.chart_fragments import fragment_cache, plotlyjs_static_file
+from student.placeholder.figures_sqlite3 import line_chart, line_chart_fragment
+
+
+def test_plotlyjs_is_saved_once_in_the_static_folder(tmp_path):
+    """
+    GIVEN an empty static folder
+    WHEN plotlyjs_static_file is called twice
+    THEN plotly.js should be saved once, in a file named with the Plotly version, and the same path returned each time
+    """
+    first = plotlyjs_static_file(tmp_path)
+    path = tmp_path / first
+    modified = os.stat(path).st_mtime_ns
+    second = plotlyjs_static_file(tmp_path)
+
+    assert first == second == f"js/plotly-{plotly.__version__}.min.js"
+    assert path.stat().st_size > 1_000_000
+    assert os.stat(path).st_mtime_ns == modified
+    assert list(path.parent.glob("*.tmp")) == []
+
+
+def test_line_chart_fragment_is_cached_until_the_data_changes(tmp_path):
+    """
+    GIVEN a database created from paralympics.sql and an empty fragment cache
+    WHEN the sports fragment is requested twice, then again after an event has been changed
+    THEN the fragment should not include plotly.js, the second request should be a cache hit, and after the change
+    the fragment should be made again with the new data
+    """
+    connection = sqlite3.connect(tmp_path / "paralympics.db")
+    connection.executescript(resources.files("student.data").joinpath("paralympics.sql").read_text())
+    fragment_cache.clear()
+
+    first = line_chart_fragment("sports", connection)["fig"]
+    second = line_chart_fragment("sports", connection)["fig"]
+    hits = fragment_cache.stats()["hits"]
+    connection.execute("UPDATE event SET sports = 99 WHERE year = 2012 AND type = 'summer'")
+    connection.commit()
+    changed = line_chart_fragment("sports", connection)["fig"]
+    misses = fragment_cache.stats()["misses"]
+    full = line_chart("sports", connection)["fig"]
+    connection.close()
+
+    assert second == first
+    assert hits == 1
+    assert (misses, changed != first) == (2, True)
+    assert len(first) < 100_000 < len(full)
@@ -0,0 +1,35 @@
+import sqlite3
+from importlib import resources
+
+import pandas as pd
+import pytest
+from sqlalchemy import MetaData, create_engine
+
+from student.placeholder.chart_queries import LINE_CHART_FEATURES, line_chart_frame, line_chart_select, \
+    read_line_chart_data
+
+
+@pytest.mark.parametrize("feature", list(LINE_CHART_FEATURES))
+def test_sqlite3_and_sqlalchemy_line_chart_data_are_the_same(tmp_path, feature):
+    """
+    GIVEN a database created from paralympics.sql
+    WHEN the line chart data is read with sqlite3 using line_chart_sql, and with SQLAlchemy using line_chart_select
+    THEN both DataFrames should have the same rows, columns and dtypes
+    """
+    path = tmp_path / "paralympics.db"
+    connection = sqlite3.connect(path)
+    connection.executescript(resources.files("student.data").joinpath("paralympics.sql").read_text())
+    sqlite3_df = read_line_chart_data(feature, connection)
+    connection.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    metadata.reflect(bind=engine, only=["event", "participants"])
+    with engine.connect() as sqlalchemy_connection:
+        stmt = line_chart_select(feature, metadata.tables["event"], metadata.tables["participants"])
+        sqlalchemy_df = line_chart_frame(sqlalchemy_connection.execute(stmt).all(), feature)
+    engine.dispose()
+
+    assert len(sqlite3_df) > 0
+    assert list(sqlite3_df.columns) == ["year", "type", feature]
+    pd.testing.assert_frame_equal(sqlalchemy_df, sqlite3_df)
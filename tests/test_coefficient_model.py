@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+import student
+from student.placeholder.coefficient_model import CoefficientModel
+from student.placeholder.create_ml_model import train_and_save_model
+
+
+@pytest.fixture()
+def pipeline(tmp_path, monkeypatch):
+    # create_ml_model.py saves model.pkl and model.npz in the current directory
+    monkeypatch.chdir(tmp_path)
+    return train_and_save_model(export_npz=True)
+
+
+def test_npz_predictions_are_identical_to_the_pipeline(pipeline, tmp_path):
+    """
+    GIVEN the pipeline from create_ml_model.py and its coefficients saved to model.npz
+    WHEN every team is predicted for every year from 1960 to 2040 by both
+    THEN the predictions should be exactly the same
+    """
+    model = CoefficientModel.load(tmp_path / "model.npz")
+    teams = model.teams.tolist()
+    X = pd.DataFrame({"Year": np.repeat(np.arange(1960, 2041), len(teams)), "Team": teams * 81})
+
+    assert np.array_equal(model.predict(X), pipeline.predict(X))
+    with pytest.raises(ValueError):
+        model.predict(pd.DataFrame({"Year": [2028], "Team": ["Atlantis"]}))
+
+
+def test_npz_model_is_served_without_sklearn(pipeline, tmp_path):
+    """
+    GIVEN model.npz saved by create_ml_model.py
+    WHEN the ModelService makes a prediction with it in a new Python process
+    THEN scikit-learn should not have been imported
+    """
+    code = ("import sys; from student.flask_paralympics.model_service import ModelService; "
+            f"print(ModelService({str(tmp_path / 'model.npz')!r}).predict([(2028, 'Great Britain')])[0]); "
+            "print('sklearn' in sys.modules)")
+    src = str(Path(student.__file__).parents[1])
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": src})
+    prediction, sklearn_imported = result.stdout.split()
+    expected = pipeline.predict(pd.DataFrame({"Year": [2028], "Team": ["Great Britain"]}))[0]
+
+    assert int(prediction) == max(0, int(expected))
+    assert sklearn_imported == "False"
@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import student
+from student.dash_single.paralympics_dash import update_bar_chart
+
+SRC = str(Path(student.__file__).parents[1])
+
+# Imports the app in a new process so CLIENTSIDE_LINE_CHART is read when the module is imported, then prints whether
+# the line chart callback runs in the browser and the features in the line chart store of the layout
+LINE_CHART_CODE = '''
+import json
+from student.dash_single.paralympics_dash import app
+
+def components(value):
+    """ Every component in the layout JSON, found by walking the dicts and lists. """
+    if isinstance(value, dict):
+        if "props" in value:
+            yield value
+        for child in value.values():
+            yield from components(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from components(child)
+
+client = app.server.test_client()
+dependencies = {d["output"]: d["clientside_function"] is not None for d in client.get("/_dash-dependencies").get_json()}
+layout = client.get("/_dash-layout").get_json()
+store = next(c for c in components(layout) if c["props"].get("id") == "line-chart-store")
+print(json.dumps({"clientside": dependencies["line-chart.figure"], "features": sorted(store["props"]["data"])}))
+'''
+
+
+def patch_operations(patch):
+    """ Return (operation, location, id of the chart added) for each operation in a Dash Patch. """
+    return [(op["operation"], op["location"], getattr(op["params"].get("value"), "id", None))
+            for op in patch.to_plotly_json()["operations"]]
+
+
+@pytest.mark.parametrize("selected, shown, operations, shown_after", [
+    (["summer", "winter"], ["summer"], [("Append", [], "bar-chart-winter")], ["summer", "winter"]),
+    (["winter"], ["summer", "winter"], [("Delete", [0], None)], ["winter"]),
+    (["summer"], ["summer"], [], ["summer"]),
+    (["summer"], None, [("Append", [], "bar-chart-summer")], ["summer"]),
+])
+def test_update_bar_chart_patches_only_the_changed_charts(selected, shown, operations, shown_after):
+    """
+    GIVEN the event types selected in the checklist and the types that already have a chart
+    WHEN update_bar_chart is called for a type added, a type removed, no change and the first call
+    THEN the Patch should only add a chart for the new type or delete the chart of the removed type, and the
+    bar-div-types store should list the types shown after the patch
+    """
+    patch, shown_types = update_bar_chart(selected, shown)
+
+    assert patch_operations(patch) == operations
+    assert shown_types == shown_after
+
+
+@pytest.mark.parametrize("setting, clientside, features", [
+    ("0", False, []),
+    ("1", True, ["countries", "events", "participants", "sports"]),
+])
+def test_clientside_line_chart_sends_every_figure_in_the_store(setting, clientside, features):
+    """
+    GIVEN the Dash app with CLIENTSIDE_LINE_CHART set to 0 or 1
+    WHEN the callbacks and the layout are requested
+    THEN with 1 the line chart callback should run in the browser and the store should have the figure for every
+    feature, and with 0 the callback should run on the server and the store should be empty
+    """
+    result = subprocess.run([sys.executable, "-c", LINE_CHART_CODE], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": SRC, "CLIENTSIDE_LINE_CHART": setting})
+    line_chart = json.loads(result.stdout.splitlines()[-1])
+
+    assert line_chart == {"clientside": clientside, "features": features}
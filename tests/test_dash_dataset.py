@@ -0,0 +1,108 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from shared.dataset_cache import DatasetCache
+from student.dash_single.dataset import (build_card_index, build_gender_ratios, load_events, load_hosts, CSV_PATH,
+                                         DB_PATH)
+from shared.db_pool import ReadOnlyConnectionPool
+
+
+def test_dataset_cache_hit_and_miss():
+    """
+    GIVEN an empty dataset cache
+    WHEN the events data is requested twice
+    THEN the file should be read once (1 miss) and the second request served from memory (1 hit)
+    """
+    cache = DatasetCache()
+    first = cache.get("events", CSV_PATH, load_events)
+    second = cache.get("events", CSV_PATH, load_events)
+    assert first is second
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_dataset_cache_reloads_when_file_changes(tmp_path):
+    """
+    GIVEN a copy of paralympics.csv that has been loaded into the cache
+    WHEN the modification time of the file changes
+    THEN the next request should read the file again
+    """
+    csv_copy = tmp_path / "paralympics.csv"
+    csv_copy.write_bytes(CSV_PATH.read_bytes())
+    cache = DatasetCache()
+    first = cache.get("events", csv_copy, load_events)
+
+    stat = os.stat(csv_copy)
+    os.utime(csv_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = cache.get("events", csv_copy, load_events)
+
+    assert first is not second
+    assert cache.stats()["misses"] == 2
+
+
+def test_connection_pool_reuses_read_only_connection(tmp_path):
+    """
+    GIVEN a connection pool for a copy of paralympics.db
+    WHEN a connection is used twice and then the database file changes
+    THEN the first connection should be reused, be read-only, and be replaced after the file changes
+    """
+    db_copy = tmp_path / "paralympics.db"
+    db_copy.write_bytes(DB_PATH.read_bytes())
+    pool = ReadOnlyConnectionPool(db_copy, size=2)
+
+    with pool.connection() as conn:
+        first = conn
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("CREATE TABLE not_allowed (id INTEGER)")
+    with pool.connection() as conn:
+        assert conn is first
+
+    stat = os.stat(db_copy)
+    os.utime(db_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with pool.connection() as conn:
+        assert conn is not first
+
+    stats = pool.stats()
+    assert stats["reused"] == 1
+    assert stats["failed_health_checks"] == 1
+    pool.close()
+
+
+def test_card_index_has_none_for_missing_counts():
+    """
+    GIVEN the events joined to their hosts, where the counts for Los Angeles 2028 are not known yet
+    WHEN the card index is built
+    THEN the missing counts should be None, as when the card read the row from the database, and not pd.NA
+    """
+    index = build_card_index(load_hosts(DB_PATH))
+
+    assert index["Los Angeles 2028"]["participants"] is None
+    assert index["Los Angeles 2028"]["sports"] == 22
+    assert f'{index["Los Angeles 2028"]["participants"]} athletes' == "None athletes"
+
+
+def test_gender_ratios_for_every_event_type():
+    """
+    GIVEN events of both types in any order, one without the male and female counts
+    WHEN the gender ratios are built
+    THEN there should be one row per event with both counts, sorted by type and year, with the share of male and
+    female participants and a label of the host and year
+    """
+    events = pd.DataFrame({
+        "type": ["winter", "summer", "summer", "summer"],
+        "year": [1976, 1964, 1960, 2012],
+        "host": ["Örnsköldsvik", "Tokyo", "Rome", "London"],
+        "participants_m": [161, 300, None, 2736],
+        "participants_f": [37, 75, None, 1501],
+        "participants": [198, 375, 209, 4237],
+    })
+
+    ratios = build_gender_ratios(events)
+
+    assert ratios[["type", "year", "xlabel"]].values.tolist() == [
+        ["summer", 1964, "Tokyo 1964"], ["summer", 2012, "London 2012"], ["winter", 1976, "Örnsköldsvik 1976"]]
+    assert ratios["Male"].tolist() == pytest.approx([300 / 375, 2736 / 4237, 161 / 198])
+    assert ratios["Female"].tolist() == pytest.approx([75 / 375, 1501 / 4237, 37 / 198])
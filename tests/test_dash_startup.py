@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import student
+
+SRC = str(Path(student.__file__).parents[1])
+
+# Imports the app in a new process so DASH_STARTUP_MODE is read when the module is imported, prints the cache stats,
+# then requests the layout and prints the cache stats again
+IMPORT_CODE = '''
+import json
+import {module} as dash_app
+from shared.figure_cache import figure_cache_stats
+from {datasets} import {dataset_cache} as dataset_cache
+
+def stats():
+    return {{"figures": figure_cache_stats()["size"], "datasets": dataset_cache.stats()["datasets"]}}
+
+after_import = stats()
+response = dash_app.app.server.test_client().get("/_dash-layout")
+print(json.dumps({{"after_import": after_import, "status": response.status_code, "after_request": stats()}}))
+'''
+
+
+@pytest.mark.parametrize("module, datasets, dataset_cache", [
+    ("student.dash_single.paralympics_dash", "student.dash_single.dataset", "_cache"),
+    ("tutor.dash_single_t.paralympics_dash_3", "tutor.dash_single_t.figures", "_cache"),
+])
+def test_lazy_startup_does_not_create_figures_on_import(module, datasets, dataset_cache):
+    """
+    GIVEN the Dash app with DASH_STARTUP_MODE=lazy
+    WHEN the module is imported, then the layout is requested
+    THEN the figure and dataset caches should be empty after the import, and the figures created by the first request
+    """
+    code = IMPORT_CODE.format(module=module, datasets=datasets, dataset_cache=dataset_cache)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": SRC, "DASH_STARTUP_MODE": "lazy"})
+    stats = json.loads(result.stdout.splitlines()[-1])
+
+    assert stats["after_import"] == {"figures": 0, "datasets": {}}
+    assert stats["status"] == 200
+    assert stats["after_request"]["figures"] == 2
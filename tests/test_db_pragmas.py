@@ -0,0 +1,45 @@
+import pytest
+
+from student.flask_paralympics import create_app
+from student.flask_paralympics.db import get_db
+
+
+def pragma_values(app, names):
+    with app.app_context():
+        db = get_db()
+        return {name: db.execute(f"PRAGMA {name}").fetchone()[0] for name in names}
+
+
+def test_get_db_applies_the_default_pragmas(tmp_path):
+    """
+    GIVEN the Flask app with no SQLITE_PRAGMAS in the config
+    WHEN a connection is opened with get_db
+    THEN the connection should use the settings in DEFAULT_SQLITE_PRAGMAS and have foreign keys on
+    """
+    app = create_app({"TESTING": True, "DATABASE": str(tmp_path / "paralympics.sqlite")})
+
+    values = pragma_values(app, ["foreign_keys", "journal_mode", "synchronous", "cache_size", "temp_store",
+                                 "busy_timeout"])
+
+    # synchronous NORMAL is 1 and temp_store MEMORY is 2
+    assert values == {"foreign_keys": 1, "journal_mode": "wal", "synchronous": 1, "cache_size": -64000,
+                      "temp_store": 2, "busy_timeout": 5000}
+
+
+def test_get_db_applies_the_configured_pragmas(tmp_path):
+    """
+    GIVEN the Flask app with SQLITE_PRAGMAS that change one setting and turn one off, and an app with an unknown name
+    WHEN a connection is opened with get_db
+    THEN the changed setting should be used, the one turned off should have the SQLite default, and the unknown name
+    should raise a ValueError
+    """
+    database = str(tmp_path / "paralympics.sqlite")
+    app = create_app({"TESTING": True, "DATABASE": database,
+                      "SQLITE_PRAGMAS": {"busy_timeout": 1234, "journal_mode": None}})
+    unknown = create_app({"TESTING": True, "DATABASE": database, "SQLITE_PRAGMAS": {"page_size": 1024}})
+
+    values = pragma_values(app, ["busy_timeout", "journal_mode"])
+
+    assert values == {"busy_timeout": 1234, "journal_mode": "delete"}
+    with pytest.raises(ValueError, match="page_size"):
+        pragma_values(unknown, ["busy_timeout"])
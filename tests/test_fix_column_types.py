@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from student.placeholder.create_db import create_db
+from student.placeholder.fix_column_types import fix_column_types
+
+# table: (column, correct type, type declared by the old create_db.py)
+OLD_TYPES = {"host_event": ("host_id", "INTEGER", "TEXT"), "event": ("type", "TEXT", "INTEGER")}
+
+
+def schema(connection):
+    return connection.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+
+
+def declared_type(connection, table, column):
+    return next(row[2] for row in connection.execute(f"PRAGMA table_info({table})") if row[1] == column)
+
+
+@pytest.fixture()
+def old_connection(tmp_path):
+    """ A database created by create_db, changed to have the column types of the old create_db.py. """
+    connection = sqlite3.connect(tmp_path / "paralympics.db", isolation_level=None)
+    create_db(connection.cursor(), connection)
+    for table, (column, new_type, old_type) in OLD_TYPES.items():
+        create_sql = connection.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+        old_sql = create_sql.replace(table, f"{table}_old", 1)
+        old_sql = old_sql.replace(f"{column} {new_type}", f"{column} {old_type}", 1)
+        connection.execute(old_sql)
+        connection.execute(f"INSERT INTO {table}_old SELECT * FROM {table}")
+        connection.execute(f"DROP TABLE {table}")
+        connection.execute(f"ALTER TABLE {table}_old RENAME TO {table}")
+    yield connection
+    connection.close()
+
+
+def test_fix_column_types_converts_the_columns(old_connection):
+    """
+    GIVEN a database where host_event.host_id is declared TEXT and holds the host ids as strings
+    WHEN fix_column_types is run
+    THEN host_event.host_id should be INTEGER and hold integers, event.type TEXT, every row should still join to its
+    host, and the integrity and foreign key checks should pass
+    """
+    rows = old_connection.execute("SELECT COUNT(*) FROM host_event").fetchone()[0]
+    before = old_connection.execute("SELECT DISTINCT typeof(host_id) FROM host_event").fetchall()
+
+    changed = fix_column_types(old_connection.cursor(), old_connection)
+
+    assert before == [("text",)]
+    assert changed == ["host_event.host_id", "event.type"]
+    assert declared_type(old_connection, "host_event", "host_id") == "INTEGER"
+    assert declared_type(old_connection, "event", "type") == "TEXT"
+    assert old_connection.execute("SELECT DISTINCT typeof(host_id) FROM host_event").fetchall() == [("integer",)]
+    assert old_connection.execute(
+        "SELECT COUNT(*) FROM host_event JOIN host ON host_event.host_id = host.host_id").fetchone()[0] == rows
+    assert old_connection.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
+    assert old_connection.execute("PRAGMA foreign_key_check").fetchall() == []
+
+
+def test_fix_column_types_a_second_time_changes_nothing(old_connection):
+    """
+    GIVEN a database that has already been migrated by fix_column_types
+    WHEN fix_column_types is run again
+    THEN no columns should be changed, and the schema and the host_event rows should be the same
+    """
+    fix_column_types(old_connection.cursor(), old_connection)
+    before = (schema(old_connection), old_connection.execute("SELECT * FROM host_event").fetchall())
+
+    changed = fix_column_types(old_connection.cursor(), old_connection)
+
+    assert changed == []
+    assert (schema(old_connection), old_connection.execute("SELECT * FROM host_event").fetchall()) == before
@@ -0,0 +1,42 @@
+import shutil
+import sqlite3
+from importlib import resources
+
+import pytest
+
+from shared.indexes import check_query_plans, create_indexes
+from student.placeholder.indexes import QUERY_CHECKS
+
+
+def sql_database(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(resources.files("student.data").joinpath("paralympics.sql").read_text())
+    return connection
+
+
+def app_database(path):
+    shutil.copy(resources.files("student.data").joinpath("paralympics.db"), path)
+    return sqlite3.connect(path)
+
+
+@pytest.mark.parametrize("make_database, checked", [
+    (sql_database, {"line chart: events joined to participants", "api events: a page of events"}),
+    (app_database, {"card: events joined to their hosts", "api events: a page of events"}),
+])
+def test_queries_use_the_secondary_indexes(tmp_path, make_database, checked):
+    """
+    GIVEN a database created from paralympics.sql, and a copy of the Dash app's paralympics.db
+    WHEN the secondary indexes are added
+    THEN EXPLAIN QUERY PLAN should show each of the apps' queries that can run on the database using the expected
+    indexes
+    """
+    connection = make_database(tmp_path / "paralympics.db")
+    cursor = connection.cursor()
+
+    create_indexes(cursor, connection)
+    results = check_query_plans(cursor, QUERY_CHECKS)
+    connection.close()
+
+    assert set(results) == checked
+    failed = {name: plan for name, (passed, plan) in results.items() if not passed}
+    assert failed == {}
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("joblib")
+
+from student.flask_paralympics import create_app
+from student.placeholder.create_ml_model import train_and_save_model
+
+
+@pytest.fixture()
+def model_path(tmp_path, monkeypatch):
+    # create_ml_model.py saves model.pkl in the current directory
+    monkeypatch.chdir(tmp_path)
+    train_and_save_model()
+    return tmp_path / "model.pkl"
+
+
+@pytest.fixture()
+def client(tmp_path, model_path):
+    app = create_app({"TESTING": True, "DATABASE": str(tmp_path / "paralympics.sqlite"), "MODEL_PATH": str(model_path),
+                      "MODEL_MMAP_MODE": "r"})
+    return app.test_client()
+
+
+def test_batch_predictions_match_single_predictions(client):
+    """
+    GIVEN the batch prediction API
+    WHEN three (year, team) pairs, one with a team the model does not know, are sent in one request and then one by one
+    THEN the batch should give the same predictions as the single requests, with null for the unknown team
+    """
+    inputs = [{"year": 2028, "team": "Great Britain"}, {"year": 2028, "team": "Atlantis"},
+              {"year": 2032, "team": "People's Republic of China"}]
+    batch = client.post("/api/predict", json={"inputs": inputs}).get_json()["predictions"]
+    single = [client.post("/api/predict", json={"inputs": [i]}).get_json()["predictions"][0] for i in inputs]
+    stats = client.get("/debug/model").get_json()
+
+    assert batch == single
+    assert batch[1] is None
+    assert all(isinstance(p, int) for p in (batch[0], batch[2]))
+    assert stats["loads"] == 1
+    assert stats["predictions"] == 4
+    assert stats["p50_ms"] <= stats["p99_ms"]
+
+
+def test_model_is_loaded_again_when_the_file_changes(client, model_path):
+    """
+    GIVEN a prediction has been made, so the model has been loaded
+    WHEN the model file is saved again
+    THEN the next prediction should load the model again
+    """
+    client.post("/api/predict", json={"inputs": [{"year": 2028, "team": "Great Britain"}]})
+    train_and_save_model()
+    # Make sure the modification time changes even on file systems with coarse timestamps
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    client.post("/api/predict", json={"inputs": [{"year": 2028, "team": "Great Britain"}]})
+
+    assert client.get("/debug/model").get_json()["loads"] == 2
+
+
+def test_repeated_predictions_come_from_the_cache(tmp_path, model_path):
+    """
+    GIVEN an app that predicts every team for 2024 to 2028 when the model is loaded
+    WHEN a year in the range is requested, then a year outside it is requested twice
+    THEN the first should be precomputed, the second a cache miss and the third a cache hit with the same result
+    """
+    app = create_app({"TESTING": True, "DATABASE": str(tmp_path / "paralympics.sqlite"), "MODEL_PATH": str(model_path),
+                      "MODEL_PRECOMPUTE_YEARS": (2024, 2028)})
+    client = app.test_client()
+    client.post("/api/predict", json={"inputs": [{"year": 2028, "team": "Great Britain"}]})
+    first = client.post("/api/predict", json={"inputs": [{"year": 2040, "team": "Great Britain"}]}).get_json()
+    second = client.post("/api/predict", json={"inputs": [{"year": 2040, "team": "Great Britain"}]}).get_json()
+    stats = client.get("/debug/model").get_json()
+
+    assert second == first
+    assert stats["precomputed"] > 0 and stats["precomputed"] % 5 == 0
+    assert stats["precomputed_hits"] == 1
+    assert (stats["cache"]["hits"], stats["cache"]["misses"]) == (1, 1)
@@ -0,0 +1,31 @@
+import sqlite3
+
+from student.placeholder import add_data_sql3
+from student.placeholder.create_db import create_db
+from student.placeholder.pipeline import add_all_data_parallel
+
+TABLES = ["country", "host", "event", "participants", "host_event", "disability", "disability_event", "medal_result",
+          "host_geo"]
+
+
+def test_pipeline_adds_the_same_rows_as_add_all_data(tmp_path, monkeypatch):
+    """
+    GIVEN a database created by create_db, and a second one created by create_db using the parallel pipeline
+    WHEN the rows of each table are compared
+    THEN they should be the same, including the ids
+    """
+    serial = sqlite3.connect(tmp_path / "serial.db")
+    create_db(serial.cursor(), serial)
+    monkeypatch.setattr(add_data_sql3, "add_all_data", add_all_data_parallel)
+    parallel = sqlite3.connect(tmp_path / "parallel.db")
+    create_db(parallel.cursor(), parallel)
+
+    different = [table for table in TABLES
+                 if serial.execute(f"SELECT * FROM {table}").fetchall() !=
+                 parallel.execute(f"SELECT * FROM {table}").fetchall()]
+    rows = parallel.execute("SELECT COUNT(*) FROM medal_result").fetchone()
+    serial.close()
+    parallel.close()
+
+    assert different == []
+    assert rows[0] > 0
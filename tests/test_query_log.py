@@ -0,0 +1,50 @@
+import logging
+
+import pytest
+
+from student.flask_paralympics import create_app
+from student.flask_paralympics.db import get_db, init_db
+
+
+def make_app(tmp_path, **config):
+    app = create_app({"TESTING": True, "DATABASE": str(tmp_path / "paralympics.sqlite"), **config})
+    with app.app_context():
+        init_db()
+    return app
+
+
+@pytest.mark.parametrize("slow_ms, slow", [(10000, False), (0, True)])
+def test_query_log_records_the_queries(tmp_path, caplog, slow_ms, slow):
+    """
+    GIVEN the app with QUERY_LOG on and SLOW_QUERY_MS set to a long time or to 0
+    WHEN a query is run and its rows fetched, then /debug/queries is requested
+    THEN the query should be in the log with its rows, and be flagged and logged as slow only when SLOW_QUERY_MS is 0
+    """
+    app = make_app(tmp_path, QUERY_LOG=True, SLOW_QUERY_MS=slow_ms)
+    with app.app_context():
+        # Open the connection first so that only the query is in the log
+        db = get_db()
+        app.extensions["query_log"].clear()
+        with caplog.at_level(logging.WARNING, logger="paralympics.queries"):
+            db.execute("SELECT year FROM event WHERE type = ?", ("winter",)).fetchall()
+
+    response = app.test_client().get("/debug/queries?n=5")
+    queries = response.get_json()["slowest"]
+
+    assert response.status_code == 200
+    assert [(q["sql"], q["rows"], q["slow"]) for q in queries] == [
+        ("SELECT year FROM event WHERE type = ?", 14, slow)]
+    assert len([r for r in caplog.records if "SELECT year" in r.getMessage()]) == (1 if slow else 0)
+
+
+def test_debug_queries_not_found_when_the_log_is_off(tmp_path):
+    """
+    GIVEN the app without QUERY_LOG in the config
+    WHEN /debug/queries is requested
+    THEN the response should be 404 Not Found
+    """
+    app = make_app(tmp_path)
+
+    response = app.test_client().get("/debug/queries")
+
+    assert response.status_code == 404
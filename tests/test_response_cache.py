@@ -0,0 +1,91 @@
+import sqlite3
+
+from flask import Response
+
+from student.flask_paralympics import create_app
+from student.flask_paralympics.db import init_db
+from student.flask_paralympics.response_cache import cached_response
+
+
+def make_app(database, **config):
+    return create_app({"TESTING": True, "DATABASE": str(database), "QUERY_LOG": True, **config})
+
+
+def event_queries(app):
+    # The query log is created by the first connection, so an app that has not used the database has no log
+    query_log = app.extensions.get("query_log")
+    return [entry["sql"] for entry in query_log.slowest(100) if "FROM event" in entry["sql"]] if query_log else []
+
+
+def test_sqlite_cache_is_shared_by_the_workers(tmp_path):
+    """
+    GIVEN two apps, like two worker processes, using the same database and the same 'sqlite' response cache file
+    WHEN /events is requested from the first app and then from the second
+    THEN the second app should use the entry made by the first without querying the event table, and the entry should
+    be stored as plain columns
+    """
+    cache_path = tmp_path / "response_cache.sqlite"
+    config = {"RESPONSE_CACHE": "sqlite", "RESPONSE_CACHE_PATH": str(cache_path)}
+    first_app = make_app(tmp_path / "paralympics.sqlite", **config)
+    with first_app.app_context():
+        init_db()
+    second_app = make_app(tmp_path / "paralympics.sqlite", **config)
+
+    first = first_app.test_client().get("/events")
+    second = second_app.test_client().get("/events")
+    with sqlite3.connect(cache_path) as connection:
+        stored = connection.execute("SELECT typeof(body), headers, etag FROM cached_response").fetchall()
+
+    assert event_queries(first_app)
+    assert event_queries(second_app) == []
+    assert second.get_data() == first.get_data()
+    assert stored == [("blob", '[["Content-Type", "application/json"]]', first.headers["ETag"].strip('"'))]
+
+
+def test_streamed_responses_are_not_cached(tmp_path):
+    """
+    GIVEN a route using cached_response that streams its body and sets its own ETag
+    WHEN it is requested twice
+    THEN both responses should have the whole body and the route's ETag, and nothing should be added to the cache
+    """
+    app = make_app(tmp_path / "paralympics.sqlite")
+    with app.app_context():
+        init_db()
+
+    def stream():
+        return Response((part for part in ["a", "b", "c"]), headers={"ETag": '"from-the-route"'})
+
+    app.add_url_rule("/stream", "stream", cached_response(stream))
+    client = app.test_client()
+
+    responses = [client.get("/stream") for _ in range(2)]
+    backend, data_version = app.extensions["response_cache"]
+
+    assert [(r.get_data(), r.headers["ETag"]) for r in responses] == [(b"abc", '"from-the-route"')] * 2
+    assert backend.stats()["size"] == 0
+
+
+def test_cached_responses_have_the_headers_set_by_the_route(tmp_path):
+    """
+    GIVEN a route using cached_response that sets its own Content-Type, Content-Language and Connection headers
+    WHEN it is requested twice
+    THEN the cached response should have the same body and headers as the first, apart from the hop-by-hop Connection
+    header which is not sent from the cache
+    """
+    app = make_app(tmp_path / "paralympics.sqlite")
+    with app.app_context():
+        init_db()
+
+    def page():
+        return Response("<p>Medals</p>", mimetype="text/html",
+                        headers={"Content-Language": "en", "Connection": "close"})
+
+    app.add_url_rule("/page", "page", cached_response(page))
+    client = app.test_client()
+
+    first, second = client.get("/page"), client.get("/page")
+    backend, data_version = app.extensions["response_cache"]
+
+    assert backend.stats()["hits"] == 1
+    assert second.get_data() == first.get_data()
+    assert dict(second.headers) == {name: value for name, value in first.headers.items() if name != "Connection"}
@@ -0,0 +1,93 @@
+import time
+
+import plotly.graph_objects as go
+
+from shared.figure_cache import cached_figure, clear_figure_cache, figure_cache_stats
+from shared.lru import LRUCache
+
+
+def test_lru_cache_removes_least_recently_used():
+    """
+    GIVEN an LRU cache that holds two values
+    WHEN a, b are added, a is used, then c is added
+    THEN b should be removed as it is the least recently used, and a stored None should be found in the cache
+    """
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", None)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert cache.stats()["evictions"] == 1
+
+    cache.set("b", None)
+    assert cache.get_many(["b"]) == {"b": None}
+
+
+def test_lru_cache_values_expire_after_ttl():
+    """
+    GIVEN an LRU cache with a time limit
+    WHEN a value is read before and after the time limit
+    THEN the first read should be a hit and the second a miss
+    """
+    cache = LRUCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    first = cache.get("a")
+    time.sleep(0.06)
+    second = cache.get("a")
+
+    assert (first, second) == (1, None)
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_lru_cache_get_or_create_uses_a_cached_none():
+    """
+    GIVEN an empty LRU cache
+    WHEN get_or_create is called twice for a key whose value is None
+    THEN create should be called once and the second call should be a hit
+    """
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def create():
+        calls.append(1)
+        return None
+
+    values = [cache.get_or_create("a", create) for _ in range(2)]
+
+    assert values == [None, None]
+    assert len(calls) == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_cached_figure_key_is_the_function_arguments_and_version():
+    """
+    GIVEN two figure functions and an empty figure cache
+    WHEN figures are requested for each function, for a second argument, again, and for a new version
+    THEN a figure should be created for each function, argument and version but not for the repeated request, and
+    changing a returned figure should not change the cached figure
+    """
+    clear_figure_cache()
+    calls = []
+
+    def bar(title):
+        calls.append(("bar", title))
+        return go.Figure(go.Bar(x=[1, 2], y=[3, 4]), layout_title_text=title)
+
+    def line(title):
+        calls.append(("line", title))
+        return go.Figure(go.Scatter(x=[1, 2], y=[3, 4]), layout_title_text=title)
+
+    first = cached_figure(bar, "a", version=1)
+    cached_figure(line, "a", version=1)
+    cached_figure(bar, "b", version=1)
+    first["layout"]["title"]["text"] = "changed"
+    again = cached_figure(bar, "a", version=1)
+    cached_figure(bar, "a", version=2)
+
+    assert calls == [("bar", "a"), ("line", "a"), ("bar", "b"), ("bar", "a")]
+    assert again["data"][0]["type"] == "bar"
+    assert again["layout"]["title"]["text"] == "a"
+    assert (figure_cache_stats()["hits"], figure_cache_stats()["misses"]) == (1, 4)
+    clear_figure_cache()
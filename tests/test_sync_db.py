@@ -0,0 +1,98 @@
+import shutil
+import sqlite3
+from importlib import resources
+
+import pandas as pd
+import pytest
+
+from shared.indexes import create_indexes
+from student.placeholder.create_db import create_db
+from student.placeholder.sync_db import sync_db
+from student.placeholder.workbook import LOCATIONS_FILE, read_workbook
+
+DATA_PATH = resources.files("tutor.data").joinpath("paralympics.xlsx")
+
+
+@pytest.fixture()
+def connection(tmp_path):
+    """ A database created by create_db with all the data from the spreadsheet. """
+    connection = sqlite3.connect(tmp_path / "paralympics.db")
+    create_db(connection.cursor(), connection)
+    yield connection
+    connection.close()
+
+
+def test_sync_of_a_new_database_changes_nothing(connection):
+    """
+    GIVEN a database created by create_db
+    WHEN every table is compared with the spreadsheet by sync_db
+    THEN no rows should be inserted, updated or deleted
+    """
+    report = sync_db(connection.cursor(), connection, force=True)
+
+    assert "medal_result" in report
+    assert {table: counts for table, counts in report.items() if any(counts.values())} == {}
+
+
+def test_sync_restores_changed_and_deleted_rows(connection):
+    """
+    GIVEN a database where one event has been changed and one medal result deleted
+    WHEN sync_db is run
+    THEN the event should be updated and the medal result inserted, and a second sync should change nothing
+    """
+    connection.execute("UPDATE event SET sports = 0 WHERE year = 2012 AND type = 'summer'")
+    connection.execute("DELETE FROM medal_result WHERE result_id = 1")
+    connection.commit()
+
+    report = sync_db(connection.cursor(), connection, force=True)
+    second = sync_db(connection.cursor(), connection, force=True)
+
+    assert report["event"] == {"inserted": 0, "updated": 1, "deleted": 0}
+    assert report["medal_result"] == {"inserted": 1, "updated": 0, "deleted": 0}
+    assert not any(any(counts.values()) for counts in second.values())
+
+
+def test_sync_deletes_the_medal_results_of_a_deleted_event(connection, tmp_path):
+    """
+    GIVEN a database created by create_db, and a copy of the spreadsheet without the 2012 summer event
+    WHEN sync_db is run with the copy
+    THEN the event and all its medal results should be deleted and counted in the report, and no row should be left
+    referring to the deleted event
+    """
+    path = tmp_path / "paralympics.xlsx"
+    shutil.copy(DATA_PATH.with_name(LOCATIONS_FILE), path.with_name(LOCATIONS_FILE))
+    with pd.ExcelWriter(path) as writer:
+        for sheet, df in read_workbook(DATA_PATH).items():
+            if sheet == "events":
+                df = df[~((df["year"] == 2012) & (df["type"] == "summer"))]
+            if sheet != "host_locations":
+                df.to_excel(writer, sheet_name=sheet, index=False)
+    results = connection.execute("""SELECT COUNT(*) FROM medal_result JOIN event USING (event_id)
+                                    WHERE year = 2012 AND type = 'summer'""").fetchone()[0]
+
+    report = sync_db(connection.cursor(), connection, data_path=path)
+
+    assert results > 0
+    assert report["event"]["deleted"] == 1
+    assert report["medal_result"] == {"inserted": 0, "updated": 0, "deleted": results}
+    assert connection.execute("PRAGMA foreign_key_check").fetchall() == []
+
+
+def test_sync_needs_the_unique_indexes_and_the_migration_fails_on_duplicates(connection):
+    """
+    GIVEN a database without the unique index on medal_result and with a duplicated medal result
+    WHEN sync_db is run, then the indexes are added
+    THEN sync_db should raise a ValueError and create_indexes an IntegrityError, and the duplicate should not be deleted
+    """
+    connection.execute("DROP INDEX uq_medal_result_event_id_country_code")
+    connection.execute('''INSERT INTO medal_result (event_id, country_code, rank, gold, silver, bronze, total)
+                          SELECT event_id, country_code, rank, gold, silver, bronze, total FROM medal_result
+                          WHERE result_id = 1''')
+    connection.commit()
+    rows = connection.execute("SELECT COUNT(*) FROM medal_result").fetchone()
+
+    with pytest.raises(ValueError, match="medal_result"):
+        sync_db(connection.cursor(), connection, force=True)
+    with pytest.raises(sqlite3.IntegrityError, match="uq_medal_result_event_id_country_code"):
+        create_indexes(connection.cursor(), connection)
+    assert connection.execute("SELECT COUNT(*) FROM medal_result").fetchone() == rows
@@ -0,0 +1,97 @@
+import shutil
+import sqlite3
+from importlib import resources
+
+import pandas as pd
+import pytest
+
+from student.placeholder.workbook import LOCATIONS_FILE, changed_sheets, read_workbook, sheet_hashes, update_manifest
+
+DATA_PATH = resources.files("tutor.data").joinpath("paralympics.xlsx")
+
+
+def test_sheet_hashes_depend_on_the_data_not_the_file(tmp_path):
+    """
+    GIVEN the sheets of paralympics.xlsx saved to a new spreadsheet, and a copy with one value changed
+    WHEN the sheets are read and hashed
+    THEN the new spreadsheet should have the same hashes, and the copy a different hash only for the changed sheet
+    """
+    sheets = read_workbook(DATA_PATH)
+    for name, changed in [("resaved", False), ("changed", True)]:
+        path = tmp_path / name / "paralympics.xlsx"
+        path.parent.mkdir()
+        shutil.copy(DATA_PATH.with_name(LOCATIONS_FILE), path.with_name(LOCATIONS_FILE))
+        with pd.ExcelWriter(path) as writer:
+            for sheet, df in sheets.items():
+                if sheet == "host_locations":
+                    continue
+                if changed and sheet == "events":
+                    df = df.copy()
+                    df.loc[0, "sports"] += 1
+                df.to_excel(writer, sheet_name=sheet, index=False)
+
+    original = sheet_hashes(sheets)
+    resaved = sheet_hashes(read_workbook(tmp_path / "resaved" / "paralympics.xlsx"))
+    changed = sheet_hashes(read_workbook(tmp_path / "changed" / "paralympics.xlsx"))
+
+    assert resaved == original
+    assert {sheet for sheet in original if changed[sheet] != original[sheet]} == {"events"}
+
+
+@pytest.mark.parametrize("cache_format", ["parquet", "feather"])
+def test_cached_sheets_are_read_without_the_spreadsheet_until_it_changes(tmp_path, monkeypatch, cache_format):
+    """
+    GIVEN a copy of paralympics.xlsx read once with a cache format, so the sheets are cached
+    WHEN it is read again, then one value in the spreadsheet is changed and it is read again
+    THEN the second read should use the cache without calling read_excel and give the same sheet hashes, and the read
+    after the change should replace the cached files and give a new hash for only the changed sheet
+    """
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "paralympics.xlsx"
+    shutil.copy(DATA_PATH, path)
+    shutil.copy(DATA_PATH.with_name(LOCATIONS_FILE), path.with_name(LOCATIONS_FILE))
+    first = sheet_hashes(read_workbook(path, cache_format=cache_format))
+    cached_files = set(tmp_path.glob(f"*.{cache_format}"))
+
+    def read_excel(*args, **kwargs):
+        raise AssertionError("the spreadsheet was read instead of the cache")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(pd, "read_excel", read_excel)
+        second = sheet_hashes(read_workbook(path, cache_format=cache_format))
+
+    sheets = read_workbook(path)
+    with pd.ExcelWriter(path) as writer:
+        for sheet, df in sheets.items():
+            if sheet == "events":
+                df.loc[0, "sports"] += 1
+            if sheet != "host_locations":
+                df.to_excel(writer, sheet_name=sheet, index=False)
+    changed = sheet_hashes(read_workbook(path, cache_format=cache_format))
+
+    assert len(cached_files) == 3
+    assert second == first
+    assert {sheet for sheet in first if changed[sheet] != first[sheet]} == {"events"}
+    assert len(set(tmp_path.glob(f"*.{cache_format}"))) == 3
+    assert not cached_files & set(tmp_path.glob(f"*.{cache_format}"))
+
+
+def test_manifest_records_the_loaded_sheets():
+    """
+    GIVEN an empty database
+    WHEN the sheet hashes are saved in load_manifest, then the hash of one sheet changes
+    THEN every sheet should be changed before the hashes are saved, none after, and then only the changed sheet
+    """
+    connection = sqlite3.connect(":memory:")
+    cursor = connection.cursor()
+    hashes = sheet_hashes(read_workbook(DATA_PATH))
+
+    before = changed_sheets(cursor, hashes)
+    update_manifest(cursor, hashes)
+    after = changed_sheets(cursor, hashes)
+    one_changed = changed_sheets(cursor, {**hashes, "npc_codes": "a different hash"})
+    connection.close()
+
+    assert before == set(hashes) == {"events", "medal_standings", "npc_codes", "host_locations"}
+    assert after == set()
+    assert one_changed == {"npc_codes"}